@@ -1,9 +1,11 @@
 import sys
 import asyncio
+from uuid import uuid4
 from pathlib import Path
 from typing import Type, Any, Generator
 
-from sqlalchemy import select, insert, update, delete
+from sqlalchemy import select, insert, update, delete, table as sql_table, column, text
+from sqlalchemy import tuple_, bindparam
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import Insert
 from sqlalchemy.orm.attributes import InstrumentedAttribute
@@ -20,6 +22,10 @@ from interfaces import (
 )
 
 
+# bind parameters of a PostgreSQL statement
+PARAMS_LIMIT = 32767
+
+
 class MaxBatchSizeExceeded(ValueError):
     def __init__(
         self,
@@ -281,6 +287,7 @@ class DataBaseBulkAPI(AbstractDataBaseBulkAPI):
         session: AsyncSession,
         _safe_add: bool = False,
         data: list[dict[str, Any]] = [],
+        _commit: bool = True,
     ) -> None:
         """Insert batch of objects in database"""
 
@@ -291,7 +298,249 @@ class DataBaseBulkAPI(AbstractDataBaseBulkAPI):
         query = query.on_conflict_do_nothing() if _safe_add else query
 
         await session.execute(query)
-        await session.commit()
+        if _commit:
+            await session.commit()
+
+    async def bupdate(
+        self,
+        table: Type[BaseORM],
+        session: AsyncSession,
+        key: str,
+        data: list[dict[str, Any]] = [],
+        _commit: bool = True,
+    ) -> None:
+        """
+        Update rows found by the key attribute, each with its own values.
+        One statement executed for all the rows.
+        """
+
+        if not data:
+            return None
+
+        columns = table.__table__.c
+        query = update(table.__table__).where(columns[key] == bindparam("_key"))
+        # bind names differ from column names, those are reserved
+        query = query.values({a: bindparam(f"_{a}") for a in data[0] if a != key})
+
+        connection = await session.connection()
+        await connection.execute(
+            query,
+            [
+                {"_key": row[key], **{f"_{a}": v for a, v in row.items() if a != key}}
+                for row in data
+            ],
+        )
+        if _commit:
+            await session.commit()
+
+    def _bkey(self, row: dict[str, Any], attributes: list[str]) -> Any:
+        """Value of a single conflict attribute or tuple of values"""
+
+        if len(attributes) == 1:
+            return row[attributes[0]]
+        return tuple(row[a] for a in attributes)
+
+    def _bids_map(self, result: Any) -> dict[Any, int]:
+        """{key: id} of (id, *key attributes) rows"""
+
+        return {row[1] if len(row) == 2 else tuple(row[1:]): row[0] for row in result}
+
+    def _bchunks(self, rows: list[dict[str, Any]]) -> Generator[list, None, None]:
+        """Divide rows so that a statement fits in PARAMS_LIMIT"""
+
+        size = max(PARAMS_LIMIT // max(len(rows[0]), 1), 1)
+        for i in range(0, len(rows), size):
+            yield rows[i : i + size]
+
+    async def _bids(
+        self,
+        table: Type[BaseORM],
+        session: AsyncSession,
+        conflict_attributes: list[str],
+        keys: list[Any],
+    ) -> dict[Any, int]:
+        """{key: id} of existing rows"""
+
+        attributes = [getattr(table, a) for a in conflict_attributes]
+        key = attributes[0] if len(attributes) == 1 else tuple_(*attributes)
+
+        ids = {}
+        size = PARAMS_LIMIT // len(attributes)
+        for i in range(0, len(keys), size):
+            query = select(table.id, *attributes)
+            result = await session.execute(query.where(key.in_(keys[i : i + size])))
+            ids.update(self._bids_map(result))
+        return ids
+
+    async def bgoc(
+        self,
+        table: Type[BaseORM],
+        session: AsyncSession,
+        conflict_attributes: list[str],
+        data: list[dict[str, Any]] = [],
+        _commit: bool = True,
+        _inserted: bool = False,
+    ) -> dict[Any, int] | tuple[dict[Any, int], set[Any]]:
+        """
+        Bulk Get or Create method.
+        Return {key: id} of inserted and existing rows, where key is
+        the value of the conflict attribute, or tuple of values.
+        If _inserted, return ({key: id}, keys of inserted rows).
+        """
+
+        ids, inserted = await self._bupsert(
+            table, session, conflict_attributes, data, [], _commit
+        )
+        return (ids, inserted) if _inserted else ids
+
+    async def bupsert(
+        self,
+        table: Type[BaseORM],
+        session: AsyncSession,
+        conflict_attributes: list[str],
+        data: list[dict[str, Any]] = [],
+        update_attributes: list[str] | None = None,
+        _commit: bool = True,
+    ) -> dict[Any, int]:
+        """
+        Bulk Update or Insert method.
+        Existing rows get update_attributes, all the attributes except
+        id and conflict ones by default.
+        Return {key: id} of inserted and updated rows.
+        """
+
+        if update_attributes is None and data:
+            update_attributes = [
+                a for a in data[0] if a != "id" and a not in conflict_attributes
+            ]
+        ids, _ = await self._bupsert(
+            table, session, conflict_attributes, data, update_attributes, _commit
+        )
+        return ids
+
+    async def _bupsert(
+        self,
+        table: Type[BaseORM],
+        session: AsyncSession,
+        conflict_attributes: list[str],
+        data: list[dict[str, Any]],
+        update_attributes: list[str],
+        _commit: bool,
+    ) -> tuple[dict[Any, int], set[Any]]:
+        """{key: id} of all the rows and keys of the returned ones"""
+
+        # the last row of a key wins, a row can't be updated twice by one statement
+        rows = {self._bkey(row, conflict_attributes): row for row in data}
+        if not rows:
+            return {}, set()
+
+        ids = {}
+        returning = [getattr(table, a) for a in conflict_attributes]
+        for chunk in self._bchunks(list(rows.values())):
+            query = Insert(table).values(chunk)
+            if update_attributes:
+                query = query.on_conflict_do_update(
+                    index_elements=conflict_attributes,
+                    set_={a: query.excluded[a] for a in update_attributes},
+                )
+            else:
+                query = query.on_conflict_do_nothing(index_elements=conflict_attributes)
+
+            result = await session.execute(query.returning(table.id, *returning))
+            ids.update(self._bids_map(result))
+
+        # conflicting rows are not returned by DO NOTHING
+        returned = set(ids)
+        missing = [key for key in rows if key not in returned]
+        if missing:
+            ids.update(await self._bids(table, session, conflict_attributes, missing))
+
+        if _commit:
+            await session.commit()
+        return ids, returned
+
+    async def bcopy(
+        self,
+        table: Type[BaseORM],
+        session: AsyncSession,
+        data: list[dict[str, Any]] = [],
+        conflict_attributes: list[str] | None = None,
+        update_attributes: list[str] | None = None,
+        returning: bool = False,
+        _commit: bool = True,
+    ) -> dict[Any, int] | None:
+        """
+        Insert batch of objects with COPY, without parameters limit.
+
+        Rows are copied in binary format into a temporary staging table
+        and merged by INSERT ... SELECT. Conflicting rows are skipped,
+        or updated by update_attributes (conflict_attributes required).
+        If returning (conflict_attributes required), return {key: id}
+        of inserted and existing rows like bgoc, else None.
+        """
+
+        if conflict_attributes:
+            # the last row of a key wins, like in bupsert
+            data = list(
+                {self._bkey(row, conflict_attributes): row for row in data}.values()
+            )
+        if not data:
+            return {} if returning else None
+
+        columns = list(data[0])
+        # unique per call: calls of one transaction don't share the stage,
+        # pg_temp never resolves to a table of the schema
+        stage = f"_copy_{table.__tablename__[:24]}_{uuid4().hex}"
+        quote = session.bind.dialect.identifier_preparer.quote
+
+        connection = await session.connection()
+        await connection.execute(
+            text(
+                f"CREATE TEMP TABLE pg_temp.{quote(stage)} ON COMMIT DROP AS"
+                f" SELECT {', '.join(map(quote, columns))}"
+                f" FROM {quote(table.__tablename__)} WITH NO DATA"
+            )
+        )
+
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            stage,
+            records=[tuple(row[c] for c in columns) for row in data],
+            columns=columns,
+            schema_name="pg_temp",
+        )
+
+        staged = select(
+            sql_table(stage, *[column(c) for c in columns], schema="pg_temp")
+        )
+        query = Insert(table).from_select(columns, staged)
+        if update_attributes:
+            query = query.on_conflict_do_update(
+                index_elements=conflict_attributes,
+                set_={a: query.excluded[a] for a in update_attributes},
+            )
+        else:
+            query = query.on_conflict_do_nothing(index_elements=conflict_attributes)
+
+        ids = None
+        if returning:
+            keys = [getattr(table, a) for a in conflict_attributes]
+            result = await session.execute(query.returning(table.id, *keys))
+            ids = self._bids_map(result)
+
+            # conflicting rows are not returned by DO NOTHING
+            missing = [self._bkey(row, conflict_attributes) for row in data]
+            missing = [key for key in missing if key not in ids]
+            if missing:
+                ids.update(
+                    await self._bids(table, session, conflict_attributes, missing)
+                )
+        else:
+            await session.execute(query)
+
+        if _commit:
+            await session.commit()
+        return ids
 
 
 class DataBaseAPI(
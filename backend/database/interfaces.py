@@ -1,7 +1,7 @@
 import sys
 from pathlib import Path
 from abc import ABC, abstractmethod
-from typing import Type
+from typing import Any, Type
 from sqlalchemy.ext.asyncio import AsyncSession
 
 sys.path.append(str(Path(__file__).parent))
@@ -159,3 +159,39 @@ class AbstractDataBaseBulkAPI(ABC):
         """Insert object in database"""
 
         pass
+
+    @abstractmethod
+    async def bupdate(
+        self,
+        session: AsyncSession,
+    ) -> None:
+        """Update objects in database"""
+
+        pass
+
+    @abstractmethod
+    async def bgoc(
+        self,
+        session: AsyncSession,
+    ) -> dict[Any, int]:
+        """Get or Create method: return ids of the objects"""
+
+        pass
+
+    @abstractmethod
+    async def bupsert(
+        self,
+        session: AsyncSession,
+    ) -> dict[Any, int]:
+        """Update or insert method: return ids of the objects"""
+
+        pass
+
+    @abstractmethod
+    async def bcopy(
+        self,
+        session: AsyncSession,
+    ) -> dict[Any, int] | None:
+        """Insert objects in database with COPY"""
+
+        pass
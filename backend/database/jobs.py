@@ -0,0 +1,198 @@
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import Any, AsyncIterable, Awaitable, Callable, Hashable, Iterable
+
+from tqdm import tqdm
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.append(str(ROOT_DIR))
+
+from database.manager import PoolStats, WorkerPool
+
+CHECKPOINTS_DIR = ROOT_DIR / "cache" / "jobs"
+
+CONCURRENCY = 50
+QUEUE_SIZE = 200
+BATCH_SIZE = 100
+
+
+def natural_key(id: Hashable) -> tuple[int, str]:
+    """tt9999999 goes before tt10000000"""
+
+    id = str(id)
+    return len(id), id
+
+
+class Checkpoint:
+    """
+    Ids processed by an unfinished run of a job, JSON lines appended
+    after every committed batch.
+    """
+
+    def __init__(self, name: str, directory: str | Path = CHECKPOINTS_DIR) -> None:
+        self.path = Path(directory) / f"{name}.jsonl"
+
+    def load(self) -> set[Any]:
+        if not self.path.exists():
+            return set()
+        with open(self.path) as f:
+            lines = f.read().split("\n")
+        # the last line is empty, or incomplete when a crash broke its write
+        return {json.loads(line) for line in lines[:-1]}
+
+    def add(self, ids: Iterable[Any]) -> None:
+        lines = "".join(json.dumps(id) + "\n" for id in ids)
+        if not lines:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(lines)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class EnrichmentJob:
+    """
+    Fetches data for ids and stores it in batches as soon as it is fetched.
+
+    Ids are fetched by a WorkerPool, results go through a bounded queue
+    to the writer, so at most concurrency + queue_size results are kept
+    in memory. The writer passes batches of results to store, which
+    writes a batch in one session with one commit, and checkpoints the
+    processed ids of the batch. A restarted job skips them, ids added
+    after the interruption are processed whatever their order.
+    A finished job clears its checkpoint.
+
+    fetch: id -> result, None - nothing to store
+    stream: fetches by itself, ids -> async iterable of (id, result),
+        used instead of fetch (TMDbScraper.get_movies, ...)
+    store: stores a list of results
+
+    Pending ids come from database flags which are set by store, the
+    checkpoint only saves the refetch of a restarted run. A failed fetch
+    (an exception as a stream result) is counted in the returned stats
+    by its category and is not checkpointed, so a restarted run retries it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        store: Callable[[list[Any]], Awaitable[Any]],
+        fetch: Callable[[Any], Awaitable[Any | None]] | None = None,
+        stream: Callable[[list[Any]], AsyncIterable[tuple[Any, Any]]] | None = None,
+        concurrency: int = CONCURRENCY,
+        queue_size: int = QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        checkpoints_dir: str | Path = CHECKPOINTS_DIR,
+        sort_key: Callable[[Any], Any] = natural_key,
+    ) -> None:
+        if (fetch is None) == (stream is None):
+            raise ValueError("You should pass either fetch or stream")
+
+        self.name = name
+        self.fetch = fetch
+        self.stream = stream
+        self.store = store
+
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.sort_key = sort_key
+
+        self.checkpoint = Checkpoint(name, checkpoints_dir)
+
+    def pending(self, ids: Iterable[Any]) -> list[Any]:
+        """Unique ids not processed by the interrupted run, in the processing order"""
+
+        processed = self.checkpoint.load()
+        ids = {id for id in ids if id not in processed}
+        return sorted(ids, key=self.sort_key)
+
+    async def run(self, ids: Iterable[Any]) -> PoolStats:
+        """A failed store is raised after the previous batches are stored"""
+
+        ids = self.pending(ids)
+        queue = asyncio.Queue(self.queue_size)
+
+        if self.stream is not None:
+
+            async def drain() -> None:
+                async for id, result in self.stream(ids):
+                    await queue.put((id, result))
+
+            return await self._write(ids, queue, drain())
+
+        async def fetch(id: Any) -> None:
+            try:
+                result = await self.fetch(id)
+            except Exception as error:
+                result = error
+            await queue.put((id, result))
+
+        pool = WorkerPool(fetch, self.concurrency, desc=f"{self.name} fetch")
+        return await self._write(ids, queue, pool.run(ids))
+
+    async def _write(
+        self,
+        ids: list[Any],
+        queue: asyncio.Queue,
+        fetching: Awaitable[Any],
+    ) -> PoolStats:
+        """Stores results of the queue while fetching is awaited"""
+
+        fetcher = asyncio.create_task(fetching)
+        writer = asyncio.create_task(self._store_batches(ids, queue))
+        try:
+            # a failed writer doesn't leave the fetcher blocked on the full queue
+            await asyncio.wait(
+                [fetcher, writer],
+                return_when=asyncio.FIRST_EXCEPTION,
+            )
+            if writer.done():
+                # raises a failed store
+                writer.result()
+            await fetcher
+            stats = await writer
+        finally:
+            for task in [fetcher, writer]:
+                task.cancel()
+            await asyncio.gather(fetcher, writer, return_exceptions=True)
+
+        self.checkpoint.clear()
+        return stats
+
+    async def _store_batches(self, ids: list[Any], queue: asyncio.Queue) -> PoolStats:
+        stats = PoolStats()
+        start = time.perf_counter()
+
+        received = 0
+        with tqdm(total=len(ids), desc=self.name) as progress:
+            while received < len(ids):
+                batch = [await queue.get()]
+                while len(batch) < self.batch_size and not queue.empty():
+                    batch.append(queue.get_nowait())
+                received += len(batch)
+
+                processed, results = [], []
+                for id, result in batch:
+                    if isinstance(result, Exception):
+                        stats.fail(id, result)
+                        continue
+                    stats.processed += 1
+                    processed.append(id)
+                    if result is not None:
+                        results.append(result)
+                if results:
+                    # a batch is written with one commit
+                    await self.store(results)
+
+                self.checkpoint.add(processed)
+                progress.update(len(batch))
+
+        stats.elapsed = time.perf_counter() - start
+        return stats
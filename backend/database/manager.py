@@ -3,10 +3,20 @@ import time
 import asyncio
 import hashlib
 from functools import wraps
+from collections import Counter
 from abc import ABC, abstractmethod
-from typing import Any, Generator
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Generator,
+    Iterable,
+)
 from pathlib import Path
 from slugify import slugify
+from tqdm import tqdm
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
@@ -23,12 +33,123 @@ from database.api import DataBaseAPI, ExceptionHandler, ExceptionToHandle
 
 
 MAX_BATCH_SIZE = 1000
+WORKERS = 50
+# errors kept by a worker pool, the rest of failed items are only listed
+MAX_ERRORS = 100
 
 
 class SlugCreationError(Exception):
     pass
 
 
+async def iter_in_thread(
+    batches: Generator[Any, None, None],
+) -> AsyncGenerator[Any, None]:
+    """
+    Batches of a blocking generator are produced in a worker thread.
+    The next batch is produced only when the previous one is consumed.
+    """
+
+    done = object()
+    while True:
+        batch = await asyncio.to_thread(next, batches, done)
+        if batch is done:
+            return
+        yield batch
+
+
+class PoolStats:
+    def __init__(self) -> None:
+        self.processed = 0
+        self.failed = 0
+        self.failed_items: list[Any] = []
+        self.errors: list[tuple[Any, Exception]] = []
+        # failures by error category (TMDbMovieError, ...) or class name
+        self.categories: Counter[str] = Counter()
+        self.elapsed = 0.0
+
+    def fail(self, item: Any, error: Exception) -> None:
+        self.failed += 1
+        self.failed_items.append(item)
+        self.categories[getattr(error, "category", type(error).__name__)] += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((item, error))
+
+    @property
+    def throughput(self) -> float:
+        """Items per second"""
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        failed = f"{self.failed} failed"
+        if self.categories:
+            categories = ", ".join(f"{c} {n}" for c, n in self.categories.most_common())
+            failed += f" ({categories})"
+        return (
+            f"{self.processed} processed, {failed}"
+            f" in {self.elapsed:.1f}s, {self.throughput:.1f} items/s"
+        )
+
+
+class WorkerPool:
+    """
+    A fixed number of workers drain a bounded queue of items, so tasks
+    and memory don't grow with the number of items: the producer waits
+    while the queue is full. Exceptions of the handler are captured
+    per item into stats instead of stopping the pool.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[Any]],
+        workers: int = WORKERS,
+        queue_size: int | None = None,
+        desc: str | None = None,
+    ) -> None:
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size or workers * 2
+        self.desc = desc
+
+    async def run(self, items: Iterable[Any] | AsyncIterable[Any]) -> PoolStats:
+        stats = PoolStats()
+        queue = asyncio.Queue(self.queue_size)
+        done = object()
+        total = len(items) if hasattr(items, "__len__") else None
+
+        async def worker(progress: tqdm) -> None:
+            while (item := await queue.get()) is not done:
+                try:
+                    await self.handler(item)
+                    stats.processed += 1
+                except Exception as error:
+                    stats.fail(item, error)
+                progress.update()
+
+        start = time.perf_counter()
+        with tqdm(total=total, desc=self.desc) as progress:
+            workers = [
+                asyncio.create_task(worker(progress)) for _ in range(self.workers)
+            ]
+            try:
+                if isinstance(items, AsyncIterable):
+                    async for item in items:
+                        await queue.put(item)
+                else:
+                    for item in items:
+                        await queue.put(item)
+
+                for _ in workers:
+                    await queue.put(done)
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+
+        stats.elapsed = time.perf_counter() - start
+        return stats
+
+
 def generate_short_hash(text: str, length: int) -> str:
     text_value = (text + str(time.time())).encode()
     sha256_hash = hashlib.sha256(text_value).hexdigest()
@@ -61,14 +182,29 @@ class AbstractMovieDataSource(ABC):
     async def get_imdb_movies(self, amount: int) -> list[SourceDataModel]:
         pass
 
+    @abstractmethod
+    async def get_imdb_movies_delta(self, amount: int) -> Any:
+        pass
+
     @abstractmethod
     async def get_tmdb_movie(self, imdb_mvid: str) -> SourceDataModel | None:
         pass
 
+    @abstractmethod
+    def get_tmdb_movies(
+        self,
+        imdb_mvids: list[str],
+    ) -> AsyncGenerator[tuple[str, SourceDataModel | Exception], None]:
+        pass
+
     @abstractmethod
     async def get_imdb_movie_extra(self, imdb_mvid: str) -> SourceDataModel | None:
         pass
 
+    @abstractmethod
+    async def close(self) -> None:
+        pass
+
 
 class AbstractPersonDataSource(ABC):
     @abstractmethod
@@ -83,6 +219,20 @@ class AbstractPersonDataSource(ABC):
     async def get_imdb_principals(self) -> list[SourceDataModel]:
         pass
 
+    @abstractmethod
+    def iter_imdb_persons(
+        self,
+        imdb_mvids: list[str],
+    ) -> AsyncGenerator[list[SourceDataModel], None]:
+        pass
+
+    @abstractmethod
+    def iter_imdb_principals(
+        self,
+        imdb_mvids: list[str],
+    ) -> AsyncGenerator[list[SourceDataModel], None]:
+        pass
+
 
 class Slugger:
     def __init__(
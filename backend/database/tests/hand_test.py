@@ -166,6 +166,18 @@ class APIBulkBaseTest(ABC):
     async def bget_part(self, session: AsyncSession):
         pass
 
+    @abstractmethod
+    async def bgoc(self, session: AsyncSession):
+        pass
+
+    @abstractmethod
+    async def bupsert(self, session: AsyncSession):
+        pass
+
+    @abstractmethod
+    async def bupdate(self, session: AsyncSession):
+        pass
+
     @abstractmethod
     async def delete(self, session: AsyncSession):
         pass
@@ -178,6 +190,10 @@ class APIBulkBaseTest(ABC):
             await self.bget_full(session)
             await self.bget_part(session)
 
+            await self.bgoc(session)
+            await self.bupsert(session)
+            await self.bupdate(session)
+
             await self.delete(session)
 
 
@@ -322,6 +338,45 @@ class BulkAPITest(APIBulkBaseTest):
             assert not hasattr(record, "attr2")
             assert not hasattr(record, "attr3")
 
+    async def bgoc(self, session: AsyncSession):
+        existing = {r.attr1: r.id for r in await self.api.mget(TRelationORM, session)}
+        new = TCase(-1, -5, -9, -2)
+
+        data = [tc.attrs for tc in self.tcs] + [new.attrs]
+        ids, inserted = await self.api.bgoc(
+            TRelationORM, session, ["attr1"], data=data, _inserted=True
+        )
+
+        assert {k: v for k, v in ids.items() if k != new.attr1} == existing
+        assert isinstance(ids[new.attr1], int)
+        assert inserted == {new.attr1}
+
+    async def bupsert(self, session: AsyncSession):
+        data = [{**tc.attrs, "attr4": tc.new_attr1} for tc in self.tcs]
+        ids = await self.api.bupsert(
+            TRelationORM,
+            session,
+            ["attr1"],
+            data=data,
+            update_attributes=["attr4"],
+        )
+
+        records = await self.api.mget(TRelationORM, session)
+        records = {r.attr1: r for r in records}
+        for tc in self.tcs:
+            record = records[tc.attr1]
+            assert ids[tc.attr1] == record.id
+            assert record.attr4 == tc.new_attr1
+
+    async def bupdate(self, session: AsyncSession):
+        data = [{"attr1": tc.attr1, "attr4": tc.attr2} for tc in self.tcs]
+        await self.api.bupdate(TRelationORM, session, "attr1", data=data)
+
+        records = await self.api.mget(TRelationORM, session)
+        records = {r.attr1: r for r in records}
+        for tc in self.tcs:
+            assert records[tc.attr1].attr4 == tc.attr2
+
     async def delete(self, session: AsyncSession):
         await self.api.delete(TRelationORM, session)
 
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+sys.path.append(str(ROOT_DIR.parent))
+
+from database.jobs import EnrichmentJob
+
+
+class StoreFailed(Exception):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_enrichment_job_resume(tmp_path):
+    stored = []
+    failing = {"tt0000003"}
+
+    async def fetch(id: str) -> str:
+        if id == "tt0000002":
+            raise LookupError(id)
+        return id
+
+    async def store(results: list[str]) -> None:
+        if failing.intersection(results):
+            raise StoreFailed(results)
+        stored.extend(results)
+
+    job = EnrichmentJob(
+        "movies",
+        store=store,
+        fetch=fetch,
+        concurrency=1,
+        batch_size=1,
+        checkpoints_dir=tmp_path,
+    )
+    ids = ["tt0000004", "tt0000001", "tt0000002", "tt0000003"]
+
+    with pytest.raises(StoreFailed):
+        await job.run(ids)
+    assert stored == ["tt0000001"]
+    # the failed fetch is not checkpointed
+    assert job.checkpoint.load() == {"tt0000001"}
+
+    # an id added before the checkpointed one is not skipped
+    failing.clear()
+    stats = await job.run(ids + ["tt0000000"])
+
+    assert sorted(stored) == ["tt0000000", "tt0000001", "tt0000003", "tt0000004"]
+    assert (stats.processed, stats.failed) == (3, 1)
+    assert job.checkpoint.load() == set()
+
+
+def test_checkpoint_incomplete_line(tmp_path):
+    job = EnrichmentJob("movies", store=None, fetch=print, checkpoints_dir=tmp_path)
+
+    job.checkpoint.add(["tt0000001", "tt0000002"])
+    with open(job.checkpoint.path, "a") as f:
+        f.write('"tt00')
+
+    assert job.checkpoint.load() == {"tt0000001", "tt0000002"}
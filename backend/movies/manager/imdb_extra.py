@@ -1,7 +1,6 @@
 import sys
 import asyncio
 from pathlib import Path
-from tqdm.asyncio import tqdm_asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
@@ -15,6 +14,7 @@ from database.manager import AbstractPersonDataSource, AbstractMovieDataSource
 from movies.source import MovieDataSource, IMDbMovieExtraInfoSourceDM
 from persons.source import PersonDataSource
 from database.manager import DataBaseManager, ExceptionToHandle
+from database.jobs import EnrichmentJob
 from movies.orm import IMDbMovieORM
 
 
@@ -35,16 +35,24 @@ class IMDbMovieExtraManager(DataBaseManager):
             exceptions_to_handle=exceptions_to_handle,
         )
 
-    async def add(self, extra_sdm: IMDbMovieExtraInfoSourceDM) -> None:
-        if extra_sdm.error is None:
-            async with self.dbapi.session as session:
-                await self.dbapi.update(
-                    IMDbMovieORM,
-                    session,
-                    filters={"imdb_mvid": extra_sdm.imdb_mvid},
-                    image_url=extra_sdm.image_url,
-                    imdb_extra_added=True,
-                )
+    async def badd(self, extras: list[IMDbMovieExtraInfoSourceDM]) -> None:
+        """Movies of the batch are updated by one statement and commit"""
+
+        data = [
+            {
+                "imdb_mvid": extra_sdm.imdb_mvid,
+                "image_url": extra_sdm.image_url,
+                "image_width": extra_sdm.image_width,
+                "image_height": extra_sdm.image_height,
+                "plot": extra_sdm.plot,
+                "content_rating": extra_sdm.content_rating,
+                "imdb_extra_added": True,
+            }
+            for extra_sdm in extras
+            if extra_sdm.error is None
+        ]
+        async with self.dbapi.session as session:
+            await self.dbapi.bupdate(IMDbMovieORM, session, "imdb_mvid", data=data)
 
 
 async def imdb_movies_extra_init():
@@ -58,13 +66,18 @@ async def imdb_movies_extra_init():
             imdb_extra_added=False,
         )
 
-    tasks = [
-        manager.movie_source.get_imdb_movie_extra(m.imdb_mvid) for m in not_have_extra
-    ]
-    movies_extra = await tqdm_asyncio.gather(*tasks)
-
-    tasks = [manager.add(me) for me in movies_extra]
-    await tqdm_asyncio.gather(*tasks)
+    job = EnrichmentJob(
+        "imdb_movies_extra",
+        fetch=manager.movie_source.get_imdb_movie_extra,
+        store=manager.badd,
+    )
+    try:
+        stats = await job.run(m.imdb_mvid for m in not_have_extra)
+        print(f"IMDb movies extra: {stats}")
+    finally:
+        await manager.movie_source.close()
+        # where the time went: limiter, network or parsing
+        print(manager.movie_source.imdb_scraper.metrics.summary())
 
 
 if __name__ == "__main__":
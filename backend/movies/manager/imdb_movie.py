@@ -4,7 +4,6 @@ from enum import Enum
 from pathlib import Path
 from functools import wraps
 from typing import Any
-from tqdm.asyncio import tqdm_asyncio
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.attributes import InstrumentedAttribute
@@ -38,6 +37,7 @@ from database.manager import (
     AbstractMovieDataSource,
     AbstractPersonDataSource,
     MovieSearchDM,
+    WorkerPool,
 )
 from users.orm import UserMovieScoreORM, UserORM
 
@@ -116,33 +116,77 @@ class IMDbMovieManager(DataBaseManagerOnInit):
             )
 
     async def add(self, movie_sdm: IMDbMovieSourceDM) -> None:
+        """
+        Add new movie. Movies imported before the first delta import
+        are updated, errors are raised so the import retries the movie.
+        """
+
         self.check_initilization()
 
-        async with self.exc_handler:
-            async with self.dbapi.session as session:
-                content_type: ContentTypeORM = self.content_types.get(
-                    movie_sdm.content_type.imdb_name
-                )
-                init_slug = self.slugger.initiate_slug(movie_sdm.name_en)
-
-                slug = await self.slugger.create_slug(IMDbMovieORM, session, init_slug)
-                imdb_id = await self.dbapi.add(
-                    self.ORM,
-                    session,
-                    content_type=content_type.id,
-                    slug=slug,
-                    **movie_sdm.to_db(),
-                )
+        async with self.dbapi.session as session:
+            content_type: ContentTypeORM = self.content_types.get(
+                movie_sdm.content_type.imdb_name
+            )
+            init_slug = self.slugger.initiate_slug(movie_sdm.name_en)
+
+            slug = await self.slugger.create_slug(IMDbMovieORM, session, init_slug)
+            imdb_id = await self.dbapi.add(
+                self.ORM,
+                session,
+                _safe_add=True,
+                content_type=content_type.id,
+                slug=slug,
+                **movie_sdm.to_db(),
+            )
+
+            if imdb_id is None:
+                await self._update(movie_sdm, session)
+                return
+
+            await self._index(movie_sdm, imdb_id, session)
+
+    async def update(self, movie_sdm: IMDbMovieSourceDM) -> None:
+        """Update IMDb data of existing movie, slug is kept"""
+
+        self.check_initilization()
+
+        async with self.dbapi.session as session:
+            await self._update(movie_sdm, session)
 
-                if imdb_id:
-                    await self.search.add_movie(
-                        MovieSearchDM(
-                            id=imdb_id,
-                            name_en=movie_sdm.name_en,
-                            name_ru=movie_sdm.name_ru,
-                        )
-                    )
-                    await self.add_imdb_genres(movie_sdm, imdb_id, session)
+    async def _update(
+        self,
+        movie_sdm: IMDbMovieSourceDM,
+        session: AsyncSession,
+    ) -> None:
+        content_type: ContentTypeORM = self.content_types.get(
+            movie_sdm.content_type.imdb_name
+        )
+        movie = await self.dbapi.update(
+            self.ORM,
+            session,
+            filters={"imdb_mvid": movie_sdm.imdb_mvid},
+            content_type=content_type.id,
+            **movie_sdm.to_db(),
+        )
+        if movie is None:
+            raise LookupError(f"IMDb movie {movie_sdm.imdb_mvid} is not stored")
+
+        await self._index(movie_sdm, movie.id, session)
+
+    async def _index(
+        self,
+        movie_sdm: IMDbMovieSourceDM,
+        imdb_id: int,
+        session: AsyncSession,
+    ) -> None:
+        await self.search.add_movie(
+            MovieSearchDM(
+                id=imdb_id,
+                name_en=movie_sdm.name_en,
+                name_ru=movie_sdm.name_ru,
+            )
+        )
+        await self.add_imdb_genres(movie_sdm, imdb_id, session)
 
     async def get(
         self,
@@ -417,14 +461,31 @@ class IMDbMovieManager(DataBaseManagerOnInit):
             return result.scalars().all()
 
 
-async def imdb_movies_init():
+async def imdb_movies_init(amount: int = 1000):
+    """
+    Import only movies changed since the last import:
+    new movies are added, changed ones (rate, votes, wrate, ...) are updated.
+    Movies gone from the import are kept, they may be scored by users.
+    """
+
     manager = IMDbMovieManager()
-    imdb_movies = await manager.movie_source.get_imdb_movies(1000)
+    delta = await manager.movie_source.get_imdb_movies_delta(amount)
+    print(
+        f"IMDb movies: {len(delta.inserted)} new, {len(delta.updated)} changed,"
+        f" {len(delta.deleted)} gone"
+    )
 
     async with manager as imanager:
         async with imanager.search:
-            tasks = [asyncio.create_task(imanager.add(m)) for m in imdb_movies]
-            await tqdm_asyncio.gather(*tasks)
+            added = await WorkerPool(imanager.add, desc="new").run(delta.inserted)
+            updated = await WorkerPool(imanager.update, desc="changed").run(
+                delta.updated
+            )
+    print(f"IMDb movies added: {added}, updated: {updated}")
+
+    # next import is compared with this one, failed movies are retried by it
+    failed = added.failed_items + updated.failed_items
+    delta.commit(failed=[m.imdb_mvid for m in failed])
 
 
 async def reindex_movies():
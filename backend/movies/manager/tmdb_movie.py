@@ -3,8 +3,8 @@ import asyncio
 from pathlib import Path
 from functools import wraps
 from collections import namedtuple
-from tqdm.asyncio import tqdm_asyncio
 from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 ROOT_DIR = Path(__file__).parent.parent
@@ -15,6 +15,7 @@ sys.path.append(str(PROJ_DIR.parent))
 
 from backend.settings import settings
 from database.manager import AbstractPersonDataSource
+from database.jobs import EnrichmentJob
 from movies.source import MovieDataSource, TMDbMovieSourceDM
 from persons.source import PersonDataSource
 from services.tmdb.scraper import TMDbScraper, MovieDoesNotExist
@@ -95,78 +96,28 @@ class TMDbMovieManager(DataBaseManagerOnInit):
                 tmdb_added=False,
             )
 
-    async def add_tmdb_genres(
-        self,
-        movie_sdm: TMDbMovieSourceDM,
-        imdb_id: int,
-        session: AsyncSession,
-    ) -> None:
-        if not movie_sdm.genres:
-            return None
-
-        genres = [
-            self.genres.get(genre_sdm.tmdb_name, None)
-            for genre_sdm in movie_sdm.genres
-            if self.genres.get(genre_sdm.tmdb_name, None) is not None
+    def genre_rows(self, movie_sdm: TMDbMovieSourceDM, imdb_id: int) -> list[dict]:
+        genres = [self.genres.get(g.tmdb_name, None) for g in movie_sdm.genres or []]
+        return [
+            {"imdb_movie_id": imdb_id, "genre_id": g.id}
+            for g in genres
+            if g is not None
         ]
-        movie_genres = [{"imdb_movie_id": imdb_id, "genre_id": g.id} for g in genres]
-        await self.dbapi.badd(
-            MovieGenreORM,
-            session,
-            _safe_add=True,
-            data=movie_genres,
-        )
 
-    async def add_movie_countries(
+    def country_rows(
         self,
         movie_sdm: TMDbMovieSourceDM,
         imdb_id: int,
         tmdb_id: int,
-        session: AsyncSession,
-    ) -> None:
-        if not movie_sdm.countries:
-            return
-
-        countries = [
-            self.countries[country_sdm.iso] for country_sdm in movie_sdm.countries
-        ]
-        movie_countries = [
+    ) -> list[dict]:
+        return [
             {
-                "country_id": c.id,
+                "country_id": self.countries[country_sdm.iso].id,
                 "imdb_movie_id": imdb_id,
                 "tmdb_movie_id": tmdb_id,
             }
-            for c in countries
+            for country_sdm in movie_sdm.countries or []
         ]
-        await self.dbapi.badd(
-            MovieCountryORM,
-            session,
-            _safe_add=True,
-            data=movie_countries,
-        )
-
-    async def add_movie_productions(
-        self,
-        productions: ProductionCompanyORM,
-        imdb_id: int,
-        tmdb_id: int,
-        session: AsyncSession,
-    ) -> None:
-        productions_data = [
-            {
-                "production_company_id": p.id,
-                "imdb_movie_id": imdb_id,
-                "tmdb_movie_id": tmdb_id,
-            }
-            for p in productions
-            if p is not None
-        ]
-        await self.dbapi.badd(
-            MovieProductionORM,
-            session,
-            _safe_add=True,
-            data=productions_data,
-        )
 
     async def add_collection(
         self,
@@ -179,79 +130,124 @@ class TMDbMovieManager(DataBaseManagerOnInit):
         collection = await self.dbapi.goc(
             MovieCollectionORM,
             session,
+            _commit=False,
             **movie_sdm.collection.to_db(),
         )
         return collection.id if collection else None
 
-    async def mark_up(self, imdb_mvid: str, session: AsyncSession) -> None:
-        await self.dbapi.update(
-            IMDbMovieORM,
+    async def add_productions(
+        self,
+        movie_sdm: TMDbMovieSourceDM,
+        session: AsyncSession,
+    ) -> list[int]:
+        productions = []
+        for production in movie_sdm.productions or []:
+            data = await self.production_manager.goc(production, session, _commit=False)
+            if data:
+                productions.append(data.id)
+        return productions
+
+    async def add_movie(
+        self,
+        movie_sdm: TMDbMovieSourceDM,
+        imdb_id: int,
+        session: AsyncSession,
+    ) -> tuple[int | None, list[int]]:
+        """TMDb movie and productions ids, None - the movie is stored already"""
+
+        collection_id = await self.add_collection(movie_sdm, session)
+        tmdb_id = await self.dbapi.add(
+            TMDbMovieORM,
             session,
-            filters={"imdb_mvid": imdb_mvid},
-            tmdb_added=True,
+            _safe_add=True,
+            _commit=False,
+            imdb_movie=imdb_id,
+            movie_collection=collection_id,
+            **movie_sdm.to_db(),
         )
+        if not tmdb_id:
+            return None, []
+        return tmdb_id, await self.add_productions(movie_sdm, session)
+
+    async def badd(self, movies: list[TMDbMovieSourceDM]) -> None:
+        """
+        Movies of the batch are stored in one session with one commit.
+        Links (genres, countries, productions) and marks are written by
+        one statement each, a failed movie is rolled back by its savepoint.
+        """
 
-    async def add(self, movie_sdm: TMDbMovieSourceDM) -> None:
         self.check_initilization()
 
         async with self.semaphore:
             async with self.dbapi.session as session:
-                imdb = await self.dbapi.get(
+                imdb_ids = await self.dbapi.bget(
                     IMDbMovieORM,
                     session,
-                    IMDbMovieORM.id,
-                    imdb_mvid=movie_sdm.imdb_mvid,
-                )
-
-                imdb_id = imdb.id if imdb else None
-                if imdb_id is None:
-                    return
-
-                collection_id = await self.add_collection(movie_sdm, session)
-
-                tmdb_id = await self.dbapi.add(
-                    TMDbMovieORM,
-                    session,
-                    imdb_movie=imdb_id,
-                    movie_collection=collection_id,
-                    **movie_sdm.to_db(),
+                    [IMDbMovieORM.id, IMDbMovieORM.imdb_mvid],
+                    filters={"imdb_mvid": [m.imdb_mvid for m in movies]},
                 )
-                if not tmdb_id:
-                    return
-
-                await self.add_tmdb_genres(movie_sdm, imdb_id, session)
-                await self.add_movie_countries(movie_sdm, imdb_id, tmdb_id, session)
-                await self.mark_up(movie_sdm.imdb_mvid, session)
-
-                if movie_sdm.productions:
-                    productions: list[ProductionCompanyORM] = []
-                    for production in movie_sdm.productions:
-                        data = await self.production_manager.goc(production, session)
-                        if data:
-                            productions.append(data)
-
-                    await self.add_movie_productions(
-                        productions,
-                        imdb_id,
-                        tmdb_id,
-                        session,
+                imdb_ids = {imdb_mvid: id for id, imdb_mvid in imdb_ids}
+
+                marked, genres, countries, productions = [], [], [], []
+                for movie_sdm in movies:
+                    imdb_id = imdb_ids.get(movie_sdm.imdb_mvid)
+                    if imdb_id is None:
+                        continue
+
+                    async with self.exc_handler:
+                        async with session.begin_nested():
+                            tmdb_id, production_ids = await self.add_movie(
+                                movie_sdm, imdb_id, session
+                            )
+                        marked.append(imdb_id)
+
+                        if tmdb_id is None:
+                            continue
+                        genres.extend(self.genre_rows(movie_sdm, imdb_id))
+                        countries.extend(self.country_rows(movie_sdm, imdb_id, tmdb_id))
+                        productions.extend(
+                            {
+                                "production_company_id": production_id,
+                                "imdb_movie_id": imdb_id,
+                                "tmdb_movie_id": tmdb_id,
+                            }
+                            for production_id in production_ids
+                        )
+
+                for table, data in [
+                    (MovieGenreORM, genres),
+                    (MovieCountryORM, countries),
+                    (MovieProductionORM, productions),
+                ]:
+                    await self.dbapi.badd(
+                        table, session, _safe_add=True, data=data, _commit=False
                     )
 
+                if marked:
+                    query = update(IMDbMovieORM).where(IMDbMovieORM.id.in_(marked))
+                    await session.execute(query.values(tmdb_added=True))
+                await session.commit()
+
 
 async def tmdb_movies_init():
     manager = TMDbMovieManager(MovieDataSource())
     imdb_movies = await manager.get_unprocessed_movies()
 
-    tasks = [
-        asyncio.create_task(manager.movie_source.get_tmdb_movie(imdb_movie.imdb_mvid))
-        for imdb_movie in imdb_movies
-    ]
-    movies = await tqdm_asyncio.gather(*tasks)
-    movies = [m for m in movies if m is not None]
-
-    async with manager as imanager:
-        tasks = [asyncio.create_task(imanager.add(movie)) for movie in movies]
-        await tqdm_asyncio.gather(*tasks)
+    try:
+        async with manager as imanager:
+            job = EnrichmentJob(
+                "tmdb_movies",
+                # concurrent, transient errors are retried, the rest
+                # are reported by category in stats
+                stream=manager.movie_source.get_tmdb_movies,
+                store=imanager.badd,
+            )
+            stats = await job.run(m.imdb_mvid for m in imdb_movies)
+        print(f"TMDb movies: {stats}")
+    finally:
+        await manager.movie_source.close()
+        # where the time went: limiter, network or parsing
+        print(manager.movie_source.tmdb_scraper.metrics.summary())
 
 
 if __name__ == "__main__":
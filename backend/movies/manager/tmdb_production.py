@@ -89,6 +89,7 @@ class TMDbProductionManager(DataBaseManagerOnInit):
         self,
         production: ProductionSourceDM,
         session: AsyncSession,
+        _commit: bool = True,
     ) -> int | None:
         country = None
         if production.country:
@@ -100,6 +101,7 @@ class TMDbProductionManager(DataBaseManagerOnInit):
         return await self.dbapi.goc(
             ProductionCompanyORM,
             session,
+            _commit=_commit,
             slug=slug,
             country=country_id,
             **production.to_db(),
@@ -64,6 +64,10 @@ class IMDbMovieORM(BaseORM):
     principals_added: Mapped[bool] = mapped_column(default=False)
 
     image_url: Mapped[str | None]
+    image_width: Mapped[int | None] = mapped_column(SmallInteger())
+    image_height: Mapped[int | None] = mapped_column(SmallInteger())
+    plot: Mapped[str | None]
+    content_rating: Mapped[str | None]
 
     ## Foreign Keys
     content_type: Mapped[int | None] = mapped_column(
@@ -1,6 +1,8 @@
 import sys
 import asyncio
 from datetime import datetime
+from typing import AsyncGenerator
+from pydantic import ValidationError
 from pathlib import Path
 
 PROJ_DIR = Path(__file__).parent.parent.parent
@@ -11,9 +13,13 @@ from database.manager import SourceDataModel, AbstractMovieDataSource
 from services.countries import countries
 from services.movie_genres import genres
 from services.content_types import content_types
-from services.imdb.dataset import IMDbDataSet
-from services.imdb.scraper import IMDbScraper
+from services.imdb.dataset import IMDbDataSet, Delta
+from services.imdb.scraper import IMDbScraper, RESPONSES_CACHE as IMDB_RESPONSES
 from services.tmdb.scraper import TMDbScraper, MovieDoesNotExist, TMDbRequestError
+from services.tmdb.scraper import TMDbMovieError
+from services.tmdb.scraper import RESPONSES_CACHE as TMDB_RESPONSES
+from services.tmdb.scraper import CACHE_DIR as TMDB_CACHE_DIR
+from services.response_cache import ResponseCache
 from services.models import (
     IMDbMovieServiceDM,
     TMDbMovieServiceDM,
@@ -137,6 +143,10 @@ class IMDbMovieSourceDM(SourceDataModel):
 class IMDbMovieExtraInfoSourceDM(SourceDataModel):
     imdb_mvid: str
     image_url: str | None = None
+    image_width: int | None = None
+    image_height: int | None = None
+    plot: str | None = None
+    content_rating: str | None = None
 
     error: str | None = None
 
@@ -155,10 +165,13 @@ class MovieDataSource(AbstractMovieDataSource):
 
     def __init__(self) -> None:
         self.imdb_ds = IMDbDataSet(debug=True)
-        self.imdb_scraper = IMDbScraper()
+        # re-runs of the imports replay cached responses
+        self.imdb_scraper = IMDbScraper(cache=ResponseCache(IMDB_RESPONSES))
         self.tmdb_scraper = TMDbScraper(
             api_key=settings.TMDB_APIKEY,
-            proxy=settings.PROXY,
+            proxy=[p.strip() for p in settings.PROXY.split(",") if p.strip()],
+            cache_dir=TMDB_CACHE_DIR,
+            cache=ResponseCache(TMDB_RESPONSES),
         )
 
         self.imdb_genres = {g.name_en: g for g in self.get_genres()}
@@ -166,6 +179,12 @@ class MovieDataSource(AbstractMovieDataSource):
         self.countries = {c.iso: c for c in self.get_countries()}
         self.content_types = {mt.imdb_name: mt for mt in self.get_content_types()}
 
+    async def close(self) -> None:
+        """Close connections of the scrapers"""
+
+        await self.imdb_scraper.close()
+        await self.tmdb_scraper.close()
+
     def get_countries(self) -> list[CountrySourceDM]:
         return [
             CountrySourceDM(
@@ -200,6 +219,14 @@ class MovieDataSource(AbstractMovieDataSource):
     async def get_imdb_movies(self, amount: int) -> list[IMDbMovieSourceDM]:
         return [self.prepare_imdb(m) for m in self.imdb_ds.get_movies(amount)]
 
+    async def get_imdb_movies_delta(self, amount: int) -> Delta:
+        """Movies changed since the last committed delta"""
+
+        delta = self.imdb_ds.get_movies_delta(amount)
+        delta.inserted = [self.prepare_imdb(m) for m in delta.inserted]
+        delta.updated = [self.prepare_imdb(m) for m in delta.updated]
+        return delta
+
     async def get_tmdb_movie(self, imdb_mvid: str) -> TMDbMovieSourceDM | None:
         try:
             return self.prepare_tmdb(await self.tmdb_scraper.get_movie(imdb_mvid))
@@ -210,6 +237,23 @@ class MovieDataSource(AbstractMovieDataSource):
         except TMDbRequestError as ex:
             print(ex)
 
+    async def get_tmdb_movies(
+        self,
+        imdb_mvids: list[str],
+    ) -> AsyncGenerator[tuple[str, TMDbMovieSourceDM | TMDbMovieError], None]:
+        """
+        Movies of unique ids, yielded as soon as they are fetched:
+        (imdb_mvid, movie or TMDbMovieError with the error category)
+        """
+
+        async for imdb_mvid, movie in self.tmdb_scraper.get_movies(imdb_mvids):
+            if not isinstance(movie, TMDbMovieError):
+                try:
+                    movie = self.prepare_tmdb(movie)
+                except (KeyError, TypeError, ValidationError) as error:
+                    movie = TMDbMovieError(imdb_mvid, TMDbMovieError.PARSE, error)
+            yield imdb_mvid, movie
+
     async def get_imdb_movie_extra(
         self, imdb_mvid: str
     ) -> IMDbMovieExtraInfoSourceDM | None:
@@ -217,6 +261,10 @@ class MovieDataSource(AbstractMovieDataSource):
         return IMDbMovieExtraInfoSourceDM(
             imdb_mvid=extra.imdb_mvid,
             image_url=extra.image_url,
+            image_width=extra.image_width,
+            image_height=extra.image_height,
+            plot=extra.plot,
+            content_rating=extra.content_rating,
             error=extra.error,
         )
 
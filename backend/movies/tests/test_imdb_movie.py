@@ -0,0 +1,143 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.append(str(ROOT_DIR))
+sys.path.append(str(ROOT_DIR / "database"))
+sys.path.append(str(ROOT_DIR.parent))
+
+from movies.manager import imdb_movie
+from movies.manager.imdb_movie import IMDbMovieManager, imdb_movies_init
+from movies.source import IMDbMovieSourceDM, ContentTypeSourceDM
+
+MOVIE_TYPE = ContentTypeSourceDM(name_en="Movie", name_ru="Фильм", imdb_name="movie")
+
+
+class FakeSession:
+    async def __aenter__(self) -> "FakeSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class FakeDataBaseAPI:
+    """Movies table, inserts conflicting with stored movies or slugs do nothing"""
+
+    def __init__(self, stored: list[str], taken_slugs: list[str]) -> None:
+        self.stored = {imdb_mvid: i for i, imdb_mvid in enumerate(stored, 1)}
+        self.taken_slugs = set(taken_slugs)
+        self.written: dict[str, dict] = {}
+
+    @property
+    def session(self) -> FakeSession:
+        return FakeSession()
+
+    async def exists(self, table, session, **filters) -> bool:
+        return False
+
+    async def add(self, table, session, _safe_add=False, _commit=True, **data):
+        assert _safe_add
+        if data["imdb_mvid"] in self.stored or data["slug"] in self.taken_slugs:
+            return None
+
+        self.stored[data["imdb_mvid"]] = len(self.stored) + 1
+        self.written[data["imdb_mvid"]] = data
+        return self.stored[data["imdb_mvid"]]
+
+    async def update(self, table, session, filters, _commit=True, **updates):
+        id = self.stored.get(filters["imdb_mvid"])
+        if id is None:
+            return None
+
+        self.written[filters["imdb_mvid"]] = updates
+        return SimpleNamespace(id=id)
+
+    async def badd(self, *args, **kwargs) -> None:
+        pass
+
+
+class FakeSearch:
+    async def __aenter__(self) -> "FakeSearch":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+    async def add_movie(self, movie) -> None:
+        pass
+
+
+class FakeDelta:
+    def __init__(self, inserted: list[IMDbMovieSourceDM]) -> None:
+        self.inserted = inserted
+        self.updated = []
+        self.deleted = []
+        self.committed: list[str] | None = None
+
+    def commit(self, failed=()) -> None:
+        self.committed = [
+            m.imdb_mvid for m in self.inserted if m.imdb_mvid not in failed
+        ]
+
+
+class FakeMovieSource:
+    def __init__(self, delta: FakeDelta) -> None:
+        self.delta = delta
+
+    async def get_imdb_movies_delta(self, amount: int) -> FakeDelta:
+        return self.delta
+
+
+def movie(imdb_mvid: str, name_en: str, votes: int) -> IMDbMovieSourceDM:
+    return IMDbMovieSourceDM(
+        imdb_mvid=imdb_mvid,
+        name_en=name_en,
+        is_adult=False,
+        rate=7.5,
+        votes=votes,
+        start_year=2000,
+        content_type=MOVIE_TYPE,
+    )
+
+
+@pytest.mark.asyncio
+async def test_imdb_movies_init_conflicts(monkeypatch):
+    # tt0000001 is stored before the first delta import,
+    # the slug of tt0000003 is taken by a movie out of the import
+    dbapi = FakeDataBaseAPI(stored=["tt0000001"], taken_slugs=["taken"])
+    delta = FakeDelta(
+        [
+            movie("tt0000001", "Stored", votes=200),
+            movie("tt0000002", "New", votes=100),
+            movie("tt0000003", "Taken", votes=300),
+        ]
+    )
+
+    class Manager(IMDbMovieManager):
+        def __init__(self) -> None:
+            super().__init__(
+                movie_source=FakeMovieSource(delta),
+                person_source=None,
+            )
+            self.dbapi = dbapi
+            self.search = FakeSearch()
+
+        async def _initialize(self) -> None:
+            self.content_types = {"movie": SimpleNamespace(id=1)}
+            self.genres = {}
+            self.created_imdbs = set()
+            self.initialized = True
+
+    monkeypatch.setattr(imdb_movie, "IMDbMovieManager", Manager)
+    await imdb_movies_init()
+
+    # stored movie is updated instead of a silent conflict
+    assert dbapi.written["tt0000001"]["votes"] == 200
+    assert dbapi.written["tt0000002"]["votes"] == 100
+    # not written movie has no fingerprint, the next import retries it
+    assert "tt0000003" not in dbapi.written
+    assert delta.committed == ["tt0000001", "tt0000002"]
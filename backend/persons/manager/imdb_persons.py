@@ -3,7 +3,6 @@ import asyncio
 from typing import Any
 from pathlib import Path
 from pydantic import BaseModel
-from tqdm.asyncio import tqdm_asyncio
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.attributes import InstrumentedAttribute
@@ -19,7 +18,7 @@ sys.path.append(str(PROJ_DIR.parent))
 from backend.settings import settings
 from database.api import ExceptionToHandle
 from database.manager import AbstractMovieDataSource, AbstractPersonDataSource
-from database.manager import DataBaseManagerOnInit, PersonSearchDM
+from database.manager import DataBaseManagerOnInit, PersonSearchDM, WorkerPool
 from movies.orm import IMDbMovieORM
 from persons.orm import BaseORM
 from movies.manager.imdb_movie import IMDbMovieManager
@@ -33,6 +32,11 @@ from services.imdb.dataset import IMDbDataSet
 from persons.source import PersonDataSource, IMDbPersonSourceDM
 from movies.source import MovieDataSource
 
+# batches of persons stored at once, the next ones are parsed meanwhile
+BATCH_WORKERS = 4
+# batches retried with fresh slugs when a slug is taken meanwhile
+SLUG_TRIES = 3
+
 
 class IMDbPersonManager(DataBaseManagerOnInit):
     ORM = IMDbPersonORM
@@ -53,6 +57,8 @@ class IMDbPersonManager(DataBaseManagerOnInit):
 
         semlimit = (settings.PG_POOL_SIZE + settings.PG_MAX_OVERFLOW) // 2
         self.semaphore = asyncio.Semaphore(semlimit)
+        # batches must not pick the same slugs
+        self.slug_lock = asyncio.Lock()
 
         self.initialized = False
         self.current_nmids = set()
@@ -132,6 +138,89 @@ class IMDbPersonManager(DataBaseManagerOnInit):
                     )
                     await self.add_professions(person_sdm, person_id, session)
 
+    async def create_slugs(
+        self,
+        persons: list[IMDbPersonSourceDM],
+        session: AsyncSession,
+    ) -> list[str]:
+        """Slugs taken in the database are checked by one query"""
+
+        async with self.slug_lock:
+            slugs = [self.slugger.initiate_slug(p.name_en) for p in persons]
+            taken = await self.dbapi.bget(
+                IMDbPersonORM,
+                session,
+                [IMDbPersonORM.slug],
+                filters={"slug": slugs},
+            )
+            taken = {t.slug for t in taken}
+
+            return [
+                (
+                    await self.slugger.create_slug(IMDbPersonORM, session, slug)
+                    if slug in taken
+                    else slug
+                )
+                for slug in slugs
+            ]
+
+    async def badd(self, persons: list[IMDbPersonSourceDM]) -> None:
+        """
+        Persons of the batch are inserted by one statement, ids of
+        the inserted and existing ones come back with at most one more.
+        Only inserted persons get professions and are indexed.
+        """
+
+        async with self.semaphore:
+            for tries in range(SLUG_TRIES):
+                try:
+                    return await self._badd(persons)
+                except IntegrityError as error:
+                    # slug taken by another writer, fresh slugs are picked
+                    if "slug" not in str(error.orig) or tries == SLUG_TRIES - 1:
+                        raise
+
+    async def _badd(self, persons: list[IMDbPersonSourceDM]) -> None:
+        async with self.dbapi.session as session:
+            slugs = await self.create_slugs(persons, session)
+            ids, inserted = await self.dbapi.bgoc(
+                IMDbPersonORM,
+                session,
+                ["imdb_nmid"],
+                data=[{"slug": slug, **p.to_db()} for p, slug in zip(persons, slugs)],
+                _commit=False,
+                _inserted=True,
+            )
+
+            professions = []
+            new_persons = []
+            for person_sdm in persons:
+                if person_sdm.imdb_nmid not in inserted:
+                    continue
+
+                person_id = ids[person_sdm.imdb_nmid]
+                new_persons.append(
+                    PersonSearchDM(id=person_id, name_en=person_sdm.name_en)
+                )
+                for profession in person_sdm.professions:
+                    profession = self.professions.get(profession.imdb_name.lower())
+                    if profession is not None:
+                        professions.append(
+                            {"profession_id": profession.id, "person_id": person_id}
+                        )
+
+            await self.dbapi.badd(
+                PersonProfessionORM,
+                session,
+                _safe_add=True,
+                data=professions,
+            )
+            await session.commit()
+
+        # indexed once stored
+        for person in new_persons:
+            await self.search.add_person(person)
+
     async def get_persons(
         self,
         page: int = 1,
@@ -190,11 +279,18 @@ async def imdb_persons_init():
             principals_added=False,
         )
 
-    persons = await person_ds.get_imdb_persons([m.imdb_mvid for m in imdbs])
+    # the next batch of persons is parsed only when the pool queue
+    # has room for it
+    persons = person_ds.iter_imdb_persons([m.imdb_mvid for m in imdbs])
     async with manager as imanager:
         async with imanager.search:
-            tasks = [asyncio.create_task(imanager.add(p)) for p in persons]
-            await tqdm_asyncio.gather(*tasks)
+            pool = WorkerPool(
+                imanager.badd, workers=BATCH_WORKERS, desc="person batches"
+            )
+            stats = await pool.run(
+                batch async for chunk in persons for batch in imanager.batching(chunk)
+            )
+    print(f"IMDb person batches: {stats}")
 
 
 async def reindex_persons():
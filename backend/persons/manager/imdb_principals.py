@@ -2,8 +2,8 @@ import sys
 import asyncio
 from functools import wraps
 from pathlib import Path
-from tqdm.asyncio import tqdm_asyncio
 from pydantic import BaseModel
+from sqlalchemy import update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -14,7 +14,7 @@ sys.path.append(str(PROJ_DIR))
 sys.path.append(str(PROJ_DIR.parent))
 
 from backend.settings import settings
-from database.api import ExceptionToHandle
+from database.api import ExceptionToHandle, PARAMS_LIMIT
 from movies.orm import IMDbMovieORM
 from movies.manager.imdb_movie import IMDbMovieManager
 from persons.orm import MoviePrincipalORM, IMDbPersonORM, ProfessionORM
@@ -25,8 +25,12 @@ from database.manager import (
     DataBaseManager,
     AbstractMovieDataSource,
     AbstractPersonDataSource,
+    WorkerPool,
 )
 
+# batches of principals stored at once, the next ones are parsed meanwhile
+BATCH_WORKERS = 4
+
 
 class IMDbMoviePrincipalManager(DataBaseManager):
     ORM = MoviePrincipalORM
@@ -137,6 +141,85 @@ class IMDbMoviePrincipalManager(DataBaseManager):
                 )
                 await self.mark_up(movie_id, session)
 
+    async def badd(self, principals: list[IMDbPrincipalSourceDM]) -> None:
+        """
+        Ids of the batch are looked up by one query per table (and
+        parameters limit page), the principals are copied at once
+        """
+
+        async with self.semaphore:
+            async with self.dbapi.session as session:
+                movie_ids = await self.get_ids(
+                    IMDbMovieORM.imdb_mvid,
+                    {p.imdb_movie for p in principals},
+                    session,
+                )
+                person_ids = await self.get_ids(
+                    IMDbPersonORM.imdb_nmid,
+                    {p.imdb_person for p in principals},
+                    session,
+                )
+                category_ids = await self.get_ids(
+                    ProfessionORM.imdb_name,
+                    {p.category.imdb_name for p in principals if p.category},
+                    session,
+                )
+
+                rows = []
+                for principal in principals:
+                    movie_id = movie_ids.get(principal.imdb_movie)
+                    person_id = person_ids.get(principal.imdb_person)
+                    category_id = (
+                        category_ids.get(principal.category.imdb_name)
+                        if principal.category
+                        else None
+                    )
+                    if movie_id and person_id and category_id:
+                        rows.append(
+                            {
+                                "imdb_movie_id": movie_id,
+                                "imdb_person_id": person_id,
+                                "category_id": category_id,
+                                **principal.to_db(),
+                            }
+                        )
+
+                await self.dbapi.bcopy(
+                    MoviePrincipalORM,
+                    session,
+                    data=rows,
+                    _commit=False,
+                )
+                movie_ids = list({r["imdb_movie_id"] for r in rows})
+                for i in range(0, len(movie_ids), PARAMS_LIMIT):
+                    query = update(IMDbMovieORM).where(
+                        IMDbMovieORM.id.in_(movie_ids[i : i + PARAMS_LIMIT])
+                    )
+                    await session.execute(query.values(principals_added=True))
+                await session.commit()
+
+    async def get_ids(
+        self,
+        attribute,
+        values: set[str],
+        session: AsyncSession,
+    ) -> dict[str, int]:
+        """{value: id}, looked up in pages under the parameters limit"""
+
+        table = attribute.class_
+        values = list(values)
+
+        ids = {}
+        for i in range(0, len(values), PARAMS_LIMIT):
+            rows = await self.dbapi.bget(
+                table,
+                session,
+                [table.id, attribute],
+                filters={attribute.key: values[i : i + PARAMS_LIMIT]},
+            )
+            ids.update({value: id for id, value in rows})
+        return ids
+
 
 async def movie_principals_init():
     manager = IMDbMoviePrincipalManager()
@@ -151,12 +234,14 @@ async def movie_principals_init():
             principals_added=False,
         )
 
-    principals = await manager.person_source.get_imdb_principals(
+    # the next batch of principals is parsed only when the pool queue
+    # has room for it
+    principals = manager.person_source.iter_imdb_principals(
         imdb_mvids=[m.imdb_mvid for m in imdbs]
     )
-
-    tasks = [asyncio.create_task(manager.add(p)) for p in principals]
-    await tqdm_asyncio.gather(*tasks)
+    pool = WorkerPool(manager.badd, workers=BATCH_WORKERS, desc="principal batches")
+    stats = await pool.run(principals)
+    print(f"IMDb principal batches: {stats}")
 
 
 if __name__ == "__main__":
@@ -1,12 +1,14 @@
 import sys
 import asyncio
 from datetime import datetime
+from typing import AsyncGenerator
 from pathlib import Path
 
 PROJ_DIR = Path(__file__).parent.parent.parent
 sys.path.append(str(PROJ_DIR))
 
 from backend.database.manager import SourceDataModel, AbstractPersonDataSource
+from backend.database.manager import iter_in_thread
 from services.person_professions import professions
 from services.imdb.dataset import IMDbDataSet
 from services.models import IMDbPrincipalServiceDM, IMDbPersonServiceDM
@@ -133,6 +135,28 @@ class PersonDataSource(AbstractPersonDataSource):
         _, persons = self.imdb_ds.get_movie_crew(imdb_mvids)
         return [self.prepare_person(p) for p in persons]
 
+    async def iter_imdb_principals(
+        self,
+        imdb_mvids: list[str],
+    ) -> AsyncGenerator[list[IMDbPrincipalSourceDM], None]:
+        principals = self.imdb_ds.iter_principals(imdb_mvids)
+        async for batch in iter_in_thread(principals):
+            yield [self.prepare_principal(p) for p in batch]
+
+    async def iter_imdb_persons(
+        self,
+        imdb_mvids: list[str],
+    ) -> AsyncGenerator[list[IMDbPersonSourceDM], None]:
+        imdb_nmids = await asyncio.to_thread(
+            self.imdb_ds.get_principal_nmids, imdb_mvids
+        )
+        if not len(imdb_nmids):
+            return
+
+        persons = self.imdb_ds.iter_persons(imdb_nmids)
+        async for batch in iter_in_thread(persons):
+            yield [self.prepare_person(p) for p in batch]
+
 
 async def test():
     ds = PersonDataSource()
@@ -40,6 +40,7 @@ class Settings(BaseSettings):
     MEDIA_DIR: str
 
     TMDB_APIKEY: str
+    # comma separated proxies of the pool
     PROXY: str
 
     TMDB_MAX_RATE: int
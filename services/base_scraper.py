@@ -1,14 +1,59 @@
 import re
-from datetime import datetime
-from typing import Awaitable
-
-from aiolimiter import AsyncLimiter
-from aiohttp import ClientResponse, ClientSession, BasicAuth, ClientProxyConnectionError
+import sys
+import time
+import random
+import asyncio
+from datetime import datetime, timezone
+from typing import Any
+from pathlib import Path
+from email.utils import parsedate_to_datetime
+
+from aiohttp import (
+    ClientResponse,
+    ClientSession,
+    BasicAuth,
+    ClientConnectionError,
+    ClientHttpProxyError,
+    ClientProxyConnectionError,
+    TCPConnector,
+)
+
+sys.path.append(str(Path(__file__).parent.parent))
+from services.response_cache import ResponseCache, DEFAULT_TTL
+from services.scraper_metrics import ScraperMetrics, endpoint
 
 
 PROXY_RX = re.compile(r"(https?://)?(\d{1,3}\.){3}\d{1,3}:\d{2,5}@[\d\w]+:[\d\w]+")
 
-MAX_TRIES = 3
+MAX_TRIES = 5
+
+# responses of an overloaded upstream, the request is retried
+RETRY_STATUSES = {429, 503}
+# jittered exponential backoff between tries, seconds
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+
+# AIMD: the rate is halved on overload, every success adds a share of the ceiling
+RATE_DECREASE = 0.5
+RATE_INCREASE = 0.02
+MIN_RATE_SHARE = 0.05
+
+# proxy health: moving averages of latency and errors, consecutive
+# connection failures quarantine a proxy for a doubling time
+HEALTH_SMOOTHING = 0.2
+MIN_LATENCY = 0.05
+QUARANTINE_AFTER = 3
+QUARANTINE_TIME = 30
+QUARANTINE_MAX = 600
+# failures of a proxy: unreachable or refusing to forward,
+# other connection errors are failures of the upstream, they are retried
+PROXY_ERRORS = (ClientProxyConnectionError, ClientHttpProxyError)
+
+# connection pool of the shared session
+CONNECTIONS_LIMIT = 100
+CONNECTIONS_PER_HOST = 20
+KEEPALIVE_TIMEOUT = 30
+DNS_CACHE_TTL = 300
 
 
 class WrongProxyStructure(Exception):
@@ -19,53 +64,307 @@ class NotWorkingProxy(Exception):
     pass
 
 
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After header: delay in seconds or HTTP date"""
+
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+def backoff(attempt: int) -> float:
+    """Full jitter: uniform delay up to the exponential bound"""
+
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+class AdaptiveLimiter:
+    """
+    Rate limiter with AIMD feedback from the upstream.
+    Requests are spaced by period / rate. throttle() halves the rate and
+    pauses requests for Retry-After, success() adds a share of max_rate,
+    so the rate probes back up to the ceiling.
+    """
+
+    def __init__(self, max_rate: float, rate_period: float = 1) -> None:
+        self.max_rate = max_rate
+        self.rate_period = rate_period
+        self.min_rate = max_rate * MIN_RATE_SHARE
+
+        self.rate = float(max_rate)
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    async def acquire(self) -> None:
+        # slots are reserved without awaiting, so concurrent tasks queue up
+        now = time.monotonic()
+        slot = max(now, self._next_slot, self._paused_until)
+        self._next_slot = slot + self.rate_period / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate * RATE_INCREASE)
+
+    def throttle(self, retry_after: float | None = None) -> None:
+        now = time.monotonic()
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+        # responses of requests sent at the old rate decrease it only once
+        if now - self._last_decrease >= self.rate_period:
+            self.rate = max(self.min_rate, self.rate * RATE_DECREASE)
+            self._last_decrease = now
+
+    @property
+    def available_at(self) -> float:
+        """Monotonic time of the next free slot"""
+        return max(self._next_slot, self._paused_until)
+
+
+class Proxy:
+    """
+    Route of requests: a proxy or the direct connection (url None)
+    with its own rate limiter and health score.
+    """
+
+    def __init__(
+        self,
+        url: str | None,
+        auth: BasicAuth | None,
+        max_rate: float,
+        rate_period: float = 1,
+    ) -> None:
+        self.url = url
+        self.auth = auth
+        self.limiter = AdaptiveLimiter(max_rate, rate_period)
+
+        self.latency = MIN_LATENCY
+        self.error_rate = 0.0
+        self.failures = 0
+        self.quarantines = 0
+        self.quarantined_until = 0.0
+
+    def __repr__(self) -> str:
+        return f"Proxy({self.url or 'direct'}, weight={self.weight:.2f})"
+
+    @property
+    def quarantined(self) -> bool:
+        return time.monotonic() < self.quarantined_until
+
+    @property
+    def weight(self) -> float:
+        """Share of requests: faster, more reliable and less throttled proxies"""
+
+        if self.quarantined:
+            return 0.0
+        health = (1 - self.error_rate) * MIN_LATENCY / max(self.latency, MIN_LATENCY)
+        return health * self.limiter.rate / self.limiter.max_rate
+
+    async def acquire(self) -> None:
+        delay = self.quarantined_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.limiter.acquire()
+
+    def success(self, latency: float) -> None:
+        self.latency += HEALTH_SMOOTHING * (latency - self.latency)
+        self.error_rate -= HEALTH_SMOOTHING * self.error_rate
+        self.failures = 0
+        self.quarantines = 0
+        self.limiter.success()
+
+    def failure(self) -> None:
+        self.error_rate += HEALTH_SMOOTHING * (1 - self.error_rate)
+        self.failures += 1
+
+        # a released proxy failing again is quarantined for longer
+        if self.failures >= QUARANTINE_AFTER:
+            time_ = min(QUARANTINE_MAX, QUARANTINE_TIME * 2**self.quarantines)
+            self.quarantined_until = time.monotonic() + time_
+            self.quarantines += 1
+
+
+class ProxyPool:
+    """
+    Requests are spread over proxies by weight: of two proxies drawn by
+    weight, the one with the earlier free slot is taken. While every proxy
+    is quarantined, the first one to be released is taken.
+    """
+
+    def __init__(self, proxies: list[Proxy]) -> None:
+        if not proxies:
+            raise ValueError("Proxy pool should contain proxies")
+        self.proxies = proxies
+
+    def __len__(self) -> int:
+        return len(self.proxies)
+
+    @property
+    def healthy(self) -> list[Proxy]:
+        return [p for p in self.proxies if not p.quarantined]
+
+    def choose(self) -> Proxy:
+        weights = [p.weight for p in self.proxies]
+        if not any(weights):
+            return min(self.proxies, key=lambda p: p.quarantined_until)
+
+        candidates = random.choices(self.proxies, weights, k=2)
+        return min(candidates, key=lambda p: p.limiter.available_at)
+
+
 class BaseScraper:
     """
-    max_rate: maximum requests per rate_period
+    proxy: proxy or list of proxies like '154.195.18.33:63004@GFNau6gw:9J9siqgu',
+    None - direct connection. Requests are spread over the proxy pool,
+    failing proxies are quarantined and their requests retried on others.
+    max_rate: maximum requests per rate_period of every proxy, the rate
+    is lowered while the upstream answers 429/503 and restored afterwards
     rate_period: period in seconds (default 1 second)
+    limit_per_host: open connections to a single host
+
+    Requests share one session, so connections are kept alive and reused.
+    The session is opened on the first request and closed by close()
+    or on exit of `async with scraper:`.
+
+    cache: extracted successful responses are stored and replayed,
+    cacheable() rejects invalid ones, the cache is used off the event loop,
+    CACHE_TTLS - TTL by url pattern, CACHE_HEADERS - headers of the key
+    metrics: metrics of requests, may be shared by scrapers
     """
 
+    CACHE_TTLS: dict[str, float] = {}
+    CACHE_HEADERS: tuple[str, ...] = ("accept-language",)
+
     def __init__(
         self,
-        proxy: str = None,
+        proxy: str | list[str] | None = None,
         max_rate: int = 49,
         rate_period: float = 1,
         debug: bool = False,
+        limit_per_host: int = CONNECTIONS_PER_HOST,
+        cache: ResponseCache | None = None,
+        metrics: ScraperMetrics | None = None,
     ) -> None:
-        self.rate_limit = AsyncLimiter(max_rate, rate_period)
+        self.metrics = metrics if metrics is not None else ScraperMetrics()
+        self.proxies = self._get_proxy_pool(proxy, max_rate, rate_period)
+        # limiter of the first route, the only one without proxies
+        self.rate_limit = self.proxies.proxies[0].limiter
+        self.cache = cache
+
+        self.limit_per_host = limit_per_host
+        self._session: ClientSession | None = None
+        self._session_loop: asyncio.AbstractEventLoop | None = None
 
         self._headers = {}
         self._set_headers()
 
         self._debug = debug
 
-        self._proxy_url = None
-        self._proxy_auth = None
-        if proxy:
-            proxy_url, proxy_username, proxy_password = self._get_proxy_data(
-                proxy,
-            )
-
-            self._proxy_url = proxy_url
-            self._proxy_auth = BasicAuth(
-                login=proxy_username,
-                password=proxy_password,
-            )
-
     @classmethod
     async def new(
         cls,
-        proxy: str = None,
+        proxy: str | list[str] | None = None,
         max_rate: int = 49,
         rate_period: float = 1,
         debug: bool = False,
     ) -> "BaseScraper":
         self = BaseScraper(proxy, max_rate, rate_period, debug)
 
-        await self._check_proxy()
+        try:
+            await self._check_proxy()
+        except NotWorkingProxy:
+            await self.close()
+            raise
+
+        return self
 
+    async def __aenter__(self) -> "BaseScraper":
+        self.get_session()
         return self
 
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        await self.close()
+        return False
+
+    def get_session(self) -> ClientSession:
+        """Shared session, bound to the running event loop"""
+
+        loop = asyncio.get_running_loop()
+        # a session of a finished loop can't be used, its connections are gone
+        expired = self._session is None or self._session.closed
+        if expired or self._session_loop is not loop:
+            connector = TCPConnector(
+                limit=CONNECTIONS_LIMIT,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=DNS_CACHE_TTL,
+            )
+            self._session = ClientSession(connector=connector)
+            self._session_loop = loop
+
+        return self._session
+
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._session_loop is loop:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+        if self.cache is not None:
+            self.cache.flush()
+
+    def cache_key(self, url: str) -> str:
+        headers = {k.lower(): v for k, v in self._headers.items()}
+        return ResponseCache.key(
+            url,
+            {k: headers[k] for k in self.CACHE_HEADERS if k in headers},
+        )
+
+    def cache_ttl(self, url: str) -> float:
+        for pattern, ttl in self.CACHE_TTLS.items():
+            if re.search(pattern, url):
+                return ttl
+        return DEFAULT_TTL
+
+    def _get_proxy_pool(
+        self,
+        proxies: str | list[str] | None,
+        max_rate: float,
+        rate_period: float,
+    ) -> ProxyPool:
+        if isinstance(proxies, str):
+            proxies = [proxies]
+
+        proxies = [p for p in proxies or [] if p]
+        if not proxies:
+            return ProxyPool([Proxy(None, None, max_rate, rate_period)])
+
+        pool = []
+        for proxy in proxies:
+            proxy_url, proxy_username, proxy_password = self._get_proxy_data(proxy)
+            auth = BasicAuth(login=proxy_username, password=proxy_password)
+            pool.append(Proxy(proxy_url, auth, max_rate, rate_period))
+        return ProxyPool(pool)
+
     def _get_proxy_data(self, proxy: str) -> tuple[str, str, str]:
         self._check_proxy_structure(proxy)
 
@@ -85,32 +384,30 @@ class BaseScraper:
                 "Should be like '154.195.18.33:63004@GFNau6gw:9J9siqgu' this"
             )
 
-    async def _check_proxy(self) -> bool:
-        URL = "https://example.com/"
+    async def _check_proxy(self, url: str = "https://example.com/") -> None:
+        """Not working proxies are quarantined, raises if none works"""
 
-        try:
-            async with ClientSession() as session:
-                async with session.request(
+        async def check(proxy: Proxy) -> bool:
+            try:
+                async with self.get_session().request(
                     method="get",
-                    url=URL,
-                    proxy=self._proxy_url,
-                    proxy_auth=self._proxy_auth,
+                    url=url,
+                    proxy=proxy.url,
+                    proxy_auth=proxy.auth,
                     headers=self._headers,
-                ) as response:
-                    return await self.extractor(response)
-
-        except ClientProxyConnectionError as ex:
+                ):
+                    return True
+            except PROXY_ERRORS:
+                for _ in range(QUARANTINE_AFTER):
+                    proxy.failure()
+                return False
+            except ClientConnectionError:
+                return False
+
+        working = await asyncio.gather(*[check(p) for p in self.proxies.proxies])
+        if not any(working):
             raise NotWorkingProxy("Proxy may have expired")
 
-    def _request_limiter(coro: Awaitable):
-        async def wrapper(self, *args, **kwargs):
-            rate_limit: AsyncLimiter = self.rate_limit
-            async with rate_limit:
-                output = await coro(self, *args, **kwargs)
-                return output
-
-        return wrapper
-
     @property
     def custom_headers(self) -> dict:
         return {}
@@ -125,24 +422,94 @@ class BaseScraper:
     async def extractor(self, response: ClientResponse):
         return await response.text()
 
-    @_request_limiter
-    async def request(self, url: str):
-        if self._debug:
-            print(datetime.now().strftime("%H-%M-%S"), url)
+    def cacheable(self, url: str, data: Any) -> bool:
+        """Extracted data of a successful response is cached, empty data is not"""
+
+        return bool(data)
 
-        tries = 3
-        while tries:
+    async def request(self, url: str) -> Any:
+        """
+        Cached responses are returned without requests.
+        Overloaded responses (429, 503) are retried with jittered backoff
+        after Retry-After, the last one is passed to the extractor.
+        Requests failed by a proxy are retried through other proxies,
+        dropped connections of the upstream are retried on any route.
+        """
+
+        with self.metrics.track(type(self).__name__, endpoint(url)) as record:
+            if self.cache is not None:
+                hit, data = await asyncio.to_thread(self.cache.get, self.cache_key(url))
+                if hit:
+                    record["cached"] = True
+                    return data
+
+            if self._debug:
+                print(datetime.now().strftime("%H-%M-%S"), url)
+
+            return await self._request(url, record)
+
+    async def _request(self, url: str, record: dict) -> Any:
+        def timer(stage: str):
+            return self.metrics.timer(record["scraper"], record["endpoint"], stage)
+
+        for attempt in range(MAX_TRIES):
+            last_try = attempt == MAX_TRIES - 1
+            record["tries"] = attempt + 1
+
+            with timer("limiter"):
+                proxy = self.proxies.choose()
+                await proxy.acquire()
+            start = time.monotonic()
             try:
-                tries -= 1
-                async with ClientSession() as session:
-                    async with session.request(
-                        method="get",
-                        url=url,
-                        proxy=self._proxy_url,
-                        proxy_auth=self._proxy_auth,
-                        headers=self._headers,
-                    ) as response:
-                        return await self.extractor(response)
-
-            except ClientProxyConnectionError as ex:
-                print(ex)
+                async with self.get_session().request(
+                    method="get",
+                    url=url,
+                    proxy=proxy.url,
+                    proxy_auth=proxy.auth,
+                    headers=self._headers,
+                ) as response:
+                    # the body is kept by the response, the extractor only parses it
+                    record["bytes"] += len(await response.read())
+                    record["status"] = response.status
+                    self.metrics.observe(
+                        record["scraper"],
+                        record["endpoint"],
+                        "network",
+                        time.monotonic() - start,
+                    )
+
+                    if response.status not in RETRY_STATUSES:
+                        proxy.success(time.monotonic() - start)
+                        with timer("extract"):
+                            data = await self.extractor(response)
+                        if (
+                            self.cache is not None
+                            and response.ok
+                            and self.cacheable(url, data)
+                        ):
+                            await asyncio.to_thread(
+                                self.cache.set,
+                                self.cache_key(url),
+                                data,
+                                self.cache_ttl(url),
+                            )
+                        return data
+
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    proxy.limiter.throttle(retry_after)
+                    if last_try:
+                        with timer("extract"):
+                            return await self.extractor(response)
+
+            except PROXY_ERRORS as ex:
+                proxy.failure()
+                if last_try:
+                    raise NotWorkingProxy(f"{MAX_TRIES} tries failed: {url}") from ex
+
+            except ClientConnectionError:
+                if last_try:
+                    raise
+
+            if not last_try:
+                with timer("backoff"):
+                    await asyncio.sleep(backoff(attempt))
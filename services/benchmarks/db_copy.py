@@ -0,0 +1,104 @@
+"""Rows per second of bulk inserts: INSERT ... VALUES batches vs COPY.
+
+Needs the PostgreSQL of the backend settings (PG_* of .env), a scratch
+table shaped like movie_principal is created and dropped.
+
+Usage: python services/benchmarks/db_copy.py [rows]
+"""
+
+import sys
+import time
+import random
+import asyncio
+from pathlib import Path
+
+from sqlalchemy import String, ARRAY, UniqueConstraint
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+BACKEND_DIR = Path(__file__).parent.parent.parent / "backend"
+sys.path.append(str(BACKEND_DIR))
+sys.path.append(str(BACKEND_DIR / "database"))
+from database.core import engine, session_factory
+from database.api import DataBaseAPI
+from database.manager import MAX_BATCH_SIZE
+
+DEFAULT_ROWS = 200_000
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class BenchPrincipalORM(Base):
+    __tablename__ = "bench_copy_principal"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    imdb_movie_id: Mapped[int]
+    imdb_person_id: Mapped[int]
+    category_id: Mapped[int | None]
+    ordering: Mapped[int]
+    job: Mapped[str | None]
+    characters: Mapped[list[str]] = mapped_column(ARRAY(String), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("imdb_movie_id", "imdb_person_id", "category_id"),
+    )
+
+
+def make_rows(rows: int) -> list[dict]:
+    return [
+        {
+            "imdb_movie_id": i // 10,
+            "imdb_person_id": random.randrange(10**7),
+            "category_id": i % 10,
+            "ordering": i % 10,
+            "job": random.choice([None, "director", "writer"]),
+            "characters": [f"Character {i}"],
+        }
+        for i in range(rows)
+    ]
+
+
+async def reset() -> None:
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+
+async def insert_values(dbapi: DataBaseAPI, rows: list[dict]) -> None:
+    async with session_factory() as session:
+        for i in range(0, len(rows), MAX_BATCH_SIZE):
+            batch = rows[i : i + MAX_BATCH_SIZE]
+            await dbapi.badd(BenchPrincipalORM, session, _safe_add=True, data=batch)
+
+
+async def copy(dbapi: DataBaseAPI, rows: list[dict]) -> None:
+    async with session_factory() as session:
+        await dbapi.bcopy(BenchPrincipalORM, session, data=rows)
+
+
+async def measure(name: str, insert, rows: list[dict]) -> None:
+    await reset()
+    dbapi = DataBaseAPI()
+
+    start = time.perf_counter()
+    await insert(dbapi, rows)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>6}: {len(rows) / elapsed:,.0f} rows/s")
+
+
+async def main(rows: int) -> None:
+    data = make_rows(rows)
+    print(f"{rows} rows")
+
+    try:
+        await measure("badd", insert_values, data)
+        await measure("bcopy", copy, data)
+    finally:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS))
@@ -0,0 +1,91 @@
+"""get_akas reduction: per-region scans vs single pass, by number of regions.
+
+Usage: python services/benchmarks/imdb_akas.py [rows]
+"""
+
+import sys
+import time
+import random
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.imdb.dataset import IMDbDataSet, CHUNKSIZE
+from services.imdb.notation import AKAS
+
+DEFAULT_ROWS = 5_000_000
+REGIONS = ["US", "RU", "GB", "DE", "FR", "JP", "IT", "ES"]
+TYPES = ["imdbDisplay", "original", "alternative", None]
+
+
+def make_chunks(rows: int) -> list[pd.DataFrame]:
+    """Synthetic parsed title.akas chunks"""
+
+    ids = np.arange(rows) // 8
+    data = pd.DataFrame(
+        {
+            AKAS.TCONST: [f"tt{i:07d}" for i in ids],
+            AKAS.TITLE: [f"title {i}" for i in range(rows)],
+            AKAS.REGION: np.random.choice(REGIONS + [None], rows),
+            AKAS.TYPES: np.random.choice(np.array(TYPES, dtype=object), rows),
+        }
+    )
+    return [data[i : i + CHUNKSIZE] for i in range(0, rows, CHUNKSIZE)]
+
+
+def legacy(chunks: list[pd.DataFrame], title_regions: list[str]) -> dict:
+    """Previous implementation: a scan and a sort per region"""
+
+    def sort_key(value):
+        if value == "imdbDisplay":
+            return 0
+        else:
+            return 1
+
+    data_by_region = {tr: [] for tr in title_regions}
+    for chunk in chunks:
+        for title_region in title_regions:
+            rchunk = chunk[chunk[AKAS.REGION] == title_region]
+            data_by_region[title_region].append(rchunk)
+
+    for title_region in data_by_region:
+        data_by_region[title_region] = (
+            pd.concat(data_by_region[title_region])
+            .sort_values(by=[AKAS.TYPES], key=lambda x: x.map(sort_key))
+            .drop_duplicates(subset=[AKAS.TCONST])
+            .rename(columns={AKAS.TITLE: title_region})
+        )[[AKAS.TCONST, title_region, AKAS.TYPES]]
+
+    return data_by_region
+
+
+def single_pass(chunks: list[pd.DataFrame], title_regions: list[str]):
+    dataset = IMDbDataSet(debug=False, cache_dir=None)
+
+    # chunks are served as if they were read from the dump
+    def request_data(data_name, chunksize, columns, filters, chunk_filter):
+        return (chunk_filter.filter(chunk) for chunk in chunks)
+
+    dataset._request_data = request_data
+    return dataset.get_akas(title_regions=title_regions)
+
+
+def measure(name: str, build, chunks: list, title_regions: list[str]) -> None:
+    start = time.perf_counter()
+    build(chunks, title_regions)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>12} {len(title_regions)} regions: {elapsed:.2f}s")
+
+
+def main(rows: int) -> None:
+    chunks = make_chunks(rows)
+    for regions in [2, 5, 8]:
+        title_regions = REGIONS[:regions]
+        measure("per-region", legacy, chunks, title_regions)
+        measure("single pass", single_pass, chunks, title_regions)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,107 @@
+"""Peak RSS of get_movie_crew: in-memory join vs streaming semi-join.
+
+Usage: python services/benchmarks/imdb_crew.py [principals rows]
+"""
+
+import sys
+import gzip
+import time
+import random
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.imdb.dataset import IMDbDataSet
+from services.imdb.notation import PRINCIPALS, NAME
+
+DEFAULT_ROWS = 5_000_000
+MOVIES = 10_000
+PRINCIPALS_DUMP = "title.principals.tsv.gz"
+NAME_DUMP = "name.basics.tsv.gz"
+
+
+def make_dumps(directory: Path, rows: int) -> None:
+    """Synthetic title.principals and name.basics dumps"""
+
+    persons = rows // 5
+    categories = ["actor", "actress", "director", "writer", "producer"]
+
+    with gzip.open(directory / PRINCIPALS_DUMP, "wt", compresslevel=1) as file:
+        file.write("\t".join(PRINCIPALS.DTYPES) + "\n")
+        for i in range(rows):
+            file.write(
+                f"tt{i // 10:07d}\t{i % 10 + 1}\tnm{random.randrange(persons):07d}"
+                f'\t{random.choice(categories)}\t\\N\t["{random.randbytes(8).hex()}"]\n'
+            )
+
+    with gzip.open(directory / NAME_DUMP, "wt", compresslevel=1) as file:
+        file.write("\t".join(NAME.DTYPES) + "\n")
+        for i in range(persons):
+            file.write(
+                f"nm{i:07d}\t{random.randbytes(8).hex()}\t{random.randint(1900, 2000)}"
+                f"\t\\N\tactor,producer\ttt0000001,tt0000002\n"
+            )
+
+
+def get_dataset(directory: Path, snapshots: bool) -> IMDbDataSet:
+    dataset = IMDbDataSet(debug=False, cache_dir=directory, snapshots=snapshots)
+    # the dumps are already "downloaded"
+    dumps = {
+        dataset.MAPPER[IMDbDataSet.PRINCIPALS]: directory / PRINCIPALS_DUMP,
+        dataset.MAPPER[IMDbDataSet.NAME]: directory / NAME_DUMP,
+    }
+    dataset.cache.fetch = dumps.get
+    return dataset
+
+
+def crew_in_memory(dataset: IMDbDataSet, imdb_mvids: list[str]) -> tuple:
+    """Whole dumps are loaded and joined in memory"""
+
+    principals = pd.concat(dataset._request_data(IMDbDataSet.PRINCIPALS))
+    principals = principals[principals[PRINCIPALS.TCONST].isin(imdb_mvids)]
+
+    persons = pd.concat(dataset._request_data(IMDbDataSet.NAME))
+    persons = persons[persons[NAME.NCONST].isin(principals[PRINCIPALS.NCONST])]
+    return principals, persons
+
+
+def child(mode: str, directory: Path, rows: int) -> None:
+    imdb_mvids = [f"tt{i:07d}" for i in random.sample(range(rows // 10), MOVIES)]
+
+    start = time.perf_counter()
+    if mode == "in-memory":
+        principals, persons = crew_in_memory(get_dataset(directory, False), imdb_mvids)
+    else:
+        dataset = get_dataset(directory, mode == "snapshot")
+        principals, persons = dataset.get_movie_crew(imdb_mvids)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"{mode:>10}: {len(principals)} principals, {len(persons)} persons,"
+        f" {elapsed:.2f}s, peak RSS {peak:.0f} MB"
+    )
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        make_dumps(Path(tmp), rows)
+        print(f"dumps: {rows} principals, {rows // 5} persons")
+
+        for mode in ["in-memory", "streaming", "snapshot"]:
+            subprocess.run(
+                [sys.executable, __file__, "--child", mode, tmp, str(rows)],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], Path(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,92 @@
+"""Principal models construction: iterrows per row vs vectorized batch.
+
+Usage: python services/benchmarks/imdb_factory.py [rows]
+"""
+
+import sys
+import time
+import random
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.imdb.dataset import IMDbMoviePrincipalsFactory
+from services.imdb.notation import PRINCIPALS
+from services.models import IMDbPrincipalServiceDM
+
+DEFAULT_ROWS = 1_000_000
+CATEGORIES = ["actor", "actress", "director", "writer", "producer", "composer"]
+
+
+def make_principals(rows: int) -> pd.DataFrame:
+    """Synthetic principals frame typed as the parsed dump"""
+
+    characters = np.array(
+        [f'["Character {i}"]' for i in range(1000)]
+        + ['["Himself","Narrator"]', np.nan, np.nan],
+        dtype=object,
+    )
+    return pd.DataFrame(
+        {
+            PRINCIPALS.TCONST: [f"tt{i // 10:07d}" for i in range(rows)],
+            PRINCIPALS.ORDERING: pd.array(np.arange(rows) % 10 + 1, dtype="Int16"),
+            PRINCIPALS.NCONST: [
+                f"nm{random.randrange(10**7):07d}" for _ in range(rows)
+            ],
+            PRINCIPALS.CATEGORY: np.random.choice(CATEGORIES, rows).astype(object),
+            PRINCIPALS.JOB: np.where(np.arange(rows) % 7, None, "screenplay"),
+            PRINCIPALS.CHARACHTERS: np.random.choice(characters, rows),
+        }
+    )
+
+
+def parse_characters(characters: str | None) -> list[str] | None:
+    if not characters:
+        return None
+    characters = characters.removeprefix("[").removesuffix("]")
+    return [
+        c.removeprefix('"').removesuffix('"').strip() for c in characters.split('",')
+    ]
+
+
+def legacy(data: pd.DataFrame) -> list:
+    """Previous row-wise implementation of from_dataframe"""
+
+    models = []
+    for _, series in data.iterrows():
+        row = {k: None if pd.isna(v) else v for k, v in series.items()}
+        models.append(
+            IMDbPrincipalServiceDM(
+                imdb_movie=row[PRINCIPALS.TCONST],
+                imdb_person=row[PRINCIPALS.NCONST],
+                ordering=row[PRINCIPALS.ORDERING],
+                category=row.get(PRINCIPALS.CATEGORY),
+                job=row.get(PRINCIPALS.JOB),
+                characters=parse_characters(row.get(PRINCIPALS.CHARACHTERS)),
+            )
+        )
+    return models
+
+
+def measure(name: str, build, data: pd.DataFrame) -> list:
+    start = time.perf_counter()
+    models = build(data)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>10}: {elapsed:.2f}s, {len(data) / elapsed:,.0f} rows/s")
+    return models
+
+
+def main(rows: int) -> None:
+    data = make_principals(rows)
+    factory = IMDbMoviePrincipalsFactory()
+
+    batch = measure("batch", factory.from_dataframe, data)
+    iterrows = measure("iterrows", legacy, data)
+
+    assert batch == iterrows
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,97 @@
+"""Semi-join of principals chunks: string keys vs encoded ids bitmap.
+
+Usage: python services/benchmarks/imdb_ids.py [principals rows] [keys]
+"""
+
+import sys
+import time
+import random
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.imdb.dataset import KeyFilter, key_index, CHUNKSIZE
+from services.imdb.cache import LookupStore
+from services.imdb.notation import PRINCIPALS
+
+DEFAULT_ROWS = 5_000_000
+DEFAULT_KEYS = 1_000_000
+PERSONS = 15_000_000
+
+
+class StringKeyFilter(KeyFilter):
+    """Previous implementation: hashed index of key strings"""
+
+    def __init__(self, column: str, keys) -> None:
+        self.column = column
+        self.ids = None
+        self.index = key_index(keys)
+
+
+def make_chunks(rows: int) -> list[pd.DataFrame]:
+    """nconst column of principals, split as the parsed dump"""
+
+    nconsts = np.array(
+        [f"nm{random.randrange(PERSONS):07d}" for _ in range(rows)],
+        dtype=object,
+    )
+    return [
+        pd.DataFrame({PRINCIPALS.NCONST: nconsts[i : i + CHUNKSIZE]})
+        for i in range(0, rows, CHUNKSIZE)
+    ]
+
+
+def key_size(key_filter: KeyFilter) -> float:
+    """Memory of the key set: strings and their hash table or the bitmap"""
+
+    if key_filter.ids is not None:
+        return key_filter.ids.bits.nbytes / 2**20
+    return key_filter.index.memory_usage(deep=True) / 2**20
+
+
+def measure(name: str, build, chunks: list[pd.DataFrame]) -> int:
+    start = time.perf_counter()
+    key_filter = build()
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = sum(len(key_filter.filter(chunk)) for chunk in chunks)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:>8}: keys {key_size(key_filter):.0f} MB built in {built:.2f}s,"
+        f" semi-join {elapsed:.2f}s, {rows} rows"
+    )
+    return rows
+
+
+def main(rows: int, keys: int) -> None:
+    chunks = make_chunks(rows)
+    nmids = [f"nm{i:07d}" for i in random.sample(range(PERSONS), keys)]
+    print(f"{rows} principals, {keys} keys")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        lookups = LookupStore(tmp)
+
+        strings = measure(
+            "strings",
+            lambda: StringKeyFilter(PRINCIPALS.NCONST, nmids),
+            chunks,
+        )
+        ids = measure(
+            "ids",
+            lambda: KeyFilter(PRINCIPALS.NCONST, nmids, lookups),
+            chunks,
+        )
+
+    assert strings == ids
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS,
+        int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_KEYS,
+    )
@@ -0,0 +1,59 @@
+"""Peak RSS of principals import: list of models vs batches of models.
+
+Usage: python services/benchmarks/imdb_iter.py [principals rows]
+"""
+
+import sys
+import time
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.imdb.dataset import IMDbDataSet, IMDbMoviePrincipalsFactory
+from services.benchmarks.imdb_crew import make_dumps, get_dataset
+
+DEFAULT_ROWS = 2_000_000
+
+
+def consume_list(dataset: IMDbDataSet) -> int:
+    """Previous implementation: every principal is built before the import"""
+
+    principals = dataset.get_principals()
+    return len(IMDbMoviePrincipalsFactory().from_dataframe(principals))
+
+
+def consume_batches(dataset: IMDbDataSet) -> int:
+    return sum(len(batch) for batch in dataset.iter_principals())
+
+
+def child(mode: str, directory: Path) -> None:
+    consume = consume_batches if mode == "batches" else consume_list
+
+    start = time.perf_counter()
+    rows = consume(get_dataset(directory, False))
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>10}: {rows} principals, {elapsed:.2f}s, peak RSS {peak:.0f} MB")
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        make_dumps(Path(tmp), rows)
+        print(f"dumps: {rows} principals")
+
+        for mode in ["list", "batches"]:
+            subprocess.run(
+                [sys.executable, __file__, "--child", mode, tmp],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], Path(sys.argv[3]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
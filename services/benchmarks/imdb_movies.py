@@ -0,0 +1,130 @@
+"""get_movies: merge and sort of all titles vs top-N selection first.
+
+Usage: python services/benchmarks/imdb_movies.py [titles]
+"""
+
+import sys
+import gzip
+import time
+import random
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.imdb.dataset import (
+    IMDbDataSet,
+    IMDbMovieFactory,
+    RATE_DECIMALS,
+    TITLE_REGIONS,
+)
+from services.imdb.notation import AKAS, BASICS, RATINGS, TITLE_TYPES
+
+DEFAULT_TITLES = 2_000_000
+AMOUNTS = [1000, 10000]
+DUMPS = {
+    IMDbDataSet.BASICS: "title.basics.tsv.gz",
+    IMDbDataSet.RATINGS: "title.ratings.tsv.gz",
+    IMDbDataSet.AKAS: "title.akas.tsv.gz",
+}
+
+
+def make_dumps(directory: Path, titles: int) -> None:
+    """Synthetic basics, ratings and akas dumps"""
+
+    with gzip.open(
+        directory / DUMPS[IMDbDataSet.BASICS], "wt", compresslevel=1
+    ) as file:
+        file.write("\t".join(BASICS.DTYPES) + "\n")
+        for i in range(titles):
+            title = random.randbytes(8).hex()
+            file.write(
+                f"tt{i:07d}\t{random.choice(TITLE_TYPES)}\t{title}\t{title}\t0"
+                f"\t{random.randint(1950, 2030)}\t\\N\t{random.randint(1, 240)}"
+                f"\tDrama,Comedy\n"
+            )
+
+    with gzip.open(
+        directory / DUMPS[IMDbDataSet.RATINGS], "wt", compresslevel=1
+    ) as file:
+        file.write("\t".join(RATINGS.DTYPES) + "\n")
+        for i in range(0, titles, 2):
+            rate = random.randint(10, 100) / 10
+            votes = min(int(random.paretovariate(0.7)) + 5, 3_000_000)
+            file.write(f"tt{i:07d}\t{rate}\t{votes}\n")
+
+    with gzip.open(directory / DUMPS[IMDbDataSet.AKAS], "wt", compresslevel=1) as file:
+        file.write("\t".join(AKAS.DTYPES) + "\n")
+        for i in range(titles):
+            for ordering, region in enumerate(["US", "RU", "DE"], 1):
+                file.write(
+                    f"tt{i:07d}\t{ordering}\t{random.randbytes(8).hex()}\t{region}"
+                    f"\t\\N\timdbDisplay\t\\N\t0\n"
+                )
+
+
+def movies_legacy(dataset: IMDbDataSet, amount: int) -> list:
+    """Previous pipeline: all titles are merged and sorted"""
+
+    data = dataset.get_basics()
+    ratings = dataset.get_weighted_ratings(population=data[BASICS.TCONST])
+    akas = dataset.get_akas(title_regions=TITLE_REGIONS)
+
+    data = data.merge(ratings, how="left", on=BASICS.TCONST)
+    data = data.merge(akas, how="left", left_on=BASICS.TCONST, right_on=AKAS.TCONST)
+    data = data[data[RATINGS.RATE].notna()]
+    data = data.sort_values(by=[RATINGS.WRATE], ascending=False)
+
+    rate = data[RATINGS.RATE].astype("float64")
+    data[RATINGS.RATE] = rate.round(RATE_DECIMALS)
+    return IMDbMovieFactory().from_dataframe(data[:amount])
+
+
+def get_dataset(directory: Path) -> IMDbDataSet:
+    dataset = IMDbDataSet(debug=False, cache_dir=directory)
+    # the dumps are already "downloaded"
+    dumps = {dataset.MAPPER[n]: directory / dump for n, dump in DUMPS.items()}
+    dataset.cache.fetch = dumps.get
+    return dataset
+
+
+def child(mode: str, directory: Path, amount: int) -> None:
+    dataset = get_dataset(directory)
+
+    start = time.perf_counter()
+    if mode == "legacy":
+        movies = movies_legacy(dataset, amount)
+    else:
+        movies = dataset.get_movies(amount)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>8} {amount:>6}: {elapsed:.2f}s, peak RSS {peak:.0f} MB")
+    assert len(movies) == amount
+
+
+def main(titles: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        make_dumps(Path(tmp), titles)
+
+        # snapshots are built once, outside of measurements
+        dataset = get_dataset(Path(tmp))
+        for data_name in DUMPS:
+            dataset.ingest(data_name)
+        print(f"dumps: {titles} titles")
+
+        for amount in AMOUNTS:
+            for mode in ["legacy", "top-n"]:
+                subprocess.run(
+                    [sys.executable, __file__, "--child", mode, tmp, str(amount)],
+                    check=True,
+                )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], Path(sys.argv[3]), int(sys.argv[4]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TITLES)
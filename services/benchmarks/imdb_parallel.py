@@ -0,0 +1,66 @@
+"""Throughput of get_akas: serial vs process pool parsing.
+
+Usage: python services/benchmarks/imdb_parallel.py [rows] [workers]
+"""
+
+import os
+import sys
+import gzip
+import time
+import random
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.imdb.dataset import IMDbDataSet
+from services.imdb.notation import AKAS
+
+DEFAULT_ROWS = 5_000_000
+REGIONS = ["US", "RU", "GB", "DE", "FR", "JP", "\\N"]
+TYPES = ["imdbDisplay", "original", "alternative", "\\N"]
+
+
+def make_dump(path: Path, rows: int) -> None:
+    """Synthetic title.akas dump"""
+
+    with gzip.open(path, "wt", compresslevel=1) as file:
+        file.write("\t".join(AKAS.DTYPES) + "\n")
+        for i in range(rows):
+            file.write(
+                f"tt{i // 8:07d}\t{i % 8 + 1}\t{random.randbytes(10).hex()}"
+                f"\t{random.choice(REGIONS)}\t\\N\t{random.choice(TYPES)}\t\\N\t0\n"
+            )
+
+
+def measure(name: str, dataset: IMDbDataSet, rows: int) -> None:
+    start = time.perf_counter()
+    akas = dataset.get_akas()
+    elapsed = time.perf_counter() - start
+
+    found = akas.drop(columns=AKAS.TCONST).notna().sum().sum()
+    print(f"{name:>12}: {elapsed:.2f}s, {rows / elapsed:,.0f} rows/s, {found} titles")
+
+
+def main(rows: int, workers: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = Path(tmp) / "title.akas.tsv.gz"
+        make_dump(dump, rows)
+        print(f"dump: {dump.stat().st_size / 2**20:.0f} MB gzipped, {rows} rows")
+
+        for processes in sorted({1, workers}):
+            dataset = IMDbDataSet(
+                debug=False,
+                cache_dir=tmp,
+                snapshots=False,
+                workers=processes,
+            )
+            # the dump is already "downloaded"
+            dataset.cache.fetch = lambda url: dump
+            measure(f"workers={processes}", dataset, rows)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS,
+        int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count(),
+    )
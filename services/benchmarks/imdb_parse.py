@@ -0,0 +1,130 @@
+"""Title page parsing: BeautifulSoup tree vs embedded data, and event loop stalls.
+
+Pages are built from the saved fixture, padded with cast markup and
+JSON up to the size of real title pages.
+
+Usage: python services/benchmarks/imdb_parse.py [pages] [page KB]
+"""
+
+import re
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+
+from bs4 import BeautifulSoup as soup
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.imdb.scraper import IMDbScraper
+
+FIXTURE = Path(__file__).parent.parent / "imdb" / "tests" / "fixtures" / "title.html"
+DEFAULT_PAGES = 50
+DEFAULT_SIZE = 600
+
+
+def parse_soup(movie_html: str) -> dict:
+    """Previous implementation: full tree for the poster"""
+
+    s = soup(movie_html, "lxml")
+    img = s.find("div", {"class": "ipc-media"})
+    img = img.find("img").get("src")
+    return {"image_url": re.sub(r"\._V1_.*", ".jpg", img, flags=re.IGNORECASE)}
+
+
+def make_page(size: int) -> str:
+    page = FIXTURE.read_text()
+
+    cast = []
+    credits = []
+    i = 0
+    padding = 0
+    while padding < size * 1024:
+        cast.append(
+            f'<div data-testid="title-cast-item" class="ipc-sub-grid-item">'
+            f'<div class="ipc-avatar"><div class="ipc-media ipc-media--avatar">'
+            f'<img alt="Actor {i}" class="ipc-image" loading="lazy"'
+            f' src="https://m.media-amazon.com/images/M/MV5B{i:08d}@._V1_QL75_UY207_.jpg"'
+            f' width="140"/></div></div><a class="ipc-link" href="/name/nm{i:07d}/">'
+            f"Actor {i}</a><span>Character {i}</span></div>"
+        )
+        credits.append(
+            json.dumps(
+                {
+                    "node": {
+                        "name": {"id": f"nm{i:07d}", "nameText": {"text": f"A {i}"}},
+                        "characters": [{"name": f"Character {i}"}],
+                    }
+                }
+            )
+        )
+        padding += len(cast[-1]) + len(credits[-1])
+        i += 1
+
+    page = page.replace("</main>", "".join(cast) + "</main>")
+    return page.replace(
+        '"mainColumnData":{"id":"tt0133093"}',
+        '"mainColumnData":{"id":"tt0133093","cast":{"edges":['
+        + ",".join(credits)
+        + "]}}",
+    )
+
+
+def measure_parse(name: str, parse, pages: list[str]) -> None:
+    start = time.perf_counter()
+    for page in pages:
+        parse(page)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>10}: {elapsed / len(pages) * 1000:.2f} ms/page")
+
+
+async def measure_stall(name: str, parse, pages: list[str]) -> None:
+    """Max delay of a 1 ms ticker while pages are parsed"""
+
+    stall = 0.0
+    running = True
+
+    async def ticker() -> None:
+        nonlocal stall
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            stall = max(stall, time.perf_counter() - start - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await asyncio.gather(*[parse(page) for page in pages])
+    elapsed = time.perf_counter() - start
+    running = False
+    await task
+    print(f"{name:>10}: {elapsed:.2f}s, event loop stalled up to {stall * 1000:.0f} ms")
+
+
+async def main(count: int, size: int) -> None:
+    page = make_page(size)
+    pages = [page] * count
+    scraper = IMDbScraper()
+    assert scraper._parse_movie(page)["image_url"] == parse_soup(page)["image_url"]
+    print(f"{count} pages of {len(page) // 1024} KB")
+
+    measure_parse("soup", parse_soup, pages)
+    measure_parse("embedded", scraper._parse_movie, pages)
+
+    async def inline(page: str) -> dict:
+        return parse_soup(page)
+
+    async def in_thread(page: str) -> dict:
+        return await asyncio.to_thread(scraper._parse_movie, page)
+
+    await measure_stall("inline", inline, pages)
+    await measure_stall("thread", in_thread, pages)
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PAGES,
+            int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SIZE,
+        )
+    )
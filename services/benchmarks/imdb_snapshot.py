@@ -0,0 +1,70 @@
+"""Load time of title.basics: gzipped TSV dump vs columnar snapshot.
+
+Usage: python services/benchmarks/imdb_snapshot.py [rows]
+"""
+
+import sys
+import gzip
+import time
+import random
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.imdb.dataset import IMDbDataSet
+from services.imdb.notation import BASICS, TITLE_TYPES
+
+DEFAULT_ROWS = 3_000_000
+GENRES = ["Drama", "Comedy", "Action", "Documentary", "Romance", "Thriller"]
+
+
+def make_dump(path: Path, rows: int) -> None:
+    """Synthetic title.basics dump"""
+
+    columns = list(BASICS.DTYPES)
+    with gzip.open(path, "wt", compresslevel=1) as file:
+        file.write("\t".join(columns) + "\n")
+
+        for i in range(rows):
+            title = random.randbytes(8).hex()
+            year = random.choice([str(random.randint(1900, 2030)), "\\N"])
+            genres = ",".join(random.sample(GENRES, 2))
+            file.write(
+                f"tt{i:07d}\t{random.choice(TITLE_TYPES)}\t{title}\t{title}"
+                f"\t0\t{year}\t\\N\t{random.randint(1, 240)}\t{genres}\n"
+            )
+
+
+def measure(name: str, load) -> None:
+    start = time.perf_counter()
+    data = load()
+    elapsed = time.perf_counter() - start
+
+    rows = f", {len(data)} rows" if hasattr(data, "__len__") else ""
+    print(f"{name:>10}: {elapsed:.2f}s{rows}")
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = Path(tmp) / "title.basics.tsv.gz"
+        make_dump(dump, rows)
+        print(f"dump: {dump.stat().st_size / 2**20:.0f} MB gzipped, {rows} rows")
+
+        dataset = IMDbDataSet(debug=False, cache_dir=tmp)
+        # the dump is already "downloaded"
+        dataset.cache.fetch = lambda url: dump
+        snapshots = dataset.snapshots
+
+        dataset.snapshots = None
+        measure("tsv", dataset.get_basics)
+
+        dataset.snapshots = snapshots
+        measure("ingest", lambda: dataset.ingest(IMDbDataSet.BASICS))
+        measure("snapshot", dataset.get_basics)
+
+        snapshot = snapshots.path(dump)
+        print(f"snapshot: {snapshot.stat().st_size / 2**20:.0f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
@@ -0,0 +1,119 @@
+"""Peak RSS of IMDb dump download: buffered archive vs streaming decompression.
+
+Usage: python services/benchmarks/imdb_stream.py [rows]
+"""
+
+import io
+import sys
+import gzip
+import time
+import random
+import resource
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import requests
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.imdb.dataset import IMDbDataSet, CHUNKSIZE
+from services.imdb.notation import PRINCIPALS
+
+DUMP_NAME = "title.principals.tsv.gz"
+DEFAULT_ROWS = 3_000_000
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def make_dump(path: Path, rows: int) -> None:
+    """Synthetic title.principals dump with realistic row width"""
+
+    categories = ["actor", "actress", "director", "writer", "producer"]
+    with gzip.open(path, "wt", compresslevel=1) as file:
+        file.write(
+            "\t".join(
+                [
+                    PRINCIPALS.TCONST,
+                    PRINCIPALS.ORDERING,
+                    PRINCIPALS.NCONST,
+                    PRINCIPALS.CATEGORY,
+                    PRINCIPALS.JOB,
+                    PRINCIPALS.CHARACHTERS,
+                ]
+            )
+            + "\n"
+        )
+
+        for i in range(rows):
+            file.write(
+                f"tt{i // 10:07d}\t{i % 10 + 1}\tnm{random.randrange(10**7):07d}"
+                f'\t{random.choice(categories)}\t\\N\t["{random.randbytes(12).hex()}"]\n'
+            )
+
+
+def consume_buffered(url: str) -> int:
+    """Previous implementation: the whole archive is kept in memory"""
+
+    rows = 0
+    response = requests.get(url, stream=True)
+    with gzip.open(io.BytesIO(response.content), "rt", errors="ignore") as file:
+        for chunk in pd.read_csv(file, sep="\t", chunksize=CHUNKSIZE):
+            rows += len(chunk)
+    return rows
+
+
+def consume_streaming(url: str) -> int:
+    dataset = IMDbDataSet(debug=False, cache_dir=None)
+    dataset.MAPPER = {IMDbDataSet.PRINCIPALS: url}
+
+    rows = 0
+    for chunk in dataset._request_data(IMDbDataSet.PRINCIPALS):
+        rows += len(chunk)
+    return rows
+
+
+def child(mode: str, url: str) -> None:
+    consume = consume_streaming if mode == "streaming" else consume_buffered
+
+    start = time.perf_counter()
+    rows = consume(url)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:>10}: {rows} rows, {elapsed:.2f}s, peak RSS {peak:.0f} MB")
+
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = Path(tmp) / DUMP_NAME
+        make_dump(dump, rows)
+        print(f"dump: {dump.stat().st_size / 2**20:.0f} MB gzipped, {rows} rows")
+
+        handler = partial(QuietHandler, directory=tmp)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        url = f"http://127.0.0.1:{server.server_port}/{DUMP_NAME}"
+        try:
+            for mode in ["buffered", "streaming"]:
+                subprocess.run(
+                    [sys.executable, __file__, "--child", mode, url],
+                    check=True,
+                )
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS)
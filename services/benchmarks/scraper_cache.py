@@ -0,0 +1,80 @@
+"""Repeated run of an import: requests to the upstream vs cached responses.
+
+The local server answers after LATENCY, as a remote API. The first run
+fills the cache, the second run replays it.
+
+Usage: python services/benchmarks/scraper_cache.py [requests]
+"""
+
+import sys
+import time
+import asyncio
+import tempfile
+from pathlib import Path
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.base_scraper import BaseScraper
+from services.response_cache import ResponseCache
+
+DEFAULT_REQUESTS = 10_000
+MAX_RATE = 10**6
+LATENCY = 0.05
+
+
+class JSONScraper(BaseScraper):
+    async def extractor(self, response):
+        return await response.json()
+
+
+async def measure(name: str, scraper: BaseScraper, urls: list[str], peers: list):
+    sent = len(peers)
+    start = time.perf_counter()
+    async with scraper:
+        await asyncio.gather(*[scraper.request(url) for url in urls])
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:>8}: {len(urls) / elapsed:,.0f} requests/s,"
+        f" {len(peers) - sent} sent to the upstream"
+    )
+
+
+async def main(requests: int) -> None:
+    peers = []
+
+    async def handler(request: web.Request) -> web.Response:
+        peers.append(request.path)
+        await asyncio.sleep(LATENCY)
+        return web.json_response({"id": request.match_info["id"], "x": "x" * 2048})
+
+    app = web.Application()
+    app.router.add_get("/movie/{id}", handler)
+
+    async with TestServer(app) as server:
+        urls = [str(server.make_url(f"/movie/{i}")) for i in range(requests)]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResponseCache(Path(tmp) / "responses.sqlite")
+
+            await measure("upstream", JSONScraper(max_rate=MAX_RATE), urls, peers)
+            await measure(
+                "fill",
+                JSONScraper(max_rate=MAX_RATE, cache=cache),
+                urls,
+                peers,
+            )
+            await measure(
+                "replay",
+                JSONScraper(max_rate=MAX_RATE, cache=cache),
+                urls,
+                peers,
+            )
+
+            print(f"cache: {cache.stats()}")
+            cache.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS))
@@ -0,0 +1,81 @@
+"""Requests to a rate-limited upstream: fixed rate vs adaptive rate with retries.
+
+The local server allows UPSTREAM_RATE requests per second and answers
+429 with Retry-After above it, the scrapers are configured above that rate.
+
+Usage: python services/benchmarks/scraper_limiter.py [requests]
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.base_scraper import BaseScraper
+
+DEFAULT_REQUESTS = 1000
+UPSTREAM_RATE = 50
+MAX_RATE = 80
+
+
+class FixedRateScraper(BaseScraper):
+    """Previous implementation: fixed rate, overloaded responses are lost"""
+
+    async def request(self, url: str):
+        async with self.rate_limit:
+            async with self.get_session().request("get", url) as response:
+                return await self.extractor(response)
+
+
+class Upstream:
+    """Token bucket of the upstream API"""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    async def handler(self, request: web.Request) -> web.Response:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens < 1:
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        self.tokens -= 1
+        return web.Response(text="ok")
+
+
+async def measure(name: str, scraper: BaseScraper, requests: int) -> None:
+    app = web.Application()
+    app.router.add_get("/", Upstream(UPSTREAM_RATE).handler)
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/"))
+
+        start = time.perf_counter()
+        async with scraper:
+            data = await asyncio.gather(
+                *[scraper.request(url) for _ in range(requests)]
+            )
+        elapsed = time.perf_counter() - start
+
+    done = sum(d == "ok" for d in data)
+    print(
+        f"{name:>8}: {done}/{requests} done, {elapsed:.1f}s,"
+        f" {done / elapsed:.1f} successful requests/s"
+    )
+
+
+async def main(requests: int) -> None:
+    print(f"upstream limit {UPSTREAM_RATE} r/s, scrapers {MAX_RATE} r/s")
+    await measure("fixed", FixedRateScraper(max_rate=MAX_RATE), requests)
+    await measure("adaptive", BaseScraper(max_rate=MAX_RATE), requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS))
@@ -0,0 +1,70 @@
+"""Throughput of a proxy pool by the number of healthy proxies.
+
+Every proxy is rate limited to MAX_RATE, the pool also contains
+a dead proxy. Proxies are local stand-ins answering requests themselves.
+
+Usage: python services/benchmarks/scraper_proxies.py [seconds]
+"""
+
+import sys
+import time
+import socket
+import asyncio
+from pathlib import Path
+from contextlib import AsyncExitStack
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.base_scraper import BaseScraper
+
+DEFAULT_SECONDS = 2
+MAX_RATE = 50
+PROXIES = [1, 2, 4, 8]
+
+
+async def handler(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+def dead_proxy() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"127.0.0.1:{port}@user:password"
+
+
+async def measure(proxies: list[str], seconds: float) -> None:
+    requests = int(MAX_RATE * (len(proxies) - 1) * seconds)
+
+    start = time.perf_counter()
+    async with BaseScraper(proxies, max_rate=MAX_RATE) as scraper:
+        data = await asyncio.gather(
+            *[scraper.request("http://example.com/") for _ in range(requests)]
+        )
+    elapsed = time.perf_counter() - start
+
+    done = sum(d == "ok" for d in data)
+    print(
+        f"{len(proxies) - 1} healthy proxies: {done}/{requests} done,"
+        f" {done / elapsed:.1f} requests/s"
+    )
+
+
+async def main(seconds: float) -> None:
+    print(f"{MAX_RATE} r/s per proxy")
+    async with AsyncExitStack() as stack:
+        servers = []
+        for _ in range(max(PROXIES)):
+            app = web.Application()
+            app.router.add_get("/{path:.*}", handler)
+            servers.append(await stack.enter_async_context(TestServer(app)))
+
+        for count in PROXIES:
+            proxies = [f"127.0.0.1:{s.port}@user:password" for s in servers[:count]]
+            await measure(proxies + [dead_proxy()], seconds)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SECONDS))
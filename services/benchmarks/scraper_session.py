@@ -0,0 +1,63 @@
+"""Requests per second: session per request vs shared pooled session.
+
+Usage: python services/benchmarks/scraper_session.py [requests]
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+from aiohttp import web, ClientSession
+from aiohttp.test_utils import TestServer
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from services.base_scraper import BaseScraper
+
+DEFAULT_REQUESTS = 5000
+MAX_RATE = 10**6
+
+
+class SessionPerRequestScraper(BaseScraper):
+    """Previous implementation: a new session for every request"""
+
+    async def request(self, url: str):
+        async with self.rate_limit:
+            async with ClientSession() as session:
+                async with session.request(
+                    method="get",
+                    url=url,
+                    headers=self._headers,
+                ) as response:
+                    return await self.extractor(response)
+
+
+async def handler(request: web.Request) -> web.Response:
+    return web.Response(text="x" * 2048)
+
+
+async def measure(name: str, scraper: BaseScraper, url: str, requests: int) -> None:
+    start = time.perf_counter()
+    async with scraper:
+        await asyncio.gather(*[scraper.request(url) for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+    print(f"{name:>12}: {requests / elapsed:,.0f} requests/s")
+
+
+async def main(requests: int) -> None:
+    app = web.Application()
+    app.router.add_get("/", handler)
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/"))
+        await measure(
+            "per request",
+            SessionPerRequestScraper(max_rate=MAX_RATE),
+            url,
+            requests,
+        )
+        await measure("shared", BaseScraper(max_rate=MAX_RATE), url, requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REQUESTS))
@@ -0,0 +1,299 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Generator, Iterable
+
+import requests
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as pads
+
+DOWNLOAD_BLOCKSIZE = 2**20
+
+# bump to rebuild snapshots after schema changes
+SNAPSHOT_VERSION = 1
+SNAPSHOT_COMPRESSION = "zstd"
+
+# lookup tables kept on disk, the oldest ones are removed
+MAX_LOOKUPS = 16
+
+ARROW_INTEGERS = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+}
+
+
+def arrow_type(dtype: Any) -> pa.DataType:
+    dtype = pd.api.types.pandas_dtype(dtype)
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pa.dictionary(pa.int8(), pa.string())
+    if dtype == object:
+        return pa.string()
+    if hasattr(dtype, "numpy_dtype"):
+        # nullable pandas dtypes: Int16, boolean, ...
+        return pa.from_numpy_dtype(dtype.numpy_dtype)
+    return pa.from_numpy_dtype(dtype)
+
+
+def arrow_schema(dtypes: dict[str, Any]) -> pa.Schema:
+    return pa.schema([(column, arrow_type(dtype)) for column, dtype in dtypes.items()])
+
+
+class DumpCache(object):
+    """
+    On-disk cache of IMDb dumps.
+    Dumps are downloaded once and revalidated with ETag / Last-Modified,
+    unchanged dumps are read from disk.
+    """
+
+    ETAG = "etag"
+    LAST_MODIFIED = "last_modified"
+
+    def __init__(self, cache_dir: str | Path) -> None:
+        self.cache_dir = Path(cache_dir)
+
+    def path(self, url: str) -> Path:
+        return self.cache_dir / url.rsplit("/", 1)[-1]
+
+    def _meta_path(self, path: Path) -> Path:
+        return path.with_name(path.name + ".json")
+
+    def _load_meta(self, path: Path) -> dict:
+        meta_path = self._meta_path(path)
+        if not path.exists() or not meta_path.exists():
+            return {}
+
+        with open(meta_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_meta(self, path: Path, meta: dict) -> None:
+        with open(self._meta_path(path), "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+
+    def _conditional_headers(self, meta: dict) -> dict:
+        headers = {}
+        if meta.get(self.ETAG):
+            headers["If-None-Match"] = meta[self.ETAG]
+        if meta.get(self.LAST_MODIFIED):
+            headers["If-Modified-Since"] = meta[self.LAST_MODIFIED]
+        return headers
+
+    def fetch(self, url: str) -> Path:
+        """
+        Download the dump if it is absent or changed.
+        Return path of the cached dump.
+        """
+
+        path = self.path(url)
+        meta = self._load_meta(path)
+
+        with requests.get(
+            url,
+            headers=self._conditional_headers(meta),
+            stream=True,
+        ) as response:
+            if response.status_code == 304:
+                return path
+
+            response.raise_for_status()
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            part_path = path.with_name(path.name + ".part")
+            with open(part_path, "wb") as file:
+                for block in response.iter_content(DOWNLOAD_BLOCKSIZE):
+                    file.write(block)
+
+            part_path.replace(path)
+            self._save_meta(
+                path,
+                {
+                    self.ETAG: response.headers.get("ETag"),
+                    self.LAST_MODIFIED: response.headers.get("Last-Modified"),
+                },
+            )
+
+        return path
+
+
+class SnapshotStore(object):
+    """
+    Typed columnar (Parquet) snapshots of parsed IMDb dumps.
+    Every chunk of the dump is written as a row group,
+    so readers can skip row groups and read only needed columns.
+    """
+
+    def __init__(self, cache_dir: str | Path) -> None:
+        self.cache_dir = Path(cache_dir)
+
+    def path(self, dump_path: Path) -> Path:
+        name = dump_path.name.removesuffix(".gz").removesuffix(".tsv")
+        return self.cache_dir / f"{name}.parquet"
+
+    def _meta_path(self, path: Path) -> Path:
+        return path.with_name(path.name + ".json")
+
+    def _source_meta(self, dump_path: Path) -> dict:
+        stat = dump_path.stat()
+        return {
+            "version": SNAPSHOT_VERSION,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+        }
+
+    def is_fresh(self, dump_path: Path) -> bool:
+        path = self.path(dump_path)
+        meta_path = self._meta_path(path)
+        if not path.exists() or not meta_path.exists():
+            return False
+
+        with open(meta_path, "r", encoding="utf-8") as file:
+            return json.load(file) == self._source_meta(dump_path)
+
+    def build(
+        self,
+        dump_path: Path,
+        chunks: Iterable[pd.DataFrame],
+        dtypes: dict[str, Any],
+    ) -> Path:
+        """Convert parsed chunks of the dump to snapshot"""
+
+        path = self.path(dump_path)
+        part_path = path.with_name(path.name + ".part")
+        schema = arrow_schema(dtypes)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with pq.ParquetWriter(
+            part_path,
+            schema,
+            compression=SNAPSHOT_COMPRESSION,
+        ) as writer:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(
+                    chunk.reindex(columns=schema.names),
+                    schema=schema,
+                    preserve_index=False,
+                )
+                writer.write_table(table, row_group_size=len(chunk) or None)
+
+        part_path.replace(path)
+        with open(self._meta_path(path), "w", encoding="utf-8") as file:
+            json.dump(self._source_meta(dump_path), file)
+
+        return path
+
+    def read(
+        self,
+        path: Path,
+        dtypes: dict[str, Any],
+        columns: list[str] | None = None,
+        filters: list[tuple[str, str, Any]] | None = None,
+        chunksize: int | None = None,
+    ) -> Generator[pd.DataFrame, None, None]:
+        """
+        Read snapshot by chunks.
+        filters: list of (column, op, value), row groups are pruned by them.
+        """
+
+        dataset = pads.dataset(path, format="parquet")
+        expression = pq.filters_to_expression(filters) if filters else None
+
+        batches = dataset.to_batches(
+            columns=columns,
+            filter=expression,
+            batch_size=chunksize or 2**17,
+        )
+        for batch in batches:
+            if not batch.num_rows:
+                continue
+
+            chunk = batch.to_pandas(types_mapper=ARROW_INTEGERS.get)
+            yield chunk.astype(
+                {
+                    column: dtypes[column]
+                    for column in chunk.columns
+                    # astype(str) would turn missing strings into "None"
+                    if column in dtypes and arrow_type(dtypes[column]) != pa.string()
+                }
+            )
+
+
+class FingerprintStore(object):
+    """
+    Fingerprints of the last imported rows: one hash per key.
+    Used to compute deltas between imports.
+    """
+
+    KEY = "key"
+    HASH = "hash"
+
+    def __init__(self, cache_dir: str | Path) -> None:
+        self.cache_dir = Path(cache_dir)
+
+    def path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}.fingerprints.parquet"
+
+    def load(self, name: str) -> pd.Series:
+        path = self.path(name)
+        if not path.exists():
+            return pd.Series([], index=pd.Index([], dtype=object), dtype="uint64")
+
+        data = pd.read_parquet(path)
+        return data.set_index(self.KEY)[self.HASH].rename_axis(None)
+
+    def save(self, name: str, fingerprints: pd.Series) -> Path:
+        path = self.path(name)
+        part_path = path.with_name(path.name + ".part")
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        data = pd.DataFrame(
+            {self.KEY: fingerprints.index.astype(str), self.HASH: fingerprints.values}
+        )
+        data.to_parquet(part_path, index=False, compression=SNAPSHOT_COMPRESSION)
+
+        part_path.replace(path)
+        return path
+
+
+class LookupStore(object):
+    """
+    Memory-mapped bitmaps of encoded IMDb ids.
+    Tables are named by their content, so worker processes and
+    repeated imports map the same file instead of copying it.
+    """
+
+    def __init__(self, cache_dir: str | Path) -> None:
+        self.cache_dir = Path(cache_dir) / "lookups"
+
+    def path(self, bits: np.ndarray) -> Path:
+        digest = hashlib.sha1(bits.tobytes()).hexdigest()[:16]
+        return self.cache_dir / f"{digest}.bits"
+
+    def open(self, path: str | Path) -> np.memmap:
+        return np.memmap(path, dtype=np.uint8, mode="r")
+
+    def save(self, bits: np.ndarray) -> np.memmap:
+        path = self.path(bits)
+        if not path.exists():
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            part_path = path.with_name(path.name + ".part")
+            bits.astype(np.uint8).tofile(part_path)
+            part_path.replace(path)
+            self.prune()
+
+        path.touch()
+        return self.open(path)
+
+    def prune(self, keep: int = MAX_LOOKUPS) -> None:
+        paths = sorted(
+            self.cache_dir.glob("*.bits"),
+            key=lambda path: path.stat().st_mtime_ns,
+            reverse=True,
+        )
+        for path in paths[keep:]:
+            path.unlink(missing_ok=True)
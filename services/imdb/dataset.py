@@ -1,20 +1,29 @@
 import io
+import csv
 import sys
 import gzip
 from pathlib import Path
-from functools import partial
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from abc import abstractmethod
-from typing import Generator, Callable, Dict, Iterable, Any
+from typing import Generator, Callable, Iterable, Any
 
 import requests
 import pandas as pd
 import numpy as np
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 ROOT_DIR = Path(__file__).parent.parent
 sys.path.append(str(ROOT_DIR.parent))
 
 from services.imdb.settings import settings
+from services.imdb import notation
+from services.imdb.cache import (
+    DumpCache,
+    SnapshotStore,
+    FingerprintStore,
+    LookupStore,
+)
 from services.models import (
     IMDbMovieServiceDM,
     IMDbPersonServiceDM,
@@ -27,12 +36,17 @@ from services.imdb.notation import (
     PRINCIPALS,
     CREW,
     NAME,
+    TITLE_TYPES,
     TITLE_REGION as TR,
+    ID_CODECS,
+    NAME_ID,
+    IDCodec,
 )
 
 ITERABLE_TYPE = (Iterable, set, list, tuple, pd.Series)
 
 LOCAL_DATA = ROOT_DIR / "imdb" / "local_data"
+CACHE_DIR = ROOT_DIR / "imdb" / "cache"
 
 BASICS_FILTERED = LOCAL_DATA / "title.basics.filtered.csv"
 RATINGS_FILTERED = LOCAL_DATA / "title.ratings.filtered.csv"
@@ -42,141 +56,174 @@ PRINCIPALS_FILTERED = LOCAL_DATA / "title.principals.filtered.csv"
 PERSONS_FILTERED = LOCAL_DATA / "name.basics.filtered.csv"
 
 CHUNKSIZE = 100000
+# decompressed bytes of a dump parsed by a worker process
+BLOCKSIZE = 2**23
+# IMDb ratings have one decimal
+RATE_DECIMALS = 1
 TITLE_REGIONS = [TR.RU, TR.US]
+# wrate drifts with the average rate of the whole dump,
+# smaller changes of imported values are not treated as updates
+FINGERPRINT_DECIMALS = 2
+# akas type of the title displayed by IMDb in the region
+DISPLAY_TYPE = "imdbDisplay"
 
-ALL_TYPES = [
-    "short"
-    "movie"
-    "tvShort"
-    "tvMovie"
-    "tvSeries"
-    "tvEpisode"
-    "tvMiniSeries"
-    "tvSpecial"
-    "video"
-    "videoGame"
-    "tvPilot"
-]
+ALL_TYPES = TITLE_TYPES
 
 ALLOWED_TYPES = ["movie"]
 
 
+def split_column(column: pd.Series, sep: str = ",") -> pd.Series:
+    """Split strings to lists of stripped values, NA stays NA"""
+
+    return column.str.strip().str.split(rf"\s*{sep}\s*", regex=True)
+
+
 class AbstractFactory:
+    MODEL: type[BaseModel] = BaseModel
+
     @abstractmethod
-    def create(self, **kwargs: dict[str, Any]) -> BaseModel:
+    def prepare(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        """
+        Batch path: column-wise preprocessing.
+        Return dataframe with columns named as the model fields.
+        """
+
         pass
 
+    @property
+    def adapter(self) -> TypeAdapter:
+        cls = type(self)
+        if "_adapter" not in cls.__dict__:
+            cls._adapter = TypeAdapter(list[self.MODEL])
+        return cls._adapter
+
     def from_dataframe(
         self,
         dataframe: pd.DataFrame,
     ) -> list[BaseModel]:
-        data = []
-        for _, series in dataframe.iterrows():
-            data.append(self.create(**dict(series)))
+        if dataframe.empty:
+            return []
 
-        return data
+        # chunks of columnar sources are indexed from zero each,
+        # column-wise preparation aligns by unique labels
+        data = self.prepare(dataframe.reset_index(drop=True))
+        data = data.astype(object).where(data.notna(), None)
 
-    def str_to_list(self, key: str, **kwargs) -> list[str] | None:
-        values: str = kwargs.get(key, None)
-        if values:
-            values = [v.strip() for v in values.split(",")]
-        return values
+        # DataFrame.to_dict("records") boxes every cell, zip of columns does not
+        columns = [data[column].tolist() for column in data.columns]
+        records = [dict(zip(data.columns, row)) for row in zip(*columns)]
 
-    def check_na(self, **kwargs) -> dict:
-        for key, value in kwargs.items():
-            if pd.isna(value):
-                kwargs[key] = None
-        return kwargs
+        # one validation call for the whole batch
+        return self.adapter.validate_python(records)
+
+    def column(self, dataframe: pd.DataFrame, key: str) -> pd.Series:
+        if key in dataframe.columns:
+            return dataframe[key]
+        return pd.Series(None, index=dataframe.index, dtype=object)
 
 
 class IMDbMovieFactory(AbstractFactory):
-    def create(self, **kwargs) -> IMDbMovieServiceDM:
-        kwargs = self.check_na(**kwargs)
-        return IMDbMovieServiceDM(
-            imdb_mvid=kwargs[BASICS.TCONST],
-            type=kwargs.get(BASICS.TITLE_TYPE),
-            name_en=self.get_name_en(**kwargs),
-            name_ru=kwargs.get(TR.RU, None),
-            is_adult=kwargs.get(BASICS.IS_ADULT, None),
-            runtime=kwargs.get(BASICS.RUNTIME, None),
-            rate=kwargs.get(RATINGS.RATE, None),
-            wrate=kwargs.get(RATINGS.WRATE, None),
-            votes=kwargs.get(RATINGS.VOTES),
-            genres=self.get_genres(kwargs.get(BASICS.GENRES, "")),
-            init_slug=None,
-            start_year=kwargs.get(BASICS.START_YEAR),
-            end_year=kwargs.get(BASICS.END_YEAR, None),
+    MODEL = IMDbMovieServiceDM
+
+    def prepare(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "imdb_mvid": dataframe[BASICS.TCONST],
+                "type": self.column(dataframe, BASICS.TITLE_TYPE).astype(object),
+                "name_en": self.prepare_name_en(dataframe),
+                "name_ru": self.column(dataframe, TR.RU),
+                "is_adult": self.column(dataframe, BASICS.IS_ADULT),
+                "runtime": self.column(dataframe, BASICS.RUNTIME),
+                "rate": self.column(dataframe, RATINGS.RATE),
+                "wrate": self.column(dataframe, RATINGS.WRATE),
+                "votes": self.column(dataframe, RATINGS.VOTES),
+                "genres": self.prepare_genres(self.column(dataframe, BASICS.GENRES)),
+                "start_year": self.column(dataframe, BASICS.START_YEAR),
+                "end_year": self.column(dataframe, BASICS.END_YEAR),
+            }
         )
 
-    def get_name_en(self, **kwargs) -> str:
-        name_en = kwargs.get(TR.US, None)
-        if not self.is_title(name_en):
-            name_en = kwargs.get(BASICS.PRIMARY_TITLE, None)
-        if not self.is_title(name_en):
-            name_en = kwargs.get(BASICS.ORIGINAL_TITLE, None)
-        if not self.is_title(name_en):
+    def prepare_name_en(self, dataframe: pd.DataFrame) -> pd.Series:
+        name_en = pd.Series(None, index=dataframe.index, dtype=object)
+        for key in [TR.US, BASICS.PRIMARY_TITLE, BASICS.ORIGINAL_TITLE]:
+            title = self.column(dataframe, key).astype(object)
+            is_title = title.map(self.is_title, na_action="ignore").eq(True)
+            name_en = name_en.where(name_en.notna() | ~is_title, title)
+
+        if name_en.isna().any():
             raise ValueError("No title")
 
         return name_en
 
+    def prepare_genres(self, genres: pd.Series) -> pd.Series:
+        genres = split_column(genres.astype(object))
+        # no duplicates, empty list for NA
+        return genres.map(
+            lambda g: list(dict.fromkeys(g)) if isinstance(g, list) else []
+        )
+
     def is_title(self, value) -> bool:
         if value:
             if isinstance(value, str):
                 return True
         return False
 
-    def get_genres(self, text: str) -> list[str]:
-        genres = []
-        if text and isinstance(text, str):
-            genres = list(set(map(lambda s: s.strip(), text.split(","))))
-        return genres
-
 
 class IMDbPersonFactory(AbstractFactory):
-    def create(self, **kwargs) -> IMDbPersonServiceDM:
-        kwargs = self.check_na(**kwargs)
-        return IMDbPersonServiceDM(
-            imdb_nmid=kwargs[NAME.NCONST],
-            name_en=kwargs[NAME.PRIMARY_NAME],
-            birth_y=kwargs.get(NAME.BIRTH_YEAR, None),
-            death_y=kwargs.get(NAME.DEATH_YEAR, None),
-            professions=self.str_to_list(NAME.PRIMARY_PROFESSION, **kwargs),
-            known_for_titles=self.str_to_list(NAME.KNOWN_FOR_TITLES, **kwargs),
+    MODEL = IMDbPersonServiceDM
+
+    def prepare(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "imdb_nmid": dataframe[NAME.NCONST],
+                "name_en": dataframe[NAME.PRIMARY_NAME],
+                "birth_y": self.column(dataframe, NAME.BIRTH_YEAR),
+                "death_y": self.column(dataframe, NAME.DEATH_YEAR),
+                "professions": split_column(
+                    self.column(dataframe, NAME.PRIMARY_PROFESSION).astype(object)
+                ),
+                "known_for_titles": split_column(
+                    self.column(dataframe, NAME.KNOWN_FOR_TITLES).astype(object)
+                ),
+            }
         )
 
 
 class IMDbMoviePrincipalsFactory(AbstractFactory):
-    def parse_characters(self, key: str, **kwargs) -> list[str] | None:
-        characters: str = kwargs.get(key, None)
-        if characters:
-            if characters.startswith("["):
-                characters = characters[1:]
-            if characters.endswith("]"):
-                characters = characters[:-1]
-
-            characters = characters.split('",')
-
-            prepared_charcs: list[str] = []
-            for charc in characters:
-                if charc.startswith('"'):
-                    charc = charc[1:]
-                if charc.endswith('"'):
-                    charc = charc[:-1]
-                prepared_charcs.append(charc.strip())
-
-            return prepared_charcs
-
-        return characters
-
-    def create(self, **kwargs) -> IMDbPrincipalServiceDM:
-        kwargs = self.check_na(**kwargs)
-        return IMDbPrincipalServiceDM(
-            imdb_movie=kwargs[PRINCIPALS.TCONST],
-            imdb_person=kwargs[PRINCIPALS.NCONST],
-            ordering=kwargs[PRINCIPALS.ORDERING],
-            category=kwargs.get(PRINCIPALS.CATEGORY, None),
-            job=kwargs.get(PRINCIPALS.JOB, None),
-            characters=self.parse_characters(PRINCIPALS.CHARACHTERS, **kwargs),
+    MODEL = IMDbPrincipalServiceDM
+
+    def prepare(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "imdb_movie": dataframe[PRINCIPALS.TCONST],
+                "imdb_person": dataframe[PRINCIPALS.NCONST],
+                "ordering": dataframe[PRINCIPALS.ORDERING],
+                "category": self.column(dataframe, PRINCIPALS.CATEGORY),
+                "job": self.column(dataframe, PRINCIPALS.JOB),
+                "characters": self.prepare_characters(
+                    self.column(dataframe, PRINCIPALS.CHARACHTERS)
+                ),
+            }
+        )
+
+    def prepare_characters(self, characters: pd.Series) -> pd.Series:
+        """'["A","B"]' -> ["A", "B"]"""
+
+        characters = characters.astype(object).dropna()
+        characters = characters[characters != ""]
+        if characters.empty:
+            return characters
+
+        lists = characters.str.removeprefix("[").str.removesuffix("]").str.split('",')
+        flat = lists.explode()
+        flat = flat.str.removeprefix('"').str.removesuffix('"').str.strip()
+
+        # explode keeps order, so lists are restored by offsets
+        offsets = np.cumsum(lists.str.len().to_numpy())[:-1]
+        return pd.Series(
+            [part.tolist() for part in np.split(flat.to_numpy(), offsets)],
+            index=lists.index,
+            dtype=object,
         )
 
 
@@ -200,8 +247,9 @@ def bayesian_rate(
     if m is None:
         m = calc_m(df, 0.995)
 
-    rate = df[RATINGS.RATE]
-    votes = df[RATINGS.VOTES]
+    # drop float32 representation error of parsed rates
+    rate = df[RATINGS.RATE].astype("float64").round(RATE_DECIMALS)
+    votes = df[RATINGS.VOTES].astype("float64")
 
     avg = rate.mean()  # average rate of average rates
 
@@ -209,12 +257,187 @@ def bayesian_rate(
     return brate
 
 
-def cast(value, to_type: type):
-    try:
-        value = to_type(value)
-    except:
-        value = None
-    return value
+# m of the weighted rate: percentile of votes
+WRATE_PERCENTAGE = 0.995
+# log-spaced bins of votes histogram: relative error of m is below 0.5%
+VOTES_BINS = np.unique(np.floor(np.geomspace(1, 2**31, 4000)))
+
+
+class RatingStats(object):
+    """
+    Streaming statistics for the weighted (bayesian) rate.
+    Chunks are accumulated to the average rate and a histogram of votes,
+    so memory does not depend on the number of titles.
+    """
+
+    def __init__(self, bins: np.ndarray = VOTES_BINS) -> None:
+        self.bins = bins
+        self.counts = np.zeros(len(bins), dtype=np.int64)
+        self.rates_sum = 0.0
+        self.rates_count = 0
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        # drop float32 representation error of parsed rates
+        rate = chunk[RATINGS.RATE].astype("float64").round(RATE_DECIMALS)
+        self.rates_sum += rate.sum()
+        self.rates_count += rate.count()
+
+        votes = chunk[RATINGS.VOTES].dropna().to_numpy(dtype="float64")
+        index = np.searchsorted(self.bins, votes, side="right") - 1
+        self.counts += np.bincount(index.clip(0), minlength=len(self.bins))
+
+    @property
+    def mean(self) -> float:
+        return self.rates_sum / self.rates_count
+
+    def calc_m(self, percentage: float = WRATE_PERCENTAGE) -> float:
+        """Approximate calc_m: linear interpolation inside of a bin"""
+
+        if percentage < 0 or percentage > 1:
+            raise ValueError("Percentage should be in range(0, 1)")
+
+        # rank of the percentile as in np.percentile
+        rank = percentage * (self.counts.sum() - 1)
+        cumulative = np.cumsum(self.counts)
+        index = np.searchsorted(cumulative, rank, side="right")
+        index = min(index, len(self.bins) - 1)
+
+        lower = self.bins[index]
+        upper = self.bins[index + 1] if index + 1 < len(self.bins) else lower
+        before = cumulative[index] - self.counts[index]
+        inside = (rank - before + 0.5) / self.counts[index]
+        return lower + (upper - lower) * min(inside, 1)
+
+    def weighted_rate(self, chunk: pd.DataFrame, m: float | None = None) -> pd.Series:
+        if chunk.empty:
+            return pd.Series(index=chunk.index, dtype="float64")
+        if m is None:
+            m = self.calc_m()
+
+        rate = chunk[RATINGS.RATE].astype("float64").round(RATE_DECIMALS)
+        votes = chunk[RATINGS.VOTES].astype("float64")
+        return ((rate * votes) + (self.mean * m)) / (votes + m)
+
+
+def is_nullable(dtype: Any) -> bool:
+    """Nullable pandas dtype: Int16, boolean, ..."""
+
+    return hasattr(pd.api.types.pandas_dtype(dtype), "numpy_dtype")
+
+
+def key_index(keys: str | Iterable[str]) -> pd.Index:
+    """
+    Hashed set of keys for semi-joins of chunked dumps.
+    The hash table is built once and probed by every chunk,
+    while Series.isin rebuilds it for every call.
+    """
+
+    if isinstance(keys, str):
+        keys = [keys]
+    return pd.Index(pd.unique(np.asarray(list(keys), dtype=object)))
+
+
+def concat_chunks(
+    chunks: list[pd.DataFrame],
+    columns: Iterable[str] = (),
+) -> pd.DataFrame:
+    """Columnar sources skip empty row groups, so chunks may be absent"""
+
+    if not chunks:
+        return pd.DataFrame(columns=list(columns))
+    return pd.concat(chunks)
+
+
+def parse_options(
+    dtypes: dict[str, Any] | None = None,
+    columns: list[str] | None = None,
+) -> dict[str, Any]:
+    """read_csv options: schema dtypes, IMDb NA marker and projection"""
+
+    options = {
+        "na_values": [r"\N"],
+        "keep_default_na": False,
+    }
+    if dtypes:
+        # the C parser is slow on nullable dtypes, such columns
+        # are parsed as float64 and converted by cast_chunk
+        options["dtype"] = {
+            column: "float64" if is_nullable(dtype) else dtype
+            for column, dtype in dtypes.items()
+        }
+
+    # also drops unknown columns, e.g. index of filtered local dumps
+    usecols = columns or (list(dtypes) if dtypes else None)
+    if usecols:
+        usecols = set(usecols)
+        options["usecols"] = lambda column: column in usecols
+
+    return options
+
+
+def cast_chunk(
+    chunk: pd.DataFrame,
+    dtypes: dict[str, Any] | None = None,
+) -> pd.DataFrame:
+    if not dtypes:
+        return chunk
+
+    return chunk.astype(
+        {c: d for c, d in dtypes.items() if c in chunk and is_nullable(d)}
+    )
+
+
+def fingerprint(data: pd.DataFrame, key: str) -> pd.Series:
+    """Hash of every row except key, indexed by key"""
+
+    values = data.drop(columns=key).round(FINGERPRINT_DECIMALS)
+    # lists (genres, ...) are not hashable by pandas
+    hashes = pd.util.hash_pandas_object(values.astype(str), index=False)
+    return pd.Series(hashes.to_numpy(), index=data[key].to_numpy())
+
+
+class Delta(object):
+    """
+    Changes of imported rows since the last committed import.
+    inserted, updated: models of new and changed rows
+    deleted: keys of rows which are gone
+    commit() should be called after the changes are applied,
+    keys of rows which failed to apply are returned by the next delta.
+    """
+
+    def __init__(
+        self,
+        inserted: list[BaseModel],
+        updated: list[BaseModel],
+        deleted: list[str],
+        store: FingerprintStore,
+        name: str,
+        fingerprints: pd.Series,
+        previous: pd.Series | None = None,
+    ) -> None:
+        self.inserted = inserted
+        self.updated = updated
+        self.deleted = deleted
+
+        self.store = store
+        self.name = name
+        self.fingerprints = fingerprints
+        self.previous = previous
+
+    def __len__(self) -> int:
+        return len(self.inserted) + len(self.updated) + len(self.deleted)
+
+    def commit(self, failed: Iterable[str] = ()) -> None:
+        fingerprints = self.fingerprints
+        failed = fingerprints.index.intersection(list(failed))
+        if len(failed):
+            # failed rows keep the previous fingerprint, new ones have none
+            fingerprints = fingerprints.drop(failed)
+            if self.previous is not None:
+                known = failed.intersection(self.previous.index)
+                fingerprints = pd.concat([fingerprints, self.previous[known]])
+
+        self.store.save(self.name, fingerprints)
 
 
 class CustomFilter:
@@ -245,7 +468,204 @@ class CustomFilter:
         return df
 
 
+class IDSet(object):
+    """
+    Set of IMDb ids as a bitmap over encoded ids, one bit per id.
+    Probing is an array lookup instead of string hashing,
+    the bitmap of all titles takes a few megabytes.
+    lookups: the bitmap is memory-mapped from the store, so worker
+    processes map the file instead of unpickling a copy.
+    """
+
+    def __init__(
+        self,
+        ids: str | Iterable[str],
+        codec: IDCodec,
+        lookups: LookupStore | None = None,
+    ) -> None:
+        if isinstance(ids, str):
+            ids = [ids]
+
+        self.codec = codec
+        codes = codec.encode(ids)
+        codes = codes[codes >= 0]
+
+        mask = np.zeros(codes.max() + 1 if len(codes) else 0, dtype=bool)
+        mask[codes] = True
+        self.size = int(mask.sum())
+
+        self.bits = np.packbits(mask, bitorder="little")
+        if lookups is not None and len(self.bits):
+            self.bits = lookups.save(self.bits)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        if isinstance(self.bits, np.memmap):
+            state["bits"] = Path(self.bits.filename)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        if isinstance(state["bits"], Path):
+            state["bits"] = np.memmap(state["bits"], dtype=np.uint8, mode="r")
+        self.__dict__.update(state)
+
+    def contains(self, ids: Iterable[str]) -> np.ndarray:
+        codes = self.codec.encode(ids)
+        known = (codes >= 0) & (codes < len(self.bits) * 8)
+
+        codes = codes[known]
+        result = np.zeros(len(known), dtype=bool)
+        result[known] = (self.bits[codes >> 3] >> (codes & 7)) & 1
+        return result
+
+    def decode(self) -> np.ndarray:
+        """Ids of the set, sorted by code"""
+
+        bits = np.unpackbits(np.asarray(self.bits), bitorder="little")
+        return self.codec.decode(np.flatnonzero(bits))
+
+
+class KeyFilter:
+    """
+    Semi-join of chunks with a set of keys.
+    IMDb id columns are joined on encoded ids, others on strings.
+    """
+
+    def __init__(
+        self,
+        column: str,
+        keys: str | Iterable[str] | IDSet,
+        lookups: LookupStore | None = None,
+    ) -> None:
+        self.column = column
+
+        self.ids = None
+        self.index = None
+        if isinstance(keys, IDSet):
+            self.ids = keys
+        elif column in ID_CODECS:
+            self.ids = IDSet(keys, ID_CODECS[column], lookups)
+        else:
+            self.index = key_index(keys)
+
+    @property
+    def keys(self) -> pd.Index:
+        if self.ids is not None:
+            return pd.Index(self.ids.decode())
+        return self.index
+
+    def filter(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self.ids is not None:
+            return df[self.ids.contains(df[self.column])]
+        return df[self.index.get_indexer(df[self.column]) >= 0]
+
+
+class RangeFilter:
+    """Rows with missing values are dropped when any bound is set"""
+
+    def __init__(
+        self,
+        column: str,
+        min_value: int | None = None,
+        max_value: int | None = None,
+    ) -> None:
+        self.column = column
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def filter(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self.min_value is not None:
+            mask = df[self.column] >= self.min_value
+            df = df[mask.fillna(False)]
+
+        if self.max_value is not None:
+            mask = df[self.column] <= self.max_value
+            df = df[mask.fillna(False)]
+
+        return df
+
+
+class FilterChain:
+    def __init__(self, *filters: Any) -> None:
+        self.filters = [f for f in filters if f is not None]
+
+    def filter(self, df: pd.DataFrame) -> pd.DataFrame:
+        for chunk_filter in self.filters:
+            df = chunk_filter.filter(df)
+        return df
+
+
+class DumpParser:
+    """
+    Parses blocks of dump lines in worker processes.
+    Filters are applied in the worker,
+    so only filtered rows are sent back.
+    """
+
+    def __init__(
+        self,
+        header: list[str],
+        dtypes: dict[str, Any] | None = None,
+        columns: list[str] | None = None,
+        chunk_filter: Any | None = None,
+    ) -> None:
+        self.header = header
+        self.dtypes = dtypes
+        self.columns = columns
+        self.chunk_filter = chunk_filter
+
+    def parse(self, block: bytes) -> tuple[int, pd.DataFrame]:
+        """Return number of parsed rows and filtered chunk"""
+
+        chunk = pd.read_csv(
+            io.StringIO(block.decode("utf-8", errors="ignore")),
+            sep="\t",
+            header=None,
+            names=self.header,
+            quoting=csv.QUOTE_NONE,
+            **parse_options(self.dtypes, self.columns),
+        )
+        rows = len(chunk)
+
+        chunk = cast_chunk(chunk, self.dtypes)
+        if self.chunk_filter is not None:
+            chunk = self.chunk_filter.filter(chunk)
+        return rows, chunk
+
+
+# parser of the worker process, set by the pool initializer
+_parser: DumpParser | None = None
+
+
+def _init_parser(parser: DumpParser) -> None:
+    global _parser
+    _parser = parser
+
+
+def _parse_block(block: bytes) -> tuple[int, pd.DataFrame]:
+    return _parser.parse(block)
+
+
+def iter_blocks(file: Any, blocksize: int = BLOCKSIZE) -> Generator[bytes, None, None]:
+    """Blocks of whole lines"""
+
+    while True:
+        block = file.read(blocksize)
+        if not block:
+            return
+        yield block + file.readline()
+
+
 class IMDbDataSet(object):
+    """
+    cache_dir: directory for downloaded dumps, None - stream dumps from IMDb
+    snapshots: convert cached dumps to columnar snapshots once and read them
+    workers: number of processes parsing and filtering dumps, 1 - serial
+    """
+
     NAME = "name"
     AKAS = "akas"
     BASICS = "basics"
@@ -264,19 +684,153 @@ class IMDbDataSet(object):
         RATINGS: "https://datasets.imdbws.com/title.ratings.tsv.gz",
     }
 
+    DTYPES = {
+        NAME: notation.NAME.DTYPES,
+        AKAS: notation.AKAS.DTYPES,
+        BASICS: notation.BASICS.DTYPES,
+        CREW: notation.CREW.DTYPES,
+        PRINCIPALS: notation.PRINCIPALS.DTYPES,
+        RATINGS: notation.RATINGS.DTYPES,
+    }
+
     def __init__(
         self,
         debug: bool | None = None,
+        cache_dir: str | Path | None = CACHE_DIR,
+        snapshots: bool = True,
+        workers: int = 1,
     ):
         if debug is not None:
             self.debug = debug
         else:
             self.debug = settings.DEBUG
 
+        # without cache dumps are streamed from IMDb on every call
+        self.cache = None
+        self.snapshots = None
+        self.fingerprints = None
+        self.lookups = None
+        if cache_dir is not None:
+            self.cache = DumpCache(cache_dir)
+            self.fingerprints = FingerprintStore(cache_dir)
+            self.lookups = LookupStore(cache_dir)
+            if snapshots:
+                self.snapshots = SnapshotStore(cache_dir)
+
+        self.workers = workers
+        self.blocksize = BLOCKSIZE
+
+    def _read_dump(
+        self,
+        file: Any,
+        chunksize: int = CHUNKSIZE,
+        dtypes: dict[str, Any] | None = None,
+        columns: list[str] | None = None,
+        chunk_filter: Any | None = None,
+    ) -> Generator[pd.DataFrame, None, None]:
+        if self.workers > 1:
+            yield from self._read_dump_parallel(file, dtypes, columns, chunk_filter)
+            return
+
+        with gzip.open(
+            file,
+            "rt",
+            errors="ignore",
+        ) as tsv:
+            # IMDb dumps are not quoted
+            with pd.read_csv(
+                tsv,
+                sep="\t",
+                chunksize=chunksize,
+                quoting=csv.QUOTE_NONE,
+                **parse_options(dtypes, columns),
+            ) as reader:
+                for chunk in reader:
+                    chunk = cast_chunk(chunk, dtypes)
+                    if chunk_filter is not None:
+                        chunk = chunk_filter.filter(chunk)
+                    yield chunk
+
+    def _read_dump_parallel(
+        self,
+        file: Any,
+        dtypes: dict[str, Any] | None = None,
+        columns: list[str] | None = None,
+        chunk_filter: Any | None = None,
+    ) -> Generator[pd.DataFrame, None, None]:
+        """
+        The dump is decompressed here, blocks of lines are parsed
+        and filtered by workers. Chunks are yielded in order
+        and indexed as in the serial path.
+        """
+
+        with gzip.open(file, "rb") as dump:
+            header = dump.readline().decode("utf-8", errors="ignore")
+            parser = DumpParser(
+                header.rstrip("\r\n").split("\t"),
+                dtypes,
+                columns,
+                chunk_filter,
+            )
+
+            with ProcessPoolExecutor(
+                self.workers,
+                initializer=_init_parser,
+                initargs=(parser,),
+            ) as pool:
+                # bounded number of blocks in flight
+                pending = deque()
+                offset = 0
+
+                def next_chunk() -> pd.DataFrame:
+                    nonlocal offset
+                    rows, chunk = pending.popleft().result()
+                    chunk.index += offset
+                    offset += rows
+                    return chunk
+
+                for block in iter_blocks(dump, self.blocksize):
+                    pending.append(pool.submit(_parse_block, block))
+                    if len(pending) > 2 * self.workers:
+                        yield next_chunk()
+
+                while pending:
+                    yield next_chunk()
+
+    def ingest(
+        self,
+        data_name: str,
+        chunksize: int = CHUNKSIZE,
+    ) -> Path:
+        """
+        Download the dump and convert it to columnar snapshot.
+        Conversion runs once per dump version.
+        Return path of the snapshot.
+        """
+
+        if self.snapshots is None:
+            raise ValueError("Snapshots require cache_dir")
+        if data_name not in self.DTYPES:
+            raise ValueError(f"Dump {data_name} has no schema")
+
+        dump_path = self.cache.fetch(self.MAPPER[data_name])
+        if self.snapshots.is_fresh(dump_path):
+            return self.snapshots.path(dump_path)
+
+        dtypes = self.DTYPES[data_name]
+        return self.snapshots.build(
+            dump_path,
+            self._read_dump(dump_path, chunksize, dtypes),
+            dtypes,
+        )
+
     def _request_data(
         self,
         data_name: str,
         chunksize: int = CHUNKSIZE,
+        columns: list[str] | None = None,
+        filters: list[tuple[str, str, Any]] | None = None,
+        chunk_filter: Any | None = None,
     ) -> Generator[pd.DataFrame, None, None]:
         if data_name not in self.MAPPER:
             raise ValueError(
@@ -284,40 +838,85 @@ class IMDbDataSet(object):
                 list(self.MAPPER.keys()),
             )
 
-        response = requests.get(self.MAPPER[data_name], stream=True)
-        if response.status_code == 200:
-            with gzip.open(
-                io.BytesIO(response.content),
-                "rt",
-                errors="ignore",
-            ) as file:
-                yield from pd.read_csv(
-                    file,
-                    sep="\t",
-                    chunksize=chunksize,
+        if self.snapshots is not None and data_name in self.DTYPES:
+            chunks = self.snapshots.read(
+                self.ingest(data_name, chunksize),
+                self.DTYPES[data_name],
+                columns,
+                filters,
+                chunksize,
+            )
+            for chunk in chunks:
+                if chunk_filter is not None:
+                    chunk = chunk_filter.filter(chunk)
+                yield chunk
+            return
+
+        url = self.MAPPER[data_name]
+        dtypes = self.DTYPES.get(data_name, None)
+        if self.cache is not None:
+            yield from self._read_dump(
+                self.cache.fetch(url),
+                chunksize,
+                dtypes,
+                columns,
+                chunk_filter,
+            )
+            return
+
+        with requests.get(url, stream=True) as response:
+            if response.status_code == 200:
+                # decompress the dump while it is downloaded:
+                # only one chunk of rows is kept in memory
+                response.raw.decode_content = True
+                yield from self._read_dump(
+                    response.raw,
+                    chunksize,
+                    dtypes,
+                    columns,
+                    chunk_filter,
                 )
 
     def _get_local_data(
         self,
         path: str,
         chunksize: int = CHUNKSIZE,
-    ) -> Generator[pd.DataFrame, None, None] | pd.DataFrame:
+        columns: list[str] | None = None,
+        filters: list[tuple[str, str, Any]] | None = None,
+        dtypes: dict[str, Any] | None = None,
+        chunk_filter: Any | None = None,
+    ) -> Generator[pd.DataFrame, None, None]:
         if isinstance(path, Path):
             path = str(path)
 
+        options = parse_options(dtypes, columns)
+
         if path.endswith(".csv"):
-            data = pd.read_csv(path, chunksize=chunksize)
+            data = pd.read_csv(path, chunksize=chunksize, **options)
 
         elif path.endswith(".tsv"):
-            data = pd.read_csv(path, sep="\t", chunksize=chunksize)
+            data = pd.read_csv(
+                path,
+                sep="\t",
+                chunksize=chunksize,
+                quoting=csv.QUOTE_NONE,
+                **options,
+            )
 
         elif path.endswith(".xlsx"):
             data = pd.read_excel(path, chunksize=chunksize)
 
+        elif path.endswith(".parquet"):
+            data = iter([pd.read_parquet(path, columns=columns, filters=filters)])
+
         else:
-            raise ValueError("File should be .csv or .xlsx")
+            raise ValueError("File should be .csv, .tsv, .xlsx or .parquet")
 
-        return data
+        for chunk in data:
+            chunk = cast_chunk(chunk, dtypes)
+            if chunk_filter is not None:
+                chunk = chunk_filter.filter(chunk)
+            yield chunk
 
     def _get_data(
         self,
@@ -325,7 +924,19 @@ class IMDbDataSet(object):
         local_path: str = None,
         chunksize: int = 0,
         unpack_chunks: Callable | None = None,
+        columns: list[str] | None = None,
+        filters: list[tuple[str, str, Any]] | None = None,
+        chunk_filter: Any | None = None,
     ) -> pd.DataFrame:
+        """
+        columns: columns to read, None - all columns
+        filters: (column, op, value) conditions, used by columnar sources
+        to skip data.
+        chunk_filter: object with filter(chunk) method, applied to every
+        chunk before unpack_chunks, in worker processes if there are any.
+        Should be picklable.
+        """
+
         def default_unpack(
             data_chunks: Generator[pd.DataFrame, None, None],
         ) -> pd.DataFrame:
@@ -338,10 +949,23 @@ class IMDbDataSet(object):
             unpack_chunks = default_unpack
 
         if local_path:
-            data_chunks = self._get_local_data(local_path, chunksize)
+            data_chunks = self._get_local_data(
+                local_path,
+                chunksize,
+                columns,
+                filters,
+                self.DTYPES.get(data_name, None),
+                chunk_filter,
+            )
 
         else:
-            data_chunks = self._request_data(data_name, chunksize)
+            data_chunks = self._request_data(
+                data_name,
+                chunksize,
+                columns,
+                filters,
+                chunk_filter,
+            )
 
         return unpack_chunks(data_chunks)
 
@@ -356,41 +980,98 @@ class IMDbDataSet(object):
             chunksize,
         )
 
-    def get_basics(
+    def get_weighted_ratings(
         self,
         local_path: str | None = None,
         chunksize: int = CHUNKSIZE,
-        min_year: int | None = 1990,
-        max_year: int | None = 2040,
-        allowed_types: list[str] = ALLOWED_TYPES,
+        population: Iterable[str] | None = None,
     ) -> pd.DataFrame:
+        """
+        Ratings with weighted rate, computed in one pass over chunks.
+        population: titles which define the average rate and m,
+        e.g. only movies, not episodes. None - all titles.
+        Only ratings of the population are returned.
+        """
+
+        stats = RatingStats()
+
         def unpack_chunks(
             data_chunks: Generator[pd.DataFrame, None, None]
         ) -> pd.DataFrame:
-            to_int = partial(cast, to_type=int)
-
             data: list[pd.DataFrame] = []
             for chunk in data_chunks:
-                chunk[BASICS.START_YEAR] = chunk[BASICS.START_YEAR].apply(to_int)
+                stats.update(chunk)
+                data.append(chunk)
 
-                if min_year is not None:
-                    chunk = chunk[chunk[BASICS.START_YEAR] >= min_year]
+            return concat_chunks(data, RATINGS.DTYPES)
 
-                if max_year is not None:
-                    chunk = chunk[chunk[BASICS.START_YEAR] <= max_year]
+        chunk_filter = None
+        if population is not None:
+            chunk_filter = KeyFilter(RATINGS.TCONST, population, self.lookups)
 
-                if allowed_types is not None:
-                    chunk = chunk[chunk[BASICS.TITLE_TYPE].isin(allowed_types)]
+        data = self._get_data(
+            self.RATINGS,
+            local_path,
+            chunksize,
+            unpack_chunks=unpack_chunks,
+            chunk_filter=chunk_filter,
+        )
+        data[RATINGS.WRATE] = stats.weighted_rate(data)
+        return data
 
-                data.append(chunk)
+    def get_basics(
+        self,
+        local_path: str | None = None,
+        chunksize: int = CHUNKSIZE,
+        min_year: int | None = 1990,
+        max_year: int | None = 2040,
+        allowed_types: list[str] = ALLOWED_TYPES,
+        imdb_mvids: Iterable[str] | None = None,
+        columns: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        imdb_mvids: read only these titles
+        columns: columns to read, filtered columns are read anyway
+        """
+
+        # titles without start year are dropped
+        chunk_filter = FilterChain(RangeFilter(BASICS.START_YEAR, min_year, max_year))
+        if allowed_types is not None:
+            chunk_filter.filters.append(
+                CustomFilter(BASICS.TITLE_TYPE, list(allowed_types))
+            )
 
-            return pd.concat(data)
+        filters = []
+        if min_year is not None:
+            filters.append((BASICS.START_YEAR, ">=", min_year))
+        if max_year is not None:
+            filters.append((BASICS.START_YEAR, "<=", max_year))
+        if allowed_types is not None:
+            filters.append((BASICS.TITLE_TYPE, "in", list(allowed_types)))
+
+        if imdb_mvids is not None:
+            key_filter = KeyFilter(BASICS.TCONST, imdb_mvids, self.lookups)
+            chunk_filter.filters.append(key_filter)
+            filters.append((BASICS.TCONST, "in", list(key_filter.keys)))
+
+        if columns is not None:
+            columns = list(
+                dict.fromkeys(
+                    [BASICS.TCONST, BASICS.TITLE_TYPE, BASICS.START_YEAR, *columns]
+                )
+            )
 
         return self._get_data(
             self.BASICS,
             local_path,
             chunksize,
-            unpack_chunks=unpack_chunks,
+            unpack_chunks=lambda chunks: concat_chunks(
+                list(chunks),
+                columns or BASICS.DTYPES,
+            ),
+            columns=columns,
+            filters=filters,
+            chunk_filter=chunk_filter,
         )
 
     def get_akas(
@@ -398,104 +1079,150 @@ class IMDbDataSet(object):
         local_path: str | None = None,
         chunksize: int = CHUNKSIZE,
         title_regions: list[str] = TITLE_REGIONS,
-        customf: CustomFilter | None = None,
-    ) -> Dict[TR, pd.DataFrame]:
+        customf: CustomFilter | KeyFilter | None = None,
+    ) -> pd.DataFrame:
+        """
+        Titles by regions: tconst and one column per region.
+        Display titles (imdbDisplay) are preferred.
+        """
+
         def unpack_chunks(
             data_chunks: Generator[pd.DataFrame, None, None]
-        ) -> Dict[TR, pd.DataFrame]:
-            def sort_key(value):
-                if value == "imdbDisplay":
-                    return 0
-                else:
-                    return 1
+        ) -> pd.DataFrame:
+            # chunks are already filtered by regions
+            data = concat_chunks(list(data_chunks), columns)
 
-            data_by_region: Dict[TR, list[pd.DataFrame]] = {
-                tr: [] for tr in title_regions
-            }
+            # (title, region) pairs are encoded to a single integer key,
+            # so every column is hashed only once
+            tconsts, titles = pd.factorize(data[AKAS.TCONST], sort=True)
+            regions = pd.Categorical(data[AKAS.REGION], categories=title_regions)
+            key = tconsts * len(title_regions) + regions.codes
 
-            for chunk in data_chunks:
-                for title_region in title_regions:
-                    rchunk = chunk[chunk[AKAS.REGION] == title_region]
-                    if customf:
-                        rchunk = customf.filter(rchunk)
+            # 0 - display title, 1 - any other title of the region.
+            # filtered local dumps may have no types, titles are selected
+            types = data.get(AKAS.TYPES, pd.Series(None, index=data.index))
+            priority = types.ne(DISPLAY_TYPE).to_numpy(dtype="int8")
+
+            # best title of every pair: first row by (key, priority), stable
+            order = np.lexsort((priority, key))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = key[order][1:] != key[order][:-1]
+            best = order[first]
 
-                    data_by_region[title_region].append(rchunk)
+            wide = np.full((len(titles), len(title_regions)), np.nan, dtype=object)
+            wide[tconsts[best], regions.codes[best]] = data[AKAS.TITLE].to_numpy()[best]
 
-            for title_region in data_by_region:
-                data_by_region[title_region] = (
-                    pd.concat(data_by_region[title_region])
-                    .sort_values(by=[AKAS.TYPES], key=lambda x: x.map(sort_key))
-                    .drop_duplicates(subset=[AKAS.TCONST])
-                    .rename(columns={AKAS.TITLE: title_region})
-                )[[AKAS.TCONST, title_region, AKAS.TYPES]]
+            akas = pd.DataFrame(wide, columns=title_regions)
+            akas.insert(0, AKAS.TCONST, titles)
+            return akas
 
-            return data_by_region
+        columns = [AKAS.TCONST, AKAS.TITLE, AKAS.REGION, AKAS.TYPES]
+        if customf and customf.column not in columns:
+            columns.append(customf.column)
 
         return self._get_data(
             self.AKAS,
             local_path,
             chunksize=chunksize,
             unpack_chunks=unpack_chunks,
+            columns=columns,
+            filters=[(AKAS.REGION, "in", list(title_regions))],
+            chunk_filter=FilterChain(
+                CustomFilter(AKAS.REGION, list(title_regions)),
+                customf,
+            ),
         )
 
-    def check_nulls(self, data: pd.DataFrame) -> pd.DataFrame:
-        return data.replace(r"\N", None)
-
     def get_movies(
         self,
         amount: int = 10000,
     ) -> list[IMDbMovieServiceDM]:
-        # if debug - we use local filtered (small) dumps
-        if self.debug:
-            data = self.get_basics(BASICS_FILTERED)
-            ratings = self.get_ratings(RATINGS_FILTERED)
-            akas = self.get_akas(AKAS_FILTERED, title_regions=TITLE_REGIONS)
+        return IMDbMovieFactory().from_dataframe(self._get_movies_data(amount))
 
-        else:
-            data = self.get_basics()
-            ratings = self.get_ratings()
-            akas = self.get_akas(title_regions=TITLE_REGIONS)
+    def get_movies_delta(
+        self,
+        amount: int = 10000,
+        name: str = "movies",
+    ) -> Delta:
+        """
+        Movies changed since the last committed delta of the same name.
+        Without committed deltas every movie is inserted.
+        """
+
+        if self.fingerprints is None:
+            raise ValueError("Deltas require cache_dir")
+
+        data = self._get_movies_data(amount)
+        factory = IMDbMovieFactory()
+
+        current = fingerprint(factory.prepare(data), "imdb_mvid")
+        previous = self.fingerprints.load(name)
+
+        inserted = ~current.index.isin(previous.index)
+        # hashes are compared as uint64, reindex with NA would cast to float
+        known = previous.reindex(current.index[~inserted]).to_numpy()
+        updated = np.zeros(len(current), dtype=bool)
+        updated[~inserted] = known != current.to_numpy()[~inserted]
+        deleted = previous.index.difference(current.index)
+
+        return Delta(
+            inserted=factory.from_dataframe(data[inserted]),
+            updated=factory.from_dataframe(data[updated]),
+            deleted=list(deleted),
+            store=self.fingerprints,
+            name=name,
+            fingerprints=current,
+            previous=previous,
+        )
 
-        ### should we filter it before make wrate?
-        ratings[RATINGS.WRATE] = bayesian_rate(ratings)
+    def _get_movies_data(self, amount: int) -> pd.DataFrame:
+        """
+        Top movies by wrate. Movies are selected on ratings first,
+        basics and akas are read only for the selected ones.
+        """
+
+        # if debug - we use local filtered (small) dumps
+        basics_path, ratings_path, akas_path = None, None, None
+        if self.debug:
+            basics_path = BASICS_FILTERED
+            ratings_path = RATINGS_FILTERED
+            akas_path = AKAS_FILTERED
+
+        population = self.get_basics(basics_path, columns=[BASICS.TCONST])
+        # wrate is weighted among the selected titles only:
+        # episodes, shorts, ... do not affect m and the average rate
+        ratings = self.get_weighted_ratings(
+            ratings_path,
+            population=population[BASICS.TCONST],
+        )
+        del population
+
+        # films without any rate are skipped
+        ratings = ratings[ratings[RATINGS.RATE].notna()]
+        data = ratings.nlargest(amount, RATINGS.WRATE)
+        del ratings
+
+        imdb_mvids = data[RATINGS.TCONST]
+        basics = self.get_basics(basics_path, imdb_mvids=imdb_mvids)
+        akas = self.get_akas(
+            akas_path,
+            title_regions=TITLE_REGIONS,
+            customf=KeyFilter(AKAS.TCONST, imdb_mvids, self.lookups),
+        )
 
+        # left joins keep descending wrate order
+        data = data.merge(basics, how="left", on=BASICS.TCONST)
         data = data.merge(
-            ratings,
+            akas,
             how="left",
             left_on=BASICS.TCONST,
-            right_on=BASICS.TCONST,
+            right_on=AKAS.TCONST,
         )
 
-        for title_region in akas:
-            data = data.merge(
-                akas[title_region][[AKAS.TCONST, title_region]],
-                how="left",
-                left_on=BASICS.TCONST,
-                right_on=AKAS.TCONST,
-            )
-
-        data = self.check_nulls(data)
-
-        # filter films without any rate
-        data = data[data[RATINGS.RATE].notna()]
-
-        # sorting by descending rating
-        data = data.sort_values(by=[RATINGS.WRATE], ascending=False)
-
-        # preprocess
-        to_int = partial(cast, to_type=int)
-        to_float = partial(cast, to_type=float)
-        to_bool = partial(cast, to_type=bool)
+        rate = data[RATINGS.RATE].astype("float64")
+        data[RATINGS.RATE] = rate.round(RATE_DECIMALS)
 
-        data[BASICS.IS_ADULT] = data[BASICS.IS_ADULT].apply(to_bool)
-        data[BASICS.RUNTIME] = data[BASICS.RUNTIME].apply(to_int)
-        data[RATINGS.RATE] = data[RATINGS.RATE].apply(to_float)
-        data[RATINGS.WRATE] = data[RATINGS.WRATE].apply(to_float)
-        data[RATINGS.VOTES] = data[RATINGS.VOTES].apply(to_int)
-
-        return IMDbMovieFactory().from_dataframe(
-            data[:amount],
-        )
+        return data
 
     def get_crew(
         self,
@@ -537,25 +1264,33 @@ class IMDbDataSet(object):
         ) -> pd.DataFrame:
             data: list[pd.DataFrame] = []
             for data_chunk in data_chunks:
-                if imdb_mvids:
-                    data_chunk = data_chunk[
-                        data_chunk[PRINCIPALS.TCONST].isin(imdb_mvids)
-                    ]
                 if only_professions:
-                    data_chunk = data_chunk[[PRINCIPALS.CATEGORY, PRINCIPALS.JOB]]
+                    data_chunk = data_chunk[professions]
 
                 data.append(data_chunk)
 
-            return pd.concat(data)
+            return concat_chunks(data, professions if only_professions else columns)
 
-        if imdb_mvids and not isinstance(imdb_mvids, (list, set, tuple, pd.Series)):
-            imdb_mvids = [imdb_mvids]
+        chunk_filter = None
+        filters = None
+        if imdb_mvids is not None and len(imdb_mvids):
+            chunk_filter = KeyFilter(PRINCIPALS.TCONST, imdb_mvids, self.lookups)
+            filters = [(PRINCIPALS.TCONST, "in", list(chunk_filter.keys))]
+
+        columns = list(PRINCIPALS.DTYPES)
+        professions = [PRINCIPALS.CATEGORY, PRINCIPALS.JOB]
+        if only_professions:
+            # tconst is still needed to filter chunks
+            columns = professions + [PRINCIPALS.TCONST]
 
         return self._get_data(
             self.PRINCIPALS,
             local_path,
             chunksize,
             unpack_chunks=unpack_chunks,
+            columns=columns,
+            filters=filters,
+            chunk_filter=chunk_filter,
         )
 
     def get_names(
@@ -564,53 +1299,140 @@ class IMDbDataSet(object):
         chunksize: int = CHUNKSIZE,
         imdb_nmids: list[str] | None = None,
     ) -> pd.DataFrame:
-        def unpack_chunks(
-            data_chunks: Generator[pd.DataFrame, None, None]
-        ) -> pd.DataFrame:
-            data: list[pd.DataFrame] = []
-            for data_chunk in data_chunks:
-                if imdb_nmids:
-                    data_chunk = data_chunk[data_chunk[NAME.NCONST].isin(imdb_nmids)]
+        chunk_filter = None
+        filters = None
+        if imdb_nmids is not None and len(imdb_nmids):
+            chunk_filter = KeyFilter(NAME.NCONST, imdb_nmids, self.lookups)
+            filters = [(NAME.NCONST, "in", list(chunk_filter.keys))]
 
-                data.append(data_chunk)
+        return self._get_data(
+            self.NAME,
+            local_path,
+            chunksize,
+            unpack_chunks=lambda chunks: concat_chunks(list(chunks), NAME.DTYPES),
+            filters=filters,
+            chunk_filter=chunk_filter,
+        )
 
-            return pd.concat(data)
+    def get_principal_nmids(
+        self,
+        imdb_mvids: Iterable[str],
+        chunksize: int = CHUNKSIZE,
+    ) -> np.ndarray:
+        """Unique persons of imdb_mvids, only two columns are read"""
 
-        if imdb_nmids and not isinstance(imdb_nmids, (list, set, tuple, pd.Series)):
-            imdb_nmids = [imdb_nmids]
+        local_path = PRINCIPALS_FILTERED if self.debug else None
+        if not len(imdb_mvids):
+            return np.array([], dtype=object)
 
-        return self._get_data(
+        chunk_filter = KeyFilter(PRINCIPALS.TCONST, imdb_mvids, self.lookups)
+        columns = [PRINCIPALS.TCONST, PRINCIPALS.NCONST]
+        principals = self._get_data(
             self.PRINCIPALS,
             local_path,
             chunksize,
-            unpack_chunks=unpack_chunks,
+            unpack_chunks=lambda chunks: concat_chunks(list(chunks), columns),
+            columns=columns,
+            filters=[(PRINCIPALS.TCONST, "in", list(chunk_filter.keys))],
+            chunk_filter=chunk_filter,
+        )
+        return IDSet(principals[PRINCIPALS.NCONST], NAME_ID).decode()
+
+    def iter_principals(
+        self,
+        imdb_mvids: Iterable[str] | None = None,
+        chunksize: int = CHUNKSIZE,
+    ) -> Generator[list[IMDbPrincipalServiceDM], None, None]:
+        """
+        Principals of imdb_mvids in batches of models, one per dump chunk.
+        None - all principals. Only one chunk is kept in memory.
+        """
+
+        local_path = PRINCIPALS_FILTERED if self.debug else None
+
+        chunk_filter = None
+        filters = None
+        if imdb_mvids is not None:
+            chunk_filter = KeyFilter(PRINCIPALS.TCONST, imdb_mvids, self.lookups)
+            filters = [(PRINCIPALS.TCONST, "in", list(chunk_filter.keys))]
+
+        chunks = self._get_data(
+            self.PRINCIPALS,
+            local_path,
+            chunksize,
+            unpack_chunks=lambda chunks: chunks,
+            filters=filters,
+            chunk_filter=chunk_filter,
         )
 
+        factory = IMDbMoviePrincipalsFactory()
+        for chunk in chunks:
+            if not chunk.empty:
+                yield factory.from_dataframe(chunk)
+
+    def iter_persons(
+        self,
+        imdb_nmids: Iterable[str] | None = None,
+        chunksize: int = CHUNKSIZE,
+    ) -> Generator[list[IMDbPersonServiceDM], None, None]:
+        """
+        Persons of imdb_nmids in batches of models, one per dump chunk.
+        None - all persons. Only one chunk is kept in memory.
+        """
+
+        local_path = PERSONS_FILTERED if self.debug else None
+
+        chunk_filter = None
+        filters = None
+        if imdb_nmids is not None:
+            chunk_filter = KeyFilter(NAME.NCONST, imdb_nmids, self.lookups)
+            filters = [(NAME.NCONST, "in", list(chunk_filter.keys))]
+
+        chunks = self._get_data(
+            self.NAME,
+            local_path,
+            chunksize,
+            unpack_chunks=lambda chunks: chunks,
+            filters=filters,
+            chunk_filter=chunk_filter,
+        )
+
+        factory = IMDbPersonFactory()
+        for chunk in chunks:
+            if not chunk.empty:
+                yield factory.from_dataframe(chunk)
+
     def get_movie_crew(
         self,
         imdb_mvids: list[str],
+        chunksize: int = CHUNKSIZE,
     ) -> tuple[list[IMDbPrincipalServiceDM], list[IMDbPersonServiceDM]]:
-        if self.debug:
-            principals = self.get_principals(
-                PRINCIPALS_FILTERED,
-                imdb_mvids=imdb_mvids,
-            )
-            imdb_nmids = list(set(principals[PRINCIPALS.NCONST]))
+        """
+        Streaming semi-join of the dumps: principals of imdb_mvids are
+        selected chunk by chunk, then names of the matched persons.
+        Memory is bounded by the result, not by the dumps.
+        """
 
-            persons = self.get_names(
-                PERSONS_FILTERED,
-                imdb_nmids=imdb_nmids,
-            )
+        principals_path, persons_path = None, None
+        if self.debug:
+            principals_path, persons_path = PRINCIPALS_FILTERED, PERSONS_FILTERED
 
-        else:
-            raise ValueError("Not optimized: need >20gb RAM")
+        if not len(imdb_mvids):
+            return [], []
 
-            # principals = self.get_principals(imdb_mvids=imdb_mvids)
-            # imdb_nmids = list(set(principals[PRINCIPALS.NCONST]))
-            # persons = self.get_names(imdb_nmids=imdb_nmids)
+        principals = self.get_principals(
+            principals_path,
+            chunksize,
+            imdb_mvids=imdb_mvids,
+        )
+        if principals.empty:
+            return [], []
 
-        principals = self.check_nulls(principals)
-        persons = self.check_nulls(persons)
+        persons = self.get_names(
+            persons_path,
+            chunksize,
+            imdb_nmids=IDSet(principals[PRINCIPALS.NCONST], NAME_ID, self.lookups),
+        )
 
         principals_data = IMDbMoviePrincipalsFactory().from_dataframe(principals)
         persons_data = IMDbPersonFactory().from_dataframe(persons)
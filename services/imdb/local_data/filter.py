@@ -64,15 +64,14 @@ def filter_movies():
     akasf = CustomFilter(AKAS.TCONST, ids)
 
     # upload akas
-    akas_dict = dataset.get_akas(str(LOCAL_DATA / AKAS_PATH), customf=akasf)
-
-    akas_list = []
-    for title_region, df in akas_dict.items():
-        df[AKAS.REGION] = title_region
-        df = df.rename(columns={title_region: AKAS.TITLE})
-        akas_list.append(df)
-
-    akas = pd.concat(akas_list)
+    akas = dataset.get_akas(str(LOCAL_DATA / AKAS_PATH), customf=akasf)
+
+    # one (already selected) title per row: tconst, region, title
+    akas = akas.melt(
+        id_vars=[AKAS.TCONST],
+        var_name=AKAS.REGION,
+        value_name=AKAS.TITLE,
+    ).dropna(subset=[AKAS.TITLE])
 
     ratings = ratingsf.filter(ratings)
     basics = basicsf.filter(basics)
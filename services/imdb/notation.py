@@ -1,10 +1,32 @@
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
 class TITLE_REGION:
     US = "US"
     RU = "RU"
 
 
+TITLE_TYPES = [
+    "short",
+    "movie",
+    "tvShort",
+    "tvMovie",
+    "tvSeries",
+    "tvEpisode",
+    "tvMiniSeries",
+    "tvSpecial",
+    "video",
+    "videoGame",
+    "tvPilot",
+]
+
+
 class NOTATION(object):
-    pass
+    # column -> pandas dtype of the parsed dump
+    DTYPES: dict[str, str | type | pd.CategoricalDtype] = {}
 
 
 class AKAS(NOTATION):
@@ -17,6 +39,17 @@ class AKAS(NOTATION):
     ATTRIBUTES = "attributes"
     IS_ORIGINAL_TITLE = "isOriginalTitle"
 
+    DTYPES = {
+        TCONST: str,
+        ORDERING: "Int16",
+        TITLE: str,
+        REGION: str,
+        LANGUAGE: str,
+        TYPES: str,
+        ATTRIBUTES: str,
+        IS_ORIGINAL_TITLE: "boolean",
+    }
+
 
 class BASICS(NOTATION):
     TCONST = "tconst"
@@ -29,6 +62,18 @@ class BASICS(NOTATION):
     RUNTIME = "runtimeMinutes"
     GENRES = "genres"
 
+    DTYPES = {
+        TCONST: str,
+        TITLE_TYPE: pd.CategoricalDtype(TITLE_TYPES),
+        PRIMARY_TITLE: str,
+        ORIGINAL_TITLE: str,
+        IS_ADULT: "boolean",
+        START_YEAR: "Int16",
+        END_YEAR: "Int16",
+        RUNTIME: "Int32",
+        GENRES: str,
+    }
+
 
 class RATINGS(NOTATION):
     TCONST = "tconst"
@@ -37,6 +82,12 @@ class RATINGS(NOTATION):
 
     WRATE = "wrate"
 
+    DTYPES = {
+        TCONST: str,
+        RATE: "float32",
+        VOTES: "Int32",
+    }
+
 
 class NAME(NOTATION):
     NCONST = "nconst"
@@ -46,6 +97,15 @@ class NAME(NOTATION):
     PRIMARY_PROFESSION = "primaryProfession"
     KNOWN_FOR_TITLES = "knownForTitles"
 
+    DTYPES = {
+        NCONST: str,
+        PRIMARY_NAME: str,
+        BIRTH_YEAR: "Int16",
+        DEATH_YEAR: "Int16",
+        PRIMARY_PROFESSION: str,
+        KNOWN_FOR_TITLES: str,
+    }
+
 
 class PRINCIPALS(NOTATION):
     TCONST = "tconst"
@@ -55,8 +115,124 @@ class PRINCIPALS(NOTATION):
     JOB = "job"
     CHARACHTERS = "characters"
 
+    DTYPES = {
+        TCONST: str,
+        ORDERING: "Int16",
+        NCONST: str,
+        CATEGORY: str,
+        JOB: str,
+        CHARACHTERS: str,
+    }
+
 
 class CREW(NOTATION):
     TCONST = "tconst"
     DIRECTORS = "directors"
     WRITERS = "writers"
+
+    DTYPES = {
+        TCONST: str,
+        DIRECTORS: str,
+        WRITERS: str,
+    }
+
+
+class IDCodec(object):
+    """
+    Reversible encoding of IMDb ids to integers: tt0111161 <-> 111161.
+    Ids have at least `digits` digits, zero padded. Malformed ids are -1.
+    """
+
+    DTYPE = np.int32
+    MAX_DIGITS = len(str(np.iinfo(DTYPE).max))
+
+    def __init__(self, prefix: str, digits: int = 7) -> None:
+        self.prefix = prefix
+        self.digits = digits
+
+    def encode(self, ids: Iterable[str]) -> np.ndarray:
+        if not isinstance(ids, (list, tuple, np.ndarray, pd.Series, pd.Index)):
+            ids = list(ids)
+
+        # fixed width array of characters: ascii bytes or unicode code points
+        try:
+            ids = np.asarray(ids, dtype=bytes)
+            char = np.uint8
+        except UnicodeEncodeError:
+            # such ids are malformed, but the rest of them are not
+            ids = np.asarray(ids, dtype=str)
+            char = np.uint32
+
+        ids = np.ascontiguousarray(ids.reshape(-1))
+        width = ids.dtype.itemsize // np.dtype(char).itemsize
+        size = width - len(self.prefix)
+        if not len(ids) or size < self.digits:
+            return np.full(len(ids), -1, dtype=self.DTYPE)
+
+        def field(start: int, length: int) -> np.ndarray:
+            """Strided view of characters [start, start + length) of every id"""
+
+            return np.ndarray(
+                len(ids),
+                dtype=f"{ids.dtype.kind}{length}",
+                buffer=ids,
+                offset=start * np.dtype(char).itemsize,
+                strides=ids.strides,
+            )
+
+        prefix = self.prefix if char is np.uint32 else self.prefix.encode()
+        valid = field(0, len(self.prefix)) == prefix
+        # shorter ids are padded with zero code points
+        lengths = np.char.str_len(field(len(self.prefix), size))
+
+        chars = ids.view(char).reshape(len(ids), width)[:, len(self.prefix) :]
+        padding = chars == 0
+        # padding wraps around as unsigned and is not a digit
+        digits = chars - char(ord("0"))
+        valid &= ((digits <= 9) | padding).all(axis=1)
+        valid &= (lengths >= self.digits) & (lengths <= self.MAX_DIGITS)
+        # tt00111161 would be decoded as tt0111161
+        valid &= (lengths == self.digits) | (digits[:, 0] != 0)
+
+        # padding is read as trailing zeros and then divided out,
+        # longer ids are invalid anyway
+        size = min(size, self.MAX_DIGITS)
+        digits = np.where(padding, 0, digits)[:, :size].astype(np.int64)
+        powers = 10 ** np.arange(size - 1, -1, -1, dtype=np.int64)
+        codes = digits @ powers // 10 ** np.clip(size - lengths, 0, size)
+        valid &= codes <= np.iinfo(self.DTYPE).max
+
+        return np.where(valid, codes, -1).astype(self.DTYPE)
+
+    def decode(self, codes: Iterable[int]) -> np.ndarray:
+        codes = np.asarray(codes)
+        if not len(codes):
+            return np.array([], dtype=object)
+
+        codes = codes.astype(np.int64)
+        lengths = np.maximum(
+            np.floor(np.log10(np.maximum(codes, 1))).astype(np.int64) + 1,
+            self.digits,
+        )
+        width = len(self.prefix) + lengths.max()
+
+        chars = np.zeros((len(codes), width), dtype=np.uint32)
+        chars[:, : len(self.prefix)] = [ord(c) for c in self.prefix]
+        for column in range(lengths.max()):
+            # digit of 10 ** exponent, ids shorter than the column are padded
+            exponent = lengths - 1 - column
+            digits = codes // 10 ** np.maximum(exponent, 0) % 10 + ord("0")
+            chars[:, len(self.prefix) + column] = np.where(exponent >= 0, digits, 0)
+
+        return chars.view(f"U{width}").reshape(-1).astype(object)
+
+
+TITLE_ID = IDCodec("tt")
+NAME_ID = IDCodec("nm")
+
+# id columns of the dumps
+ID_CODECS = {
+    BASICS.TCONST: TITLE_ID,
+    AKAS.TCONST: TITLE_ID,
+    NAME.NCONST: NAME_ID,
+}
@@ -1,18 +1,38 @@
 import re
 import sys
+import json
 import asyncio
 from pathlib import Path
 
 import aiohttp
+from lxml import html as lxml_html
 from bs4 import BeautifulSoup as soup
 from tqdm.asyncio import tqdm_asyncio
 
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from services.base_scraper import BaseScraper
+from services.response_cache import ResponseCache
+from services.scraper_metrics import ScraperMetrics, endpoint
 from services.models import IMDbMovieExtraInfoServiceDM
 from services.imdb.settings import settings
 
+RESPONSES_CACHE = Path(__file__).parent / "cache" / "responses.sqlite"
+
+DAY = 24 * 3600
+
+# data embedded into title pages, found without building a tree
+NEXT_DATA_RX = re.compile(
+    r'<script[^>]*\bid="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL
+)
+JSON_LD_RX = re.compile(
+    r'<script[^>]*\btype="application/ld\+json"[^>]*>(.*?)</script>', re.DOTALL
+)
+# parts of title pages read by _parse_movie
+TITLE_MARKERS = ("__NEXT_DATA__", "application/ld+json", "ipc-media")
+POSTER_XPATH = '//div[contains(concat(" ", @class, " "), " ipc-media ")]//img/@src'
+IMAGE_SIZE_RX = re.compile(r"\._V1_.*", re.IGNORECASE)
+
 
 class IMDbEmptyResponeError(Exception):
     pass
@@ -40,6 +60,10 @@ class IMDBMovieExtraInfoFactory:
             error=self._error,
             imdb_mvid=kwargs.get("imdb_mvid"),
             image_url=self._get("image_url", **kwargs),
+            image_width=self._get("image_width", **kwargs),
+            image_height=self._get("image_height", **kwargs),
+            plot=self._get("plot", **kwargs),
+            content_rating=self._get("content_rating", **kwargs),
         )
 
     def _get(self, key: str, **kwargs):
@@ -57,18 +81,29 @@ class IMDBMovieExtraInfoFactory:
 class IMDbScraper(BaseScraper):
     """Recommended limit is 5r/1s and lower"""
 
+    CACHE_TTLS = {r"/title/": 30 * DAY}
+
     def __init__(
         self,
-        proxy: str = None,
+        proxy: str | list[str] | None = None,
         max_rate: int = settings.IMDB_MAX_RATE,
         rate_period: int = settings.IMDB_RATE_PERIOD,
         debug: bool = False,
+        cache: ResponseCache | None = None,
+        metrics: ScraperMetrics | None = None,
     ) -> None:
+        """
+        cache: responses cache, None - no cache
+        metrics: metrics of requests, None - own metrics
+        """
+
         super().__init__(
             proxy,
             max_rate,
             rate_period,
             debug,
+            cache=cache,
+            metrics=metrics,
         )
 
         self.factory = IMDBMovieExtraInfoFactory()
@@ -85,17 +120,82 @@ class IMDbScraper(BaseScraper):
         data = await response.text()
         return data
 
-    def _parse_movie(self, movie_html: str, data: dict = {}) -> dict:
-        s = soup(movie_html, "lxml")
+    def cacheable(self, url: str, movie_html: str) -> bool:
+        """Error and captcha pages come with 200 too, only title pages are cached"""
 
-        img = s.find("div", {"class": "ipc-media"})
-        img = img.find("img").get("src")
-        img = re.sub(r"\._V1_.*", ".jpg", img, flags=re.IGNORECASE)
+        try:
+            self._check_response(movie_html, url)
+        except (IMDbEmptyResponeError, IMDb503Error, IMDb404Error):
+            return False
+        return any(marker in movie_html for marker in TITLE_MARKERS)
+
+    def _parse_movie(self, movie_html: str, data: dict | None = None) -> dict:
+        """
+        Data embedded as __NEXT_DATA__ and JSON-LD is read first, the poster
+        is searched in the html only when they miss it: by XPath and then,
+        for malformed pages, by BeautifulSoup.
+        """
 
-        data["image_url"] = img
+        data = data if data is not None else {}
+        for parse in [self._parse_next_data, self._parse_json_ld]:
+            for key, value in parse(movie_html).items():
+                if data.get(key) is None and value is not None:
+                    data[key] = value
 
+        if data.get("image_url") is None:
+            data["image_url"] = self._parse_poster(movie_html)
+
+        data["image_url"] = IMAGE_SIZE_RX.sub(".jpg", data["image_url"])
         return data
 
+    def _load_script(self, rx: re.Pattern, movie_html: str) -> dict:
+        match = rx.search(movie_html)
+        if match is None:
+            return {}
+        try:
+            data = json.loads(match.group(1))
+        except json.JSONDecodeError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _parse_next_data(self, movie_html: str) -> dict:
+        next_data = self._load_script(NEXT_DATA_RX, movie_html)
+        movie = next_data.get("props", {}).get("pageProps", {})
+        movie = movie.get("aboveTheFoldData") or {}
+
+        image = movie.get("primaryImage") or {}
+        plot = (movie.get("plot") or {}).get("plotText") or {}
+        certificate = movie.get("certificate") or {}
+        return {
+            "image_url": image.get("url"),
+            "image_width": image.get("width"),
+            "image_height": image.get("height"),
+            "plot": plot.get("plainText"),
+            "content_rating": certificate.get("rating"),
+        }
+
+    def _parse_json_ld(self, movie_html: str) -> dict:
+        movie = self._load_script(JSON_LD_RX, movie_html)
+
+        image = movie.get("image")
+        return {
+            "image_url": image if isinstance(image, str) else None,
+            "plot": movie.get("description"),
+            "content_rating": movie.get("contentRating"),
+        }
+
+    def _parse_poster(self, movie_html: str) -> str:
+        try:
+            src = lxml_html.fromstring(movie_html).xpath(POSTER_XPATH)
+        except ValueError:
+            src = []
+        if src:
+            return src[0]
+
+        s = soup(movie_html, "lxml")
+        img = s.find("div", {"class": "ipc-media"})
+        return img.find("img").get("src")
+
     def _check_response(self, movie_html: str, imdb_mvid: str) -> None:
         ERROR503 = "Error 503 - IMDb"
         ERROR404 = "404 Error - IMDb"
@@ -118,7 +218,11 @@ class IMDbScraper(BaseScraper):
         movie_html = await self.request(URL)
         self._check_response(movie_html, imdb_mvid)
 
-        movie_data = self._parse_movie(movie_html, movie_data)
+        # parsing of hundreds of KB doesn't block concurrent requests
+        with self.metrics.timer(type(self).__name__, endpoint(URL), "parse"):
+            movie_data = await asyncio.to_thread(
+                self._parse_movie, movie_html, movie_data
+            )
         return self.factory.create(**movie_data)
 
 
@@ -1,10 +1,91 @@
 import re
+import csv
+import pickle
 import sys
+import gzip
+import tempfile
+import threading
 from pathlib import Path
+from functools import partial
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 
+import pytest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 sys.path.append(str(Path(__file__).parent.parent.parent.parent))
-from services.imdb.dataset import IMDbDataSet
+from services.imdb.dataset import (
+    IMDbDataSet,
+    IMDbMoviePrincipalsFactory,
+    IDSet,
+    KeyFilter,
+    RatingStats,
+    bayesian_rate,
+    calc_m,
+    AKAS_FILTERED,
+    BASICS_FILTERED,
+    PERSONS_FILTERED,
+    PRINCIPALS_FILTERED,
+    RATINGS_FILTERED,
+)
+from services.imdb.cache import FingerprintStore
+from services.imdb.notation import (
+    RATINGS,
+    BASICS,
+    AKAS,
+    PRINCIPALS,
+    NAME,
+    TITLE_REGION as TR,
+    TITLE_ID,
+    NAME_ID,
+)
+
+
+class DumpHandler(SimpleHTTPRequestHandler):
+    """Static file handler which records (path, request headers, status)"""
+
+    log: list[tuple[str, dict, int]] = []
+
+    def send_response(self, code, message=None) -> None:
+        self.log.append((self.path, dict(self.headers), code))
+        super().send_response(code, message)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@contextmanager
+def serve_dumps(frames: dict[str, pd.DataFrame]):
+    """Serve dataframes as gzipped IMDb dumps from a local HTTP server"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, frame in frames.items():
+            with gzip.open(Path(tmp) / f"{name}.tsv.gz", "wt") as file:
+                # IMDb dumps are not quoted
+                frame.to_csv(
+                    file,
+                    sep="\t",
+                    index=False,
+                    na_rep="\\N",
+                    quoting=csv.QUOTE_NONE,
+                )
+
+        handler = type("Handler", (DumpHandler,), {"log": []})
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            partial(handler, directory=tmp),
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        url = f"http://127.0.0.1:{server.server_port}"
+        try:
+            yield {name: f"{url}/{name}.tsv.gz" for name in frames}, handler.log
+        finally:
+            server.shutdown()
+            server.server_close()
 
 
 class TestIMDbDataset:
@@ -30,6 +111,18 @@ class TestIMDbDataset:
         assert movie.votes >= 2500000
         assert "Drama" in movie.genres
 
+    def test_dataset_dtypes(self):
+        ds = self.get_dataset()
+
+        basics = ds.get_basics(BASICS_FILTERED)
+        assert basics[BASICS.TITLE_TYPE].dtype == "category"
+        assert basics[BASICS.START_YEAR].dtype == "Int16"
+        assert basics[BASICS.END_YEAR].isna().all()
+        assert "Unnamed: 0" not in basics.columns
+
+        ratings = ds.get_ratings(RATINGS_FILTERED)
+        assert ratings[RATINGS.RATE].dtype == "float32"
+
     def test_dataset_movie_crew(self):
         ds = self.get_dataset()
 
@@ -49,3 +142,325 @@ class TestIMDbDataset:
         assert person.birth_y == 1937
         assert person.professions == ["actor", "producer", "director"]
         assert "tt0097239" in person.known_for_titles
+
+    def test_rating_stats(self):
+        ratings = self.get_dataset().get_ratings(RATINGS_FILTERED)
+
+        stats = RatingStats()
+        for start in range(0, len(ratings), 100):
+            stats.update(ratings[start : start + 100])
+
+        m = calc_m(ratings, 0.995)
+        assert abs(stats.calc_m() - m) / m < 0.005
+        assert abs(stats.calc_m(0.5) - calc_m(ratings, 0.5)) / m < 0.005
+        assert stats.mean == pytest.approx(ratings[RATINGS.RATE].round(1).mean())
+
+        exact = bayesian_rate(ratings, m)
+        assert (stats.weighted_rate(ratings) - exact).abs().max() < 0.01
+
+    def test_weighted_ratings_population(self):
+        ds = self.get_dataset()
+        ratings = ds.get_ratings(RATINGS_FILTERED)
+        population = ratings[RATINGS.TCONST][::2]
+
+        data = ds.get_weighted_ratings(RATINGS_FILTERED, population=population)
+
+        assert list(data[RATINGS.TCONST]) == list(population)
+        exact = bayesian_rate(ratings[::2])
+        assert (data[RATINGS.WRATE] - exact).abs().max() < 0.01
+
+    def test_akas_display_title(self):
+        akas = pd.DataFrame(
+            {
+                AKAS.TCONST: ["tt0000001"] * 4 + ["tt0000002"],
+                AKAS.TITLE: ["Alt", "Display", "Titre", "Other", "Second"],
+                AKAS.REGION: ["US", "US", "FR", "DE", "US"],
+                AKAS.TYPES: ["alternative", "imdbDisplay", None, None, None],
+            }
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "akas.csv"
+            akas.to_csv(path, index=False)
+
+            data = self.get_dataset().get_akas(path, title_regions=["US", "FR", "JP"])
+
+        assert list(data.columns) == [AKAS.TCONST, "US", "FR", "JP"]
+        data = data.set_index(AKAS.TCONST)
+        assert data.loc["tt0000001", "US"] == "Display"
+        assert data.loc["tt0000001", "FR"] == "Titre"
+        assert data.loc["tt0000002", "US"] == "Second"
+        assert data["JP"].isna().all()
+
+    def test_factory_from_dataframe(self):
+        principals = pd.DataFrame(
+            {
+                PRINCIPALS.TCONST: ["tt0000001", "tt0000001", "tt0000002"],
+                PRINCIPALS.ORDERING: pd.array([1, 2, 1], dtype="Int16"),
+                PRINCIPALS.NCONST: ["nm0000001", "nm0000002", "nm0000003"],
+                PRINCIPALS.CATEGORY: ["actor", "director", "self"],
+                PRINCIPALS.JOB: [None, "co-director", None],
+                PRINCIPALS.CHARACHTERS: ['["Red"]', None, '["Himself","Host"]'],
+            }
+        )
+        factory = IMDbMoviePrincipalsFactory()
+
+        models = factory.from_dataframe(principals)
+
+        assert models[0].characters == ["Red"]
+        assert models[1].characters == None
+        assert models[1].job == "co-director"
+        assert models[2].characters == ["Himself", "Host"]
+        assert [m.imdb_movie for m in models] == principals[PRINCIPALS.TCONST].tolist()
+        assert [m.imdb_person for m in models] == principals[PRINCIPALS.NCONST].tolist()
+        assert [m.ordering for m in models] == [1, 2, 1]
+        assert [m.category for m in models] == ["actor", "director", "self"]
+
+    def test_id_codec(self):
+        ids = ["tt0111161", "tt10000000", "tt0000001"]
+        codes = TITLE_ID.encode(ids)
+
+        assert codes.dtype == np.int32
+        assert list(codes) == [111161, 10000000, 1]
+        assert list(TITLE_ID.decode(codes)) == ids
+        assert list(NAME_ID.decode(NAME_ID.encode({"nm0000151"}))) == ["nm0000151"]
+
+        malformed = ["nm0111161", "tt00111161", "tt123", "tt01x1161", None, ""]
+        assert list(TITLE_ID.encode(malformed)) == [-1] * len(malformed)
+
+    def test_id_set(self):
+        ids = IDSet(["tt0111161", "tt0000001", "tt0111161", "bad"], TITLE_ID)
+
+        assert len(ids) == 2
+        assert list(ids.decode()) == ["tt0000001", "tt0111161"]
+        assert list(ids.contains(["tt0111161", "tt0000002", "tt9999999", None])) == [
+            True,
+            False,
+            False,
+            False,
+        ]
+
+
+class TestIMDbDatasetRequest:
+    def test_request_data_streaming(self):
+        ratings = pd.read_csv(RATINGS_FILTERED, index_col=0)
+
+        with serve_dumps({IMDbDataSet.RATINGS: ratings}) as (urls, _):
+            ds = IMDbDataSet(debug=False, cache_dir=None)
+            ds.MAPPER = urls
+
+            chunks = list(ds._request_data(IMDbDataSet.RATINGS, chunksize=100))
+
+        assert len(chunks) == 10
+        assert all(len(chunk) <= 100 for chunk in chunks)
+
+        data = pd.concat(chunks)
+        assert list(data[RATINGS.TCONST]) == list(ratings[RATINGS.TCONST])
+
+    def test_request_data_cache(self):
+        ratings = pd.read_csv(RATINGS_FILTERED, index_col=0)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with serve_dumps({IMDbDataSet.RATINGS: ratings}) as (urls, log):
+                ds = IMDbDataSet(debug=False, cache_dir=cache_dir)
+                ds.MAPPER = urls
+
+                first = ds.get_ratings()
+                second = ds.get_ratings()
+
+            # the second call is revalidated and read from disk
+            assert [status for _, _, status in log] == [200, 304]
+            assert "If-Modified-Since" in log[1][1]
+            assert (Path(cache_dir) / "ratings.tsv.gz").exists()
+
+        pd.testing.assert_frame_equal(first, second)
+        assert len(second) == len(ratings)
+
+    def test_snapshot(self):
+        basics = pd.read_csv(BASICS_FILTERED, index_col=0)
+        akas = pd.read_csv(AKAS_FILTERED, index_col=0)
+        dumps = {IMDbDataSet.BASICS: basics, IMDbDataSet.AKAS: akas}
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with serve_dumps(dumps) as (urls, _):
+                ds = IMDbDataSet(debug=False, cache_dir=cache_dir)
+                ds.MAPPER = urls
+
+                snapshot_basics = ds.get_basics(min_year=2000)
+                snapshot_akas = ds.get_akas()
+
+                schema = pq.read_schema(Path(cache_dir) / "basics.parquet")
+                assert schema.field(BASICS.START_YEAR).type == pa.int16()
+
+                ds.snapshots = None
+                dump_basics = ds.get_basics(min_year=2000)
+
+        assert snapshot_basics[BASICS.START_YEAR].min() >= 2000
+        assert list(snapshot_basics[BASICS.TCONST]) == list(dump_basics[BASICS.TCONST])
+
+        ru = snapshot_akas.set_index(AKAS.TCONST)[TR.RU]
+        assert ru["tt0111161"] == "Побег из Шоушенка"
+
+    def test_movie_crew_streaming(self):
+        principals = pd.read_csv(PRINCIPALS_FILTERED, index_col=0)
+        persons = pd.read_csv(PERSONS_FILTERED, index_col=0)
+        dumps = {IMDbDataSet.PRINCIPALS: principals, IMDbDataSet.NAME: persons}
+        imdb_mvids = ["tt0111161", "tt1371111"]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with serve_dumps(dumps) as (urls, _):
+                ds = IMDbDataSet(debug=False, cache_dir=cache_dir)
+                ds.MAPPER = urls
+
+                crew = ds.get_movie_crew(imdb_mvids, chunksize=100)
+
+                ds.snapshots = None
+                dump_crew = ds.get_movie_crew(imdb_mvids, chunksize=100)
+
+                assert ds.get_movie_crew(["tt9999999"]) == ([], [])
+
+        debug_crew = IMDbDataSet(debug=True).get_movie_crew(imdb_mvids)
+
+        for principals_data, persons_data in [crew, dump_crew]:
+            assert principals_data == debug_crew[0]
+            assert sorted(persons_data, key=lambda p: p.imdb_nmid) == sorted(
+                debug_crew[1], key=lambda p: p.imdb_nmid
+            )
+
+        assert {p.imdb_movie for p in crew[0]} == set(imdb_mvids)
+        assert {p.imdb_person for p in crew[0]} == {p.imdb_nmid for p in crew[1]}
+
+    def test_streaming_batches(self):
+        ds = IMDbDataSet(debug=True)
+        imdb_mvids = ["tt0111161", "tt1371111"]
+        principals, persons = ds.get_movie_crew(imdb_mvids)
+
+        batches = list(ds.iter_principals(imdb_mvids, chunksize=100))
+        assert all(batches)
+        assert [p for batch in batches for p in batch] == principals
+
+        imdb_nmids = ds.get_principal_nmids(imdb_mvids, chunksize=100)
+        assert set(imdb_nmids) == {p.imdb_nmid for p in persons}
+
+        batches = list(ds.iter_persons(imdb_nmids, chunksize=100))
+        assert sorted(p.imdb_nmid for batch in batches for p in batch) == sorted(
+            p.imdb_nmid for p in persons
+        )
+
+        assert list(ds.iter_principals(["tt9999999"])) == []
+
+    def test_parallel_parsing(self):
+        basics = pd.read_csv(BASICS_FILTERED, index_col=0)
+        akas = pd.read_csv(AKAS_FILTERED, index_col=0)
+        principals = pd.read_csv(PRINCIPALS_FILTERED, index_col=0)
+        dumps = {
+            IMDbDataSet.BASICS: basics,
+            IMDbDataSet.AKAS: akas,
+            IMDbDataSet.PRINCIPALS: principals,
+        }
+        imdb_mvids = ["tt0111161", "tt1371111"]
+
+        def load(ds: IMDbDataSet) -> list:
+            return [
+                ds.get_basics(min_year=2000),
+                ds.get_akas(),
+                ds.get_principals(imdb_mvids=imdb_mvids),
+            ]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with serve_dumps(dumps) as (urls, _):
+                ds = IMDbDataSet(debug=False, cache_dir=cache_dir, snapshots=False)
+                ds.MAPPER = urls
+                serial = load(ds)
+
+                ds.workers = 2
+                # many small blocks
+                ds.blocksize = 2**12
+                parallel = load(ds)
+
+        for serial_data, parallel_data in zip(serial, parallel):
+            assert len(parallel_data)
+            pd.testing.assert_frame_equal(serial_data, parallel_data)
+
+    def test_key_filter_lookup(self):
+        principals = pd.read_csv(PRINCIPALS_FILTERED, index_col=0)
+        imdb_mvids = ["tt0111161", "tt1371111"]
+        expected = principals[principals[PRINCIPALS.TCONST].isin(imdb_mvids)]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            ds = IMDbDataSet(debug=False, cache_dir=cache_dir)
+            key_filter = KeyFilter(PRINCIPALS.TCONST, imdb_mvids, ds.lookups)
+            assert isinstance(key_filter.ids.bits, np.memmap)
+
+            # workers map the same file
+            restored = pickle.loads(pickle.dumps(key_filter))
+            assert isinstance(restored.ids.bits, np.memmap)
+            assert restored.ids.bits.filename == key_filter.ids.bits.filename
+
+            for chunk_filter in [key_filter, restored]:
+                pd.testing.assert_frame_equal(chunk_filter.filter(principals), expected)
+            assert sorted(key_filter.keys) == imdb_mvids
+
+        # non id columns are joined on strings
+        name_filter = KeyFilter(NAME.PRIMARY_NAME, ["Fred Astaire"])
+        assert name_filter.ids is None
+        assert list(name_filter.keys) == ["Fred Astaire"]
+
+    def test_movies_delta(self):
+        basics = pd.read_csv(BASICS_FILTERED, index_col=0)
+        ratings = pd.read_csv(RATINGS_FILTERED, index_col=0)
+        akas = pd.read_csv(AKAS_FILTERED, index_col=0)
+
+        def get_delta(dumps: dict, fingerprints_dir: str):
+            with tempfile.TemporaryDirectory() as cache_dir:
+                with serve_dumps(dumps) as (urls, _):
+                    ds = IMDbDataSet(debug=False, cache_dir=cache_dir)
+                    ds.MAPPER = urls
+                    ds.fingerprints = FingerprintStore(fingerprints_dir)
+                    return ds.get_movies_delta()
+
+        # movie with median votes: percentile of votes used by wrate is kept
+        ratings = ratings.sort_values(RATINGS.VOTES).reset_index(drop=True)
+        changed = ratings.loc[len(ratings) // 2, RATINGS.TCONST]
+        removed = basics.iloc[0][BASICS.TCONST]
+
+        with tempfile.TemporaryDirectory() as fingerprints_dir:
+            dumps = {
+                IMDbDataSet.BASICS: basics,
+                IMDbDataSet.RATINGS: ratings,
+                IMDbDataSet.AKAS: akas,
+            }
+            first = get_delta(dumps, fingerprints_dir)
+            assert len(first.inserted) > 100
+            assert first.updated == [] and first.deleted == []
+
+            # nothing is committed yet
+            assert len(get_delta(dumps, fingerprints_dir).inserted) == len(first)
+            not_added = first.inserted[0].imdb_mvid
+            first.commit(failed=[not_added])
+
+            # failed movies come back
+            retry = get_delta(dumps, fingerprints_dir)
+            assert [m.imdb_mvid for m in retry.inserted] == [not_added]
+            retry.commit()
+
+            unchanged = get_delta(dumps, fingerprints_dir)
+            assert len(unchanged) == 0
+
+            ratings.loc[len(ratings) // 2, RATINGS.VOTES] += 1000
+            second = get_delta(dumps, fingerprints_dir)
+            second.commit(failed=[changed])
+            assert [
+                m.imdb_mvid for m in get_delta(dumps, fingerprints_dir).updated
+            ] == [changed]
+            second.commit()
+
+            # wrate of other movies may shift with the population
+            dumps[IMDbDataSet.BASICS] = basics[basics[BASICS.TCONST] != removed]
+            third = get_delta(dumps, fingerprints_dir)
+
+        assert second.inserted == [] and second.deleted == []
+        assert [m.imdb_mvid for m in second.updated] == [changed]
+
+        assert third.inserted == []
+        assert third.deleted == [removed]
@@ -1,3 +1,4 @@
+import re
 import sys
 from pathlib import Path
 
@@ -42,3 +43,69 @@ class TestIMDbScraper:
             error = exc
 
         assert isinstance(error, IMDb404Error)
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+POSTER = (
+    "https://m.media-amazon.com/images/M/"
+    "MV5BN2NmN2VhMTQtMDNiOS00NDlhLTliMjgtODE2ZTY0ODQyNDRhXkEyXkFqcGc@.jpg"
+)
+
+
+class TestIMDbParser:
+    def get_page(self, without: list[str] = []) -> str:
+        page = (FIXTURES_DIR / "title.html").read_text()
+        for script in without:
+            page = re.sub(rf"<script[^>]*{script}.*?</script>", "", page, flags=re.S)
+        return page
+
+    def test_parse_embedded_data(self):
+        data = IMDbScraper()._parse_movie(self.get_page())
+
+        assert data["image_url"] == POSTER
+        assert (data["image_width"], data["image_height"]) == (2100, 3156)
+        assert data["plot"].startswith("When a beautiful stranger")
+        assert data["content_rating"] == "R"
+
+    def test_parse_json_ld(self):
+        page = self.get_page(without=["__NEXT_DATA__"])
+        data = IMDbScraper()._parse_movie(page)
+
+        assert data["image_url"] == POSTER
+        assert data.get("image_width") is None
+        assert data["plot"].startswith("When a beautiful stranger")
+        assert data["content_rating"] == "R"
+
+    def test_parse_html(self):
+        page = self.get_page(without=["__NEXT_DATA__", "ld\\+json"])
+        scraper = IMDbScraper()
+
+        assert scraper._parse_movie(page)["image_url"] == POSTER
+        # pages lxml refuses are parsed by BeautifulSoup
+        page = '<?xml version="1.0" encoding="utf-8"?>' + page
+        assert scraper._parse_movie(page)["image_url"] == POSTER
+
+    def test_cacheable(self):
+        scraper = IMDbScraper()
+        url = f"https://www.imdb.com/title/{TestCase.imdb_mvid}"
+
+        assert scraper.cacheable(url, self.get_page())
+        assert scraper.cacheable(url, self.get_page(without=["__NEXT_DATA__"]))
+        assert not scraper.cacheable(url, "")
+        assert not scraper.cacheable(url, "<title>Error 503 - IMDb</title>")
+        captcha = "<html><body><div id='captcha-container'></div></body></html>"
+        assert not scraper.cacheable(url, captcha)
+
+    @pytest.mark.asyncio
+    async def test_get_movie(self, monkeypatch):
+        scraper = IMDbScraper()
+
+        async def request(url: str) -> str:
+            return self.get_page()
+
+        monkeypatch.setattr(scraper, "request", request)
+        movie = await scraper.get_movie(TestCase.imdb_mvid)
+
+        assert movie.imdb_mvid == TestCase.imdb_mvid
+        assert movie.image_url == POSTER
+        assert movie.content_rating == "R"
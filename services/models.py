@@ -133,5 +133,9 @@ class TMDbMovieServiceDM(
 class IMDbMovieExtraInfoServiceDM(BaseModel):
     imdb_mvid: str
     image_url: str
+    image_width: int | None = None
+    image_height: int | None = None
+    plot: str | None = None
+    content_rating: str | None = None
 
     error: str | None
@@ -0,0 +1,140 @@
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any
+
+# total size of compressed responses, least recently used ones are evicted
+MAX_SIZE = 2**30
+DEFAULT_TTL = 7 * 24 * 3600
+# reads update the LRU order, it is committed every COMMIT_EVERY reads
+COMMIT_EVERY = 1000
+
+
+class ResponseCache(object):
+    """
+    On-disk cache of extracted responses: SQLite table of zlib compressed
+    JSON values. Keys are sha256 of the request (url and relevant headers).
+    Expired values are misses, the least recently used values are evicted
+    when the total size exceeds max_size.
+    Methods may be called from threads, the connection is shared under a lock.
+    """
+
+    def __init__(self, path: str | Path, max_size: int = MAX_SIZE) -> None:
+        self.path = Path(path)
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value BLOB, size INTEGER,"
+                " expires_at REAL, used_at REAL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)"
+            )
+
+        self.size = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        self._reads = 0
+
+    @staticmethod
+    def key(url: str, headers: dict[str, str] | None = None) -> str:
+        request = json.dumps([url, sorted((headers or {}).items())])
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """(hit, value)"""
+
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            now = time.time()
+            if row is None or row[1] < now:
+                self.misses += 1
+                return False, None
+
+            self.connection.execute(
+                "UPDATE responses SET used_at = ? WHERE key = ?",
+                (now, key),
+            )
+            self._reads += 1
+            if self._reads >= COMMIT_EVERY:
+                self.flush()
+
+            self.hits += 1
+
+        return True, json.loads(zlib.decompress(row[0]))
+
+    def set(self, key: str, value: Any, ttl: float = DEFAULT_TTL) -> None:
+        blob = zlib.compress(json.dumps(value).encode())
+        now = time.time()
+
+        with self.lock:
+            with self.connection:
+                previous = self.connection.execute(
+                    "SELECT size FROM responses WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (key, blob, len(blob), now + ttl, now),
+                )
+
+            self.size += len(blob) - (previous[0] if previous else 0)
+            if self.size > self.max_size:
+                self.evict()
+
+    def evict(self) -> None:
+        """Least recently used values are removed down to 90% of max_size"""
+
+        target = self.max_size * 0.9
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT key, size FROM responses ORDER BY used_at"
+            )
+
+            keys = []
+            for key, size in rows:
+                if self.size <= target:
+                    break
+                keys.append((key,))
+                self.size -= size
+
+            with self.connection:
+                self.connection.executemany("DELETE FROM responses WHERE key = ?", keys)
+            self.evictions += len(keys)
+
+    def flush(self) -> None:
+        with self.lock:
+            self.connection.commit()
+            self._reads = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": self.size,
+        }
+
+    def close(self) -> None:
+        with self.lock:
+            self.flush()
+            self.connection.close()
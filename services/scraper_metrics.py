@@ -0,0 +1,197 @@
+import re
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import Callable, Iterator
+from urllib.parse import urlsplit
+
+# upper bounds of histogram buckets, seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# where the time of a request goes
+STAGES = ("limiter", "backoff", "network", "extract", "parse")
+
+# path segments of ids, two digits at least to keep versions: /3/movie/603
+ID_SEGMENT_RX = re.compile(r"/[^/]*\d[^/]*\d[^/]*(?=/|$)")
+
+
+def endpoint(url: str) -> str:
+    """Path of the url with ids replaced: /3/movie/{id}"""
+    return ID_SEGMENT_RX.sub("/{id}", urlsplit(url).path) or "/"
+
+
+def labels(**values) -> str:
+    """Prometheus label set, values are escaped"""
+
+    escaped = []
+    for key, value in values.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+class ScraperMetrics:
+    """
+    Metrics of scraper requests by scraper and endpoint: responses by
+    status, retries, received bytes, cache hits, requests in flight and
+    histograms of the time spent in every stage (STAGES).
+
+    Exposed as Prometheus text by prometheus(), every finished request
+    is also passed to callback as a dict.
+    """
+
+    def __init__(self, callback: Callable[[dict], None] | None = None) -> None:
+        self.callback = callback
+
+        self.responses: dict[tuple[str, str, int], int] = defaultdict(int)
+        self.retries: dict[tuple[str, str], int] = defaultdict(int)
+        self.bytes: dict[tuple[str, str], int] = defaultdict(int)
+        self.cache_hits: dict[tuple[str, str], int] = defaultdict(int)
+        self.in_flight: dict[str, int] = defaultdict(int)
+        self.stages: dict[tuple[str, str, str], Histogram] = defaultdict(Histogram)
+
+    def observe(self, scraper: str, endpoint: str, stage: str, seconds: float) -> None:
+        self.stages[scraper, endpoint, stage].observe(seconds)
+
+    @contextmanager
+    def timer(self, scraper: str, endpoint: str, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(scraper, endpoint, stage, time.perf_counter() - start)
+
+    @contextmanager
+    def track(self, scraper: str, endpoint: str) -> Iterator[dict]:
+        """
+        Request in flight, the caller fills status, tries, bytes
+        and stage seconds of the yielded record.
+        """
+
+        record = {
+            "scraper": scraper,
+            "endpoint": endpoint,
+            "status": None,
+            "tries": 0,
+            "bytes": 0,
+            "cached": False,
+        }
+        self.in_flight[scraper] += 1
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.in_flight[scraper] -= 1
+            record["seconds"] = time.perf_counter() - start
+            self.record(record)
+
+    def record(self, record: dict) -> None:
+        key = record["scraper"], record["endpoint"]
+        if record["cached"]:
+            self.cache_hits[key] += 1
+        if record["status"] is not None:
+            self.responses[(*key, record["status"])] += 1
+        self.retries[key] += max(record["tries"] - 1, 0)
+        self.bytes[key] += record["bytes"]
+
+        if self.callback is not None:
+            self.callback(record)
+
+    def summary(self) -> str:
+        """Mean seconds of every stage by endpoint"""
+
+        stages = defaultdict(dict)
+        for (scraper, endpoint, stage), histogram in self.stages.items():
+            stages[scraper, endpoint][stage] = histogram
+
+        lines = []
+        for (scraper, endpoint), histograms in sorted(stages.items()):
+            requests = max(h.count for h in histograms.values())
+            times = ", ".join(
+                f"{stage} {histograms[stage].mean * 1000:.1f} ms"
+                for stage in STAGES
+                if stage in histograms
+            )
+            retries = self.retries[scraper, endpoint]
+            lines.append(
+                f"{scraper} {endpoint}: {requests} requests,"
+                f" {retries} retries, mean {times}"
+            )
+        return "\n".join(lines)
+
+    def prometheus(self) -> str:
+        """Text exposition format"""
+
+        lines = []
+
+        def family(name: str, type: str, help: str, samples: list[str]) -> None:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {type}")
+            lines.extend(samples)
+
+        family(
+            "scraper_responses_total",
+            "counter",
+            "Responses by status",
+            [
+                f"scraper_responses_total{labels(scraper=s, endpoint=e, status=c)} {v}"
+                for (s, e, c), v in sorted(self.responses.items())
+            ],
+        )
+        for name, help, values in [
+            ("scraper_retries_total", "Retried requests", self.retries),
+            ("scraper_received_bytes_total", "Received bytes", self.bytes),
+            ("scraper_cache_hits_total", "Responses from the cache", self.cache_hits),
+        ]:
+            family(
+                name,
+                "counter",
+                help,
+                [
+                    f"{name}{labels(scraper=s, endpoint=e)} {v}"
+                    for (s, e), v in sorted(values.items())
+                ],
+            )
+        family(
+            "scraper_requests_in_flight",
+            "gauge",
+            "Requests in progress",
+            [
+                f"scraper_requests_in_flight{labels(scraper=s)} {v}"
+                for s, v in sorted(self.in_flight.items())
+            ],
+        )
+
+        samples = []
+        name = "scraper_stage_seconds"
+        for (s, e, stage), histogram in sorted(self.stages.items()):
+            values = {"scraper": s, "endpoint": e, "stage": stage}
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                samples.append(
+                    f"{name}_bucket{labels(**values, le=bound)} {cumulative}"
+                )
+            samples.append(f"{name}_sum{labels(**values)} {histogram.sum}")
+            samples.append(f"{name}_count{labels(**values)} {histogram.count}")
+        family(name, "histogram", "Seconds of request stages", samples)
+
+        return "\n".join(lines) + "\n"
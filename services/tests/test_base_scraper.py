@@ -1,9 +1,19 @@
 import sys
+import socket
+import asyncio
 from pathlib import Path
+from contextlib import asynccontextmanager
+
 import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 
 sys.path.append(str(Path(__file__).parent.parent))
+import base_scraper
 from base_scraper import BaseScraper, WrongProxyStructure, NotWorkingProxy
+from base_scraper import AdaptiveLimiter, parse_retry_after, Proxy, ProxyPool
+from response_cache import ResponseCache
+from scraper_metrics import ScraperMetrics, endpoint
 
 
 @pytest.mark.asyncio
@@ -47,3 +57,317 @@ async def test_base_srcaper_fake_proxy():
         error = ex
 
     assert isinstance(error, WrongProxyStructure)
+
+
+@asynccontextmanager
+async def local_server(overloaded: set[int] = set(), dropped: set[int] = set()):
+    """
+    Local server, returns its url and peers of every request.
+    overloaded: numbers of requests answered with 429
+    dropped: numbers of requests closed without a response
+    """
+
+    peers = []
+
+    async def handler(request: web.Request) -> web.Response:
+        peers.append(request.transport.get_extra_info("peername"))
+        if len(peers) in dropped:
+            request.transport.close()
+            raise ConnectionResetError
+        if len(peers) in overloaded:
+            return web.Response(status=429, headers={"Retry-After": "0.1"})
+        return web.Response(text="Example Domain")
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+
+    async with TestServer(app) as server:
+        yield str(server.make_url("/")), peers
+
+
+@pytest.mark.asyncio
+async def test_base_scraper_shared_session():
+    async with local_server() as (url, peers):
+        async with BaseScraper(max_rate=1000, limit_per_host=2) as scraper:
+            session = scraper.get_session()
+
+            data = await asyncio.gather(*[scraper.request(url) for _ in range(20)])
+            assert data == ["Example Domain"] * 20
+            assert scraper.get_session() is session
+
+        assert session.closed
+        # connections are kept alive and reused
+        assert len(set(peers)) <= 2
+
+        # the session is reopened after close
+        assert await scraper.request(url) == "Example Domain"
+        await scraper.close()
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_adaptive_limiter():
+    limiter = AdaptiveLimiter(max_rate=40, rate_period=1)
+
+    limiter.throttle()
+    assert limiter.rate == 20
+    # overloaded responses of the same period decrease the rate once
+    limiter.throttle()
+    assert limiter.rate == 20
+
+    for _ in range(100):
+        limiter.success()
+    assert limiter.rate == 40
+
+
+@pytest.mark.asyncio
+async def test_base_scraper_retry_overloaded(monkeypatch):
+    monkeypatch.setattr(base_scraper, "BACKOFF_BASE", 0.01)
+
+    async with local_server(overloaded={1, 2}) as (url, peers):
+        async with BaseScraper(max_rate=100) as scraper:
+            start = asyncio.get_running_loop().time()
+            assert await scraper.request(url) == "Example Domain"
+            elapsed = asyncio.get_running_loop().time() - start
+
+        assert len(peers) == 3
+        # Retry-After is honoured
+        assert elapsed >= 0.1
+        assert scraper.rate_limit.rate < 100
+
+    # the last overloaded response is passed to the extractor
+    async with local_server(overloaded=set(range(1, 10))) as (url, peers):
+        async with BaseScraper(max_rate=100) as scraper:
+            assert await scraper.request(url) == ""
+        assert len(peers) == base_scraper.MAX_TRIES
+
+
+def test_response_cache(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_size=200)
+    key = ResponseCache.key("https://example.com", {"accept-language": "en"})
+    assert key != ResponseCache.key("https://example.com", {"accept-language": "ru"})
+
+    assert cache.get(key) == (False, None)
+    cache.set(key, {"title": "Example"})
+    assert cache.get(key) == (True, {"title": "Example"})
+
+    # expired values are misses
+    cache.set("expired", [1, 2], ttl=-1)
+    assert cache.get("expired") == (False, None)
+
+    # the least recently used values are evicted
+    for i in range(20):
+        cache.set(str(i), "x" * i)
+        cache.get(key)
+    assert cache.get(key)[0]
+    assert not cache.get("0")[0]
+    assert cache.size <= 200
+
+    stats = cache.stats()
+    assert stats["hits"] == 22
+    assert stats["evictions"] > 0
+    cache.close()
+
+    # the cache is persistent
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_size=200)
+    assert cache.get(key) == (True, {"title": "Example"})
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_base_scraper_cache(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite")
+
+    async with local_server(overloaded={2}) as (url, peers):
+        async with BaseScraper(max_rate=100, cache=cache) as scraper:
+            assert await scraper.request(url) == "Example Domain"
+            assert await scraper.request(url) == "Example Domain"
+            # the successful retry of an overloaded request is cached
+            assert await scraper.request(url + "?page=2") == "Example Domain"
+            assert await scraper.request(url + "?page=2") == "Example Domain"
+
+            # rejected data is not cached, it is requested again
+            scraper.cacheable = lambda url, data: False
+            for _ in range(2):
+                assert await scraper.request(url + "?page=3") == "Example Domain"
+
+        assert len(peers) == 5
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["misses"] == 4
+    cache.close()
+
+
+@asynccontextmanager
+async def local_proxy(dropped: set[int] = set()):
+    """
+    Local stand-in of a proxy: answers requests itself,
+    returns its address and the requested urls.
+    dropped: numbers of requests closed as by the upstream
+    """
+
+    urls = []
+
+    async def handler(request: web.Request) -> web.Response:
+        assert request.headers["Proxy-Authorization"].startswith("Basic ")
+        urls.append(str(request.url))
+        if len(urls) in dropped:
+            request.transport.close()
+            raise ConnectionResetError
+        return web.Response(
+            text=f"proxy {request.transport.get_extra_info('sockname')[1]}"
+        )
+
+    app = web.Application()
+    app.router.add_get("/{path:.*}", handler)
+
+    async with TestServer(app) as server:
+        yield f"127.0.0.1:{server.port}@user:password", urls
+
+
+def closed_port_proxy() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"127.0.0.1:{port}@user:password"
+
+
+def test_proxy_quarantine(monkeypatch):
+    monkeypatch.setattr(base_scraper, "QUARANTINE_TIME", 0)
+    proxy = Proxy("http://127.0.0.1:1", None, max_rate=10)
+    pool = ProxyPool([proxy])
+
+    proxy.failure()
+    proxy.failure()
+    assert not proxy.quarantined
+    assert 0 < proxy.weight < 1
+
+    monkeypatch.setattr(base_scraper, "QUARANTINE_TIME", 60)
+    proxy.failure()
+    assert proxy.quarantined
+    assert proxy.weight == 0
+    # the first released proxy is taken while all are quarantined
+    assert pool.choose() is proxy
+
+    proxy.success(latency=0.01)
+    assert proxy.failures == 0
+    assert proxy.quarantines == 0
+
+
+@pytest.mark.asyncio
+async def test_base_scraper_proxy_pool():
+    async with local_proxy() as (first, first_urls):
+        async with local_proxy() as (second, second_urls):
+            proxies = [first, second, closed_port_proxy()]
+            async with BaseScraper(proxies, max_rate=1000) as scraper:
+                data = await asyncio.gather(
+                    *[scraper.request("http://example.com/") for _ in range(60)]
+                )
+
+            # requests through the dead proxy are retried through the others
+            assert all(d.startswith("proxy ") for d in data)
+            assert len(first_urls) + len(second_urls) == 60
+            assert len(first_urls) > 10 and len(second_urls) > 10
+            assert [p.quarantined for p in scraper.proxies.proxies] == [
+                False,
+                False,
+                True,
+            ]
+
+
+@pytest.mark.asyncio
+async def test_base_scraper_check_local_proxies():
+    # stand-in proxies don't tunnel https
+    url = "http://example.com/"
+
+    async with local_proxy() as (proxy, urls):
+        async with BaseScraper([proxy, closed_port_proxy()]) as scraper:
+            await scraper._check_proxy(url)
+            assert len(scraper.proxies.healthy) == 1
+
+    error = None
+    async with BaseScraper(closed_port_proxy()) as scraper:
+        try:
+            await scraper._check_proxy(url)
+        except NotWorkingProxy as ex:
+            error = ex
+
+    assert isinstance(error, NotWorkingProxy)
+
+
+@pytest.mark.asyncio
+async def test_base_scraper_proxies_exhausted(monkeypatch):
+    monkeypatch.setattr(base_scraper, "BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(base_scraper, "QUARANTINE_TIME", 0)
+
+    error = None
+    async with BaseScraper(closed_port_proxy()) as scraper:
+        try:
+            await scraper.request("http://example.com/")
+        except NotWorkingProxy as ex:
+            error = ex
+
+    assert isinstance(error, NotWorkingProxy)
+
+
+@pytest.mark.asyncio
+async def test_base_scraper_upstream_dropped(monkeypatch):
+    monkeypatch.setattr(base_scraper, "BACKOFF_BASE", 0.01)
+
+    # the direct route is retried as proxies are
+    async with local_server(dropped={1, 2}) as (url, peers):
+        async with BaseScraper(max_rate=100) as scraper:
+            assert await scraper.request(url) == "Example Domain"
+        assert len(peers) == 3
+
+    # a dropped upstream connection is not a failure of the proxy
+    async with local_proxy(dropped={1}) as (proxy, urls):
+        async with BaseScraper(proxy, max_rate=100) as scraper:
+            data = await scraper.request("http://example.com/")
+            assert data.startswith("proxy ")
+            assert scraper.proxies.proxies[0].error_rate == 0
+        assert len(urls) == 2
+
+
+def test_metrics_endpoint():
+    assert endpoint("https://api.themoviedb.org/3/movie/603?language=ru") == (
+        "/3/movie/{id}"
+    )
+    assert endpoint("https://www.imdb.com/title/tt0133093/") == "/title/{id}/"
+    assert endpoint("http://127.0.0.1:8080") == "/"
+
+
+@pytest.mark.asyncio
+async def test_base_scraper_metrics(tmp_path, monkeypatch):
+    monkeypatch.setattr(base_scraper, "BACKOFF_BASE", 0.01)
+    records = []
+    metrics = ScraperMetrics(callback=records.append)
+    cache = ResponseCache(tmp_path / "responses.sqlite")
+
+    async with local_server(overloaded={1}) as (url, peers):
+        async with BaseScraper(max_rate=100, cache=cache, metrics=metrics) as scraper:
+            assert await scraper.request(url) == "Example Domain"
+            assert await scraper.request(url) == "Example Domain"
+    cache.close()
+
+    assert [(r["status"], r["tries"], r["cached"]) for r in records] == [
+        (200, 2, False),
+        (None, 0, True),
+    ]
+    assert records[0]["bytes"] == len("Example Domain")
+
+    text = metrics.prometheus()
+    labels = 'scraper="BaseScraper",endpoint="/"'
+    assert f'scraper_responses_total{{{labels},status="200"}} 1' in text
+    assert f"scraper_retries_total{{{labels}}} 1" in text
+    assert f"scraper_cache_hits_total{{{labels}}} 1" in text
+    assert 'scraper_requests_in_flight{scraper="BaseScraper"} 0' in text
+    assert f'scraper_stage_seconds_count{{{labels},stage="network"}} 2' in text
+    assert (
+        f'scraper_stage_seconds_bucket{{{labels},stage="network",le="+Inf"}} 2' in text
+    )
+    assert "BaseScraper /: 2 requests, 1 retries" in metrics.summary()
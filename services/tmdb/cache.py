@@ -0,0 +1,58 @@
+import time
+import sqlite3
+from pathlib import Path
+
+# movies absent on TMDb are searched again after this period, seconds
+MISSING_TTL = 7 * 24 * 3600
+
+
+class IDMapping(object):
+    """
+    Persistent imdb_mvid -> tmdb_mvid mapping of /find results,
+    so re-runs don't search movies again.
+    Movies absent on TMDb are kept as None for MISSING_TTL.
+    The connection is opened on the first use and reopened after close().
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._connection: sqlite3.Connection | None = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path)
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS ids ("
+                    "imdb_mvid TEXT PRIMARY KEY, tmdb_mvid INTEGER, checked_at REAL)"
+                )
+        return self._connection
+
+    def lookup(self, imdb_mvid: str) -> tuple[bool, int | None]:
+        """(known, tmdb_mvid), tmdb_mvid is None for absent movies"""
+
+        row = self.connection.execute(
+            "SELECT tmdb_mvid, checked_at FROM ids WHERE imdb_mvid = ?",
+            (imdb_mvid,),
+        ).fetchone()
+        if row is None:
+            return False, None
+
+        tmdb_mvid, checked_at = row
+        if tmdb_mvid is None and time.time() - checked_at > MISSING_TTL:
+            return False, None
+        return True, tmdb_mvid
+
+    def save(self, imdb_mvid: str, tmdb_mvid: int | None) -> None:
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO ids VALUES (?, ?, ?)",
+                (imdb_mvid, tmdb_mvid, time.time()),
+            )
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -33,3 +33,8 @@ class MovieDetails:
     COUNTRY_ISO = "iso_3166_1"
 
     TITLE = "title"
+
+    TRANSLATIONS = "translations"
+    TRANSLATION_LANG = "iso_639_1"
+    TRANSLATION_COUNTRY = "iso_3166_1"
+    TRANSLATION_DATA = "data"
@@ -1,18 +1,33 @@
 import sys
+import asyncio
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncGenerator, Iterable
 from pprint import pprint
 from datetime import datetime
 from abc import abstractmethod
 
-from pydantic import BaseModel
-from aiohttp import ClientResponse
+from pydantic import BaseModel, ValidationError
+from aiohttp import ClientResponse, ClientError
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 from services.tmdb.notation import MovieDetails as MD
 from services.models import TMDbMovieServiceDM, CollectionServiceDM, ProductionServiceDM
-from services.base_scraper import BaseScraper
+from services.base_scraper import BaseScraper, NotWorkingProxy, backoff
+from services.response_cache import ResponseCache
+from services.scraper_metrics import ScraperMetrics
 from services.tmdb.settings import settings
+from services.tmdb.cache import IDMapping
+
+ROOT_DIR = Path(__file__).parent.parent
+CACHE_DIR = ROOT_DIR / "tmdb" / "cache"
+RESPONSES_CACHE = CACHE_DIR / "responses.sqlite"
+
+DAY = 24 * 3600
+
+# concurrent movies of get_movies, requests are still spaced by the limiter
+MOVIES_CONCURRENCY = 20
+# tries of movies failed by a transient error
+MOVIE_TRIES = 3
 
 
 class TMDbAuthFailed(Exception):
@@ -35,6 +50,45 @@ class TMDbRequestError(Exception):
     pass
 
 
+class TMDbMovieError(Exception):
+    """Failed movie of get_movies with the category of its error"""
+
+    NOT_FOUND = "not_found"
+    AUTH = "auth"
+    OVER_LIMIT = "over_limit"
+    NETWORK = "network"
+    PARSE = "parse"
+
+    # transient errors, the movie is retried
+    RETRIABLE = {OVER_LIMIT, NETWORK}
+
+    def __init__(self, imdb_mvid: str, category: str, error: Exception) -> None:
+        super().__init__(f"{category} error of movie {imdb_mvid}: {error!r}")
+        self.imdb_mvid = imdb_mvid
+        self.category = category
+        self.error = error
+
+    @property
+    def retriable(self) -> bool:
+        return self.category in self.RETRIABLE
+
+    @classmethod
+    def categorize(cls, error: Exception) -> str | None:
+        """None - the error is out of the categories, it is a bug"""
+
+        categories = [
+            ((MovieDoesNotExist, TMDbInvalidID), cls.NOT_FOUND),
+            ((TMDbAuthFailed,), cls.AUTH),
+            ((TMDbOverLimit,), cls.OVER_LIMIT),
+            ((ClientError, asyncio.TimeoutError, NotWorkingProxy), cls.NETWORK),
+            ((TMDbRequestError, ValidationError, KeyError, TypeError), cls.PARSE),
+        ]
+        for errors, category in categories:
+            if isinstance(error, errors):
+                return category
+        return None
+
+
 class AbstractFactory:
     @abstractmethod
     def create(self, **kwargs: dict[str, Any]) -> BaseModel:
@@ -296,6 +350,32 @@ class TMDbMovieFactory(AbstractFactory):
                 "ru",
             )
 
+    def get_translation(self, lang: str, **kwargs) -> dict:
+        """Translated fields from appended translations"""
+
+        translations = kwargs.get(MD.TRANSLATIONS, None) or {}
+        for translation in translations.get(MD.TRANSLATIONS, []):
+            if translation.get(MD.TRANSLATION_LANG, None) == lang:
+                return translation.get(MD.TRANSLATION_DATA, None) or {}
+        return {}
+
+    def add_translation(
+        self,
+        movie: TMDbMovieServiceDM,
+        lang: str = "ru",
+        **kwargs,
+    ) -> TMDbMovieServiceDM:
+        """
+        Russian details from appended translations.
+        Collection names are not translated there.
+        """
+
+        translation = self.get_translation(lang, **kwargs)
+        movie.name_ru = self.get(MD.TITLE, **translation)
+        movie.tagline_ru = self.get(MD.TAGLINE, **translation)
+        movie.overview_ru = self.get(MD.OVERVIEW, **translation)
+        return movie
+
 
 class TMDbScraper(BaseScraper):
     """Recommended limit is 40r/1s because of API limits"""
@@ -307,19 +387,36 @@ class TMDbScraper(BaseScraper):
         429: TMDbOverLimit,
     }
 
+    # ids don't change, details are updated: votes, popularity, ...
+    CACHE_TTLS = {
+        r"/3/find/": 30 * DAY,
+        r"/3/movie/": 7 * DAY,
+    }
+
     def __init__(
         self,
         api_key: str,
-        proxy: str = None,
+        proxy: str | list[str] | None = None,
         max_rate: int = settings.TMDB_MAX_RATE,
         rate_period: int = settings.TMDB_RATE_PERIOD,
         debug: bool = False,
+        cache_dir: str | Path | None = None,
+        cache: ResponseCache | None = None,
+        metrics: ScraperMetrics | None = None,
     ) -> None:
+        """
+        cache_dir: imdb -> tmdb ids of searched movies, None - no cache
+        cache: responses cache, None - no cache
+        metrics: metrics of requests, None - own metrics
+        """
+
         super().__init__(
             proxy,
             max_rate,
             rate_period,
             debug,
+            cache=cache,
+            metrics=metrics,
         )
 
         self.api_key = api_key
@@ -327,6 +424,15 @@ class TMDbScraper(BaseScraper):
 
         self.movie_factory = TMDbMovieFactory()
 
+        self.ids = None
+        if cache_dir is not None:
+            self.ids = IDMapping(Path(cache_dir) / "ids.sqlite")
+
+    async def close(self) -> None:
+        await super().close()
+        if self.ids is not None:
+            self.ids.close()
+
     @property
     def custom_headers(self) -> dict:
         return {
@@ -354,28 +460,118 @@ class TMDbScraper(BaseScraper):
         self,
         tmdb_mvid: str | int,
         lang: str = "en-US",
+        append: list[str] | None = None,
     ) -> dict:
+        """append: subrequests appended to the response, e.g. translations"""
+
         URL = f"https://api.themoviedb.org/3/movie/{tmdb_mvid}?language={lang}"
+        if append:
+            URL += "&append_to_response=" + ",".join(append)
         return await self.request(URL)
 
-    async def get_movie(self, imdb_mvid: str) -> TMDbMovieServiceDM | None:
-        id_search = await self.find_by_imdb_id(imdb_mvid)
+    async def get_tmdb_mvid(self, imdb_mvid: str) -> int:
+        """TMDb id by IMDb id, cached results are not searched again"""
 
-        if "movie_results" not in id_search:
-            raise TMDbRequestError(f"Error in TMDb search by id request: {imdb_mvid}")
+        known, tmdb_mvid = False, None
+        if self.ids is not None:
+            known, tmdb_mvid = self.ids.lookup(imdb_mvid)
 
-        movies = id_search["movie_results"]
-        if not movies:
+        if not known:
+            id_search = await self.find_by_imdb_id(imdb_mvid)
+            if "movie_results" not in id_search:
+                raise TMDbRequestError(
+                    f"Error in TMDb search by id request: {imdb_mvid}"
+                )
+
+            movies = id_search["movie_results"]
+            tmdb_mvid = movies[0]["id"] if movies else None
+            if self.ids is not None:
+                self.ids.save(imdb_mvid, tmdb_mvid)
+
+        if tmdb_mvid is None:
             raise MovieDoesNotExist(f"Movie with IMDb id {imdb_mvid} doesn't exist")
+        return tmdb_mvid
+
+    async def get_movies(
+        self,
+        imdb_mvids: Iterable[str],
+        translations: bool = True,
+        concurrency: int = MOVIES_CONCURRENCY,
+        tries: int = MOVIE_TRIES,
+    ) -> AsyncGenerator[tuple[str, TMDbMovieServiceDM | TMDbMovieError], None]:
+        """
+        Movies of unique ids are fetched concurrently and yielded
+        as (imdb_mvid, movie or TMDbMovieError) in order of completion.
+        Movies failed by transient errors go back to the end of the queue
+        and are retried after a backoff, up to tries times.
+        """
+
+        queue = asyncio.Queue()
+        for imdb_mvid in dict.fromkeys(imdb_mvids):
+            queue.put_nowait((imdb_mvid, 0))
+        # a slow consumer pauses the workers
+        results = asyncio.Queue(concurrency)
+        pending = queue.qsize()
+
+        async def worker() -> None:
+            while True:
+                imdb_mvid, attempt = await queue.get()
+                if attempt:
+                    await asyncio.sleep(backoff(attempt))
+                try:
+                    result = await self.get_movie(imdb_mvid, translations)
+                except Exception as error:
+                    # errors out of the categories are raised by get_movies
+                    result = error
+                    category = TMDbMovieError.categorize(error)
+                    if category is not None:
+                        result = TMDbMovieError(imdb_mvid, category, error)
+                        if result.retriable and attempt + 1 < tries:
+                            queue.put_nowait((imdb_mvid, attempt + 1))
+                            continue
+                await results.put((imdb_mvid, result))
+
+        workers = [
+            asyncio.create_task(worker()) for _ in range(min(concurrency, pending))
+        ]
+        try:
+            while pending:
+                imdb_mvid, result = await results.get()
+                pending -= 1
+                if isinstance(result, Exception) and not isinstance(
+                    result, TMDbMovieError
+                ):
+                    raise result
+                yield imdb_mvid, result
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def get_movie(
+        self,
+        imdb_mvid: str,
+        translations: bool = True,
+    ) -> TMDbMovieServiceDM | None:
+        """
+        translations: russian details are appended to english ones,
+        one request instead of two, but without russian collection names
+        """
+
+        tmdb_mvid = await self.get_tmdb_mvid(imdb_mvid)
 
-        tmdb_mvid = movies[0]["id"]
-        en_movie_details = await self.get_movie_details(tmdb_mvid)
-        movie = self.movie_factory.create(**en_movie_details)
+        append = [MD.TRANSLATIONS] if translations else None
+        en_movie_details = await self.get_movie_details(tmdb_mvid, append=append)
+        with self.metrics.timer(type(self).__name__, "/3/movie/{id}", "parse"):
+            movie = self.movie_factory.create(**en_movie_details)
 
         if not movie:
             raise TMDbRequestError(f"Error int TMDb movie details request: {tmdb_mvid}")
 
-        ru_movie_details = await self.get_movie_details(tmdb_mvid, "ru")
-        self.movie_factory.add_ru_details(movie, **ru_movie_details)
+        if translations:
+            self.movie_factory.add_translation(movie, "ru", **en_movie_details)
+        else:
+            ru_movie_details = await self.get_movie_details(tmdb_mvid, "ru")
+            self.movie_factory.add_ru_details(movie, **ru_movie_details)
 
         return movie
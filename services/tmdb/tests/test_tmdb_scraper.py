@@ -1,9 +1,14 @@
 import sys
+import tempfile
 from pathlib import Path
 import pytest
+from aiohttp import ClientConnectionError
 
 sys.path.append(str(Path(__file__).parent.parent.parent.parent))
 from services.tmdb.scraper import TMDbScraper, TMDbMovieServiceDM, MovieDoesNotExist
+from services.tmdb.scraper import TMDbMovieError, TMDbOverLimit, TMDbAuthFailed
+from services.tmdb import scraper as tmdb_scraper
+from services.tmdb.cache import IDMapping
 from services.tmdb.settings import settings
 
 
@@ -99,3 +104,156 @@ class TestTMDbScraper:
             error = ex
 
         assert isinstance(error, MovieDoesNotExist)
+
+
+class FakeTMDbScraper(TMDbScraper):
+    """Canned responses instead of TMDb API, requested urls are kept"""
+
+    def __init__(self, cache_dir: Path) -> None:
+        super().__init__("API_KEY", cache_dir=cache_dir)
+        self.urls = []
+
+    async def request(self, url: str) -> dict:
+        self.urls.append(url)
+        if "/find/" in url:
+            found = TestCase.imdb_mvid in url
+            return {"movie_results": [{"id": TestCase.tmdb_mvid}] if found else []}
+
+        return {
+            "id": TestCase.tmdb_mvid,
+            "imdb_id": TestCase.imdb_mvid,
+            "title": TestCase.original_title,
+            "tagline": TestCase.tagline_en,
+            "poster_path": "/poster.jpg",
+            "release_date": "1999-03-30",
+            "translations": {
+                "translations": [
+                    {"iso_639_1": "fr", "data": {"title": "Matrix"}},
+                    {
+                        "iso_639_1": "ru",
+                        "data": {
+                            "title": TestCase.title_ru,
+                            "tagline": TestCase.tagline_ru,
+                            "overview": "",
+                        },
+                    },
+                ]
+            },
+        }
+
+
+class TestTMDbScraperRequests:
+    @pytest.mark.asyncio
+    async def test_get_movie_translations(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            scraper = FakeTMDbScraper(cache_dir)
+            movie = await scraper.get_movie(TestCase.imdb_mvid)
+
+            assert len(scraper.urls) == 2
+            assert "append_to_response=translations" in scraper.urls[1]
+            assert movie.tmdb_mvid == TestCase.tmdb_mvid
+            assert movie.tagline_en == TestCase.tagline_en
+            assert movie.name_ru == TestCase.title_ru
+            assert movie.tagline_ru == TestCase.tagline_ru
+            assert movie.overview_ru is None
+
+            # ids are cached persistently, the search is skipped
+            scraper = FakeTMDbScraper(cache_dir)
+            assert await scraper.get_movie(TestCase.imdb_mvid) == movie
+            assert len(scraper.urls) == 1
+
+    @pytest.mark.asyncio
+    async def test_ids_closed(self):
+        # one-off scrapers don't keep ids
+        assert TMDbScraper("API_KEY").ids is None
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            scraper = FakeTMDbScraper(cache_dir)
+            movie = await scraper.get_movie(TestCase.imdb_mvid)
+            await scraper.close()
+            assert scraper.ids._connection is None
+
+            # the closed scraper is reused, ids are read again
+            assert await scraper.get_movie(TestCase.imdb_mvid) == movie
+            assert len(scraper.urls) == 3
+            await scraper.close()
+
+    @pytest.mark.asyncio
+    async def test_movie_absent_cached(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            scraper = FakeTMDbScraper(cache_dir)
+            for _ in range(2):
+                with pytest.raises(MovieDoesNotExist):
+                    await scraper.get_movie(TestCase.imdb_not_exists)
+
+            assert len(scraper.urls) == 1
+            assert IDMapping(Path(cache_dir) / "ids.sqlite").lookup(
+                TestCase.imdb_not_exists
+            ) == (True, None)
+
+
+class FlakyTMDbScraper(FakeTMDbScraper):
+    """Movies of failures ids raise the listed errors first"""
+
+    def __init__(self, cache_dir: Path, failures: dict[str, list[Exception]]) -> None:
+        super().__init__(cache_dir)
+        self.failures = failures
+        self.calls = []
+
+    async def get_movie(self, imdb_mvid: str, translations: bool = True):
+        self.calls.append(imdb_mvid)
+        errors = self.failures.get(imdb_mvid, [])
+        if errors:
+            raise errors.pop(0)
+        return await super().get_movie(imdb_mvid, translations)
+
+
+class TestTMDbScraperMovies:
+    @pytest.mark.asyncio
+    async def test_get_movies(self, monkeypatch):
+        monkeypatch.setattr(tmdb_scraper, "backoff", lambda attempt: 0)
+        failures = {
+            "tt0000001": [TMDbOverLimit()],
+            "tt0000002": [ClientConnectionError() for _ in range(5)],
+            "tt0000003": [TMDbAuthFailed()],
+        }
+        ids = [TestCase.imdb_mvid, TestCase.imdb_not_exists, *failures]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            scraper = FlakyTMDbScraper(cache_dir, failures)
+            # ids are deduplicated
+            results = {
+                imdb_mvid: result
+                async for imdb_mvid, result in scraper.get_movies(ids + ids)
+            }
+
+        assert results.keys() == set(ids)
+        assert isinstance(results[TestCase.imdb_mvid], TMDbMovieServiceDM)
+        assert scraper.calls.count(TestCase.imdb_mvid) == 1
+
+        categories = {
+            imdb_mvid: result.category
+            for imdb_mvid, result in results.items()
+            if isinstance(result, TMDbMovieError)
+        }
+        assert categories == {
+            TestCase.imdb_not_exists: TMDbMovieError.NOT_FOUND,
+            # retried and then searched, the fake API knows only one movie
+            "tt0000001": TMDbMovieError.NOT_FOUND,
+            "tt0000002": TMDbMovieError.NETWORK,
+            "tt0000003": TMDbMovieError.AUTH,
+        }
+        # transient errors are retried
+        assert scraper.calls.count("tt0000001") == 2
+        assert scraper.calls.count("tt0000002") == tmdb_scraper.MOVIE_TRIES
+        assert scraper.calls.count("tt0000003") == 1
+
+    @pytest.mark.asyncio
+    async def test_get_movies_bug(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            failures = {TestCase.imdb_mvid: [ZeroDivisionError()]}
+            scraper = FlakyTMDbScraper(cache_dir, failures)
+
+            with pytest.raises(ZeroDivisionError):
+                async for _ in scraper.get_movies([TestCase.imdb_mvid]):
+                    pass